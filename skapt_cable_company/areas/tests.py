@@ -4,12 +4,16 @@ Module for all Area Tests
 
 # pylint: disable=imported-auth-user
 
+from unittest.mock import patch
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.forms import Form
 
 
-from common.models import Area
+from common.models import Area, AreaInflow
 from common.tests import BaseTestCase
+from ml.forecast import build_cash_forecast
 
 from .forms import AreaForm
 
@@ -67,6 +71,49 @@ class AreasTestCase(AreaBaseTestCase):
         self.assertEqual(len(response.context["areas"]), len(areas))
 
 
+class CashForecastTestCase(AreaBaseTestCase):
+    """
+    Test Cases for testing the Cash Forecast Page
+    """
+
+    def setUp(self):
+        """
+        Setup Cash Forecast Testings
+        """
+        super().setUp()
+        cache.clear()
+        self.customers = self.generate_customers()
+
+    def test_page_renders_for_employee(self):
+        """
+        Test the Cash Forecast page renders every Area for employees
+        """
+        build_cash_forecast()
+        self.login_as_employee()
+        response = self.client.get("/areas/forecast")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "forecast.html")
+        self.assertEqual(len(response.context["forecast"].areas), Area.objects.count())
+        self.assertContains(response, self.customers[0].area.name)
+
+    def test_page_not_built(self):
+        """
+        Test the Cash Forecast page neither computes nor stores a forecast
+        """
+        self.login_as_employee()
+        with patch("ml.forecast.refresh_expired_predictions") as refresh:
+            response = self.client.get("/areas/forecast")
+        refresh.assert_not_called()
+        self.assertContains(response, "The Cash Forecast has not been built yet")
+        self.assertFalse(AreaInflow.objects.exists())
+
+    def test_page_not_renders_for_non_employees(self):
+        """
+        Test the Cash Forecast page does not render for non-employees
+        """
+        self.helper_non_render_test("/areas/forecast", True, False)
+
+
 class AddAreaTestCase(AreaBaseTestCase):
     """
     Test Cases for testing Add new Area Functionality and UI
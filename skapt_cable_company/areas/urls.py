@@ -9,6 +9,7 @@ from . import views
 urlpatterns = [
     path("", views.index, name="index"),
     path("add", views.add_area, name="add Area"),
+    path("forecast", views.cash_forecast, name="Cash Forecast"),
     path("<int:area_id>", views.view_area, name="View Area"),
     path("<int:area_id>/update", views.update_area, name="Update Area"),
 ]
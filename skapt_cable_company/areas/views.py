@@ -29,6 +29,19 @@ def index(request: HttpRequest):
     raise PermissionDenied
 
 
+@login_required
+def cash_forecast(request: HttpRequest):
+    """
+    Areas Weekly Cash Inflow Forecast Page View Controller
+    """
+    # The forecast needs NumPy, imported only once the page is requested
+    from ml.forecast import get_cash_forecast  # pylint: disable=import-outside-toplevel
+
+    template = loader.get_template("forecast.html")
+    get_employee_or_super_admin(request)
+    return HttpResponse(template.render({"forecast": get_cash_forecast()}, request))
+
+
 @login_required
 def add_area(request: HttpRequest):
     """
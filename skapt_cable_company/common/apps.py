@@ -10,3 +10,9 @@ class CommonConfig(AppConfig):
 
     name = "common"
     verbose_name = "Common Models"
+
+    def ready(self) -> None:
+        """
+        Connect the Signal Handlers once the Apps are loaded
+        """
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
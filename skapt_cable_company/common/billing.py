@@ -0,0 +1,189 @@
+"""
+Module to generate the missing Monthly Bills of the Customer Connections
+
+The billing periods every active connection is missing are worked out from the
+date its Ledger is billed to, and the Bills are inserted in chunks, each chunk
+recorded in the Ledger in the same transaction, so reading Bills never writes them.
+A period already billed by a concurrent run is skipped, and not counted, so runs
+may overlap.
+The monthly run may bill every Area in a process pool, each worker on its own
+database connection. SQLite serializes writers, so there the Areas are billed in
+a single process
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import islice, repeat
+from time import perf_counter
+from typing import Iterator, List, NamedTuple, Union
+
+import django
+from django.apps import apps
+from django.db import connections as db_connections
+from django.db import IntegrityError, transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Coalesce
+
+from .ledger import recompute_ledger
+from .models import Area, Bill, CustomerConnection
+
+BILLING_PERIOD_DAYS = 30
+
+logger = logging.getLogger(__name__)
+
+
+class AreaBilling(NamedTuple):
+    """
+    Bills inserted for the connections of an Area and the seconds it took
+    """
+
+    area_id: int
+    name: str
+    bills: int
+    seconds: float
+
+
+def get_missing_bills(
+    connection_id: int, last_bill_date: date, has_digital_box: bool, today: date
+) -> Iterator[Bill]:
+    """
+    Get the Monthly Bills of a connection for every full period after its last
+    billed date up to today
+    """
+    amount = Bill.DIGITAL_FEE if has_digital_box else Bill.ANALOG_FEE
+    while (today - last_bill_date).days > BILLING_PERIOD_DAYS:
+        from_date = last_bill_date + timedelta(days=1)
+        last_bill_date = from_date + timedelta(days=BILLING_PERIOD_DAYS - 1)
+        yield Bill(
+            connection_id=connection_id,
+            from_date=from_date,
+            to_date=last_bill_date,
+            amount=amount,
+            description=Bill.DescriptionChoices.Monthly,
+        )
+
+
+def insert_bills(bills: List[Bill]) -> int:
+    """
+    Insert Bills, skipping the periods a concurrent run has already billed
+
+    Returns the number of Bills inserted by this call
+    """
+    try:
+        with transaction.atomic():
+            Bill.objects.bulk_create(bills)
+        return len(bills)
+    except IntegrityError:
+        inserted = 0
+        for bill in bills:
+            try:
+                with transaction.atomic():
+                    Bill.objects.bulk_create([bill])
+                inserted += 1
+            except IntegrityError:
+                pass
+        return inserted
+
+
+def generate_bills(
+    today: Union[date, None] = None,
+    chunk_size=500,
+    connections: Union["QuerySet[CustomerConnection]", None] = None,
+) -> int:
+    """
+    Insert the missing Monthly Bills of the active connections
+
+    Returns the number of Bills inserted
+    """
+    today = today or date.today()
+    if connections is None:
+        connections = CustomerConnection.objects.all()
+    last_bill_dates = list(
+        connections.filter(active=True)
+        .annotate(last_bill_date=Coalesce(F("last_billed_to"), F("start_date")))
+        .order_by("pk")
+        .values_list("pk", "last_bill_date", "customer__has_digital_box")
+    )
+    bills = (
+        bill
+        for connection_id, last_bill_date, has_digital_box in last_bill_dates
+        for bill in get_missing_bills(
+            connection_id, last_bill_date, has_digital_box, today
+        )
+    )
+    count = 0
+    while chunk := list(islice(bills, chunk_size)):
+        with transaction.atomic():
+            count += insert_bills(chunk)
+            recompute_ledger(
+                CustomerConnection.objects.filter(
+                    pk__in={bill.connection_id for bill in chunk}
+                )
+            )
+    return count
+
+
+def bill_area(area_id: int, name: str, today: date, chunk_size=500) -> AreaBilling:
+    """
+    Insert the missing Monthly Bills of the active connections of an Area
+    """
+    start = perf_counter()
+    bills = generate_bills(
+        today,
+        chunk_size,
+        CustomerConnection.objects.filter(customer__area=area_id),
+    )
+    return AreaBilling(area_id, name, bills, perf_counter() - start)
+
+
+def init_billing_worker() -> None:
+    """
+    Set Django up in a spawned worker and drop any database connection inherited
+    from the parent, so every worker opens its own
+    """
+    if not apps.ready:
+        django.setup()
+    db_connections.close_all()
+
+
+def supports_parallel_billing() -> bool:
+    """
+    Check the database takes writes from parallel workers, which SQLite locks out
+    """
+    return db_connections["default"].vendor != "sqlite"
+
+
+def generate_area_bills(
+    today: Union[date, None] = None, chunk_size=500, workers=1
+) -> List[AreaBilling]:
+    """
+    Insert the missing Monthly Bills Area by Area, in a pool of worker processes
+    when more than one worker is given and the database supports it
+
+    Returns the Bills inserted and the seconds taken for every Area
+    """
+    today = today or date.today()
+    if workers > 1 and not supports_parallel_billing():
+        logger.warning(
+            "Billing the Areas in a single process, as %s does not take writes"
+            " from parallel workers",
+            db_connections["default"].display_name,
+        )
+        workers = 1
+    areas = list(Area.objects.order_by("pk").values_list("pk", "name"))
+    if workers <= 1:
+        return [bill_area(area_id, name, today, chunk_size) for area_id, name in areas]
+    db_connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_billing_worker
+    ) as executor:
+        return list(
+            executor.map(
+                bill_area,
+                [area_id for area_id, _ in areas],
+                [name for _, name in areas],
+                repeat(today),
+                repeat(chunk_size),
+            )
+        )
@@ -0,0 +1,178 @@
+"""
+Module to keep the Balance Ledger of the Customer Connections
+
+Every connection stores its balance and the date it is billed to. Writing a Bill
+or Payment adjusts them with a single UPDATE of F() expressions, so reading a
+balance needs no sum over the Bills and Payments. A full recompute checks the
+stored values and repairs any drift
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from django.db.models import (
+    Case,
+    DateField,
+    F,
+    FloatField,
+    OuterRef,
+    QuerySet,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Bill, CustomerConnection, Payment, sum_amounts
+
+BALANCE_TOLERANCE = 1e-6
+
+
+class LedgerDrift(NamedTuple):
+    """
+    Stored and recomputed Ledger values of a drifted connection
+    """
+
+    connection_id: int
+    balance: float
+    computed_balance: float
+    last_billed_to: Union[date, None]
+    computed_last_billed_to: Union[date, None]
+
+
+def get_computed_balance():
+    """
+    Get the balance of the outer connection summed over its Bills and Payments
+    """
+    return sum_amounts(
+        Bill.objects.filter(connection=OuterRef("pk")), "connection"
+    ) - sum_amounts(Payment.objects.filter(connection=OuterRef("pk")), "connection")
+
+
+def get_computed_last_billed_to() -> Subquery:
+    """
+    Get the latest billed date of the outer connection
+    """
+    return Subquery(
+        Bill.objects.filter(connection=OuterRef("pk"))
+        .order_by("-to_date")
+        .values("to_date")[:1]
+    )
+
+
+def record_entries(
+    amounts: Dict[int, float], billed_to: Union[Dict[int, date], None] = None
+) -> None:
+    """
+    Add amounts to the balances of connections, and advance their billed dates,
+    in a single UPDATE
+    """
+    if not amounts:
+        return
+    changes = {
+        "balance": F("balance")
+        + Case(
+            *[
+                When(pk=connection_id, then=Value(amount))
+                for connection_id, amount in amounts.items()
+            ],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    }
+    if billed_to:
+        billed_date = Case(
+            *[
+                When(pk=connection_id, then=Value(to_date, output_field=DateField()))
+                for connection_id, to_date in billed_to.items()
+            ],
+            default=F("last_billed_to"),
+            output_field=DateField(),
+        )
+        changes["last_billed_to"] = Coalesce(
+            Greatest(F("last_billed_to"), billed_date), billed_date
+        )
+    CustomerConnection.objects.filter(pk__in=amounts.keys()).update(**changes)
+
+
+def record_bills(bills: Iterable[Bill]) -> None:
+    """
+    Add new Bills to the Ledger of their connections
+    """
+    amounts: Dict[int, float] = {}
+    billed_to: Dict[int, date] = {}
+    for bill in bills:
+        amounts[bill.connection_id] = amounts.get(bill.connection_id, 0) + bill.amount
+        billed_to[bill.connection_id] = max(
+            billed_to.get(bill.connection_id, bill.to_date), bill.to_date
+        )
+    record_entries(amounts, billed_to)
+
+
+def record_payments(payments: Iterable[Payment]) -> None:
+    """
+    Subtract new Payments from the Ledger of their connections
+    """
+    amounts: Dict[int, float] = {}
+    for payment in payments:
+        amounts[payment.connection_id] = (
+            amounts.get(payment.connection_id, 0) - payment.amount
+        )
+    record_entries(amounts)
+
+
+def recompute_ledger(connections: "QuerySet[CustomerConnection]") -> int:
+    """
+    Overwrite the Ledger of the connections with a full recompute
+
+    Returns the number of connections updated
+    """
+    return connections.update(
+        balance=get_computed_balance(),
+        last_billed_to=get_computed_last_billed_to(),
+    )
+
+
+def find_drift(
+    connections: Union["QuerySet[CustomerConnection]", None] = None,
+) -> List[LedgerDrift]:
+    """
+    Get the connections whose stored Ledger differs from a full recompute
+    """
+    if connections is None:
+        connections = CustomerConnection.objects.all()
+    rows: Iterable[Tuple[int, float, float, date, date]] = (
+        connections.with_balances()
+        .annotate(computed_last_billed_to=get_computed_last_billed_to())
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "balance",
+            "computed_balance",
+            "last_billed_to",
+            "computed_last_billed_to",
+        )
+        .iterator()
+    )
+    return [
+        LedgerDrift(*row)
+        for row in rows
+        if abs(row[1] - row[2]) > BALANCE_TOLERANCE or row[3] != row[4]
+    ]
+
+
+def rebuild_ledger(repair=True, chunk_size=500) -> List[LedgerDrift]:
+    """
+    Check the stored Ledger of every connection, repairing the drifted ones
+
+    Returns the drifted connections
+    """
+    drifts = find_drift()
+    if repair:
+        for i in range(0, len(drifts), chunk_size):
+            recompute_ledger(
+                CustomerConnection.objects.filter(
+                    pk__in=[drift.connection_id for drift in drifts[i : i + chunk_size]]
+                )
+            )
+    return drifts
@@ -0,0 +1,42 @@
+"""
+Management Command to generate the missing Monthly Bills
+"""
+
+from django.core.management.base import BaseCommand
+
+from common.billing import generate_area_bills
+
+
+class Command(BaseCommand):
+    """
+    Command to insert the Monthly Bills the active connections are missing, Area by
+    Area
+    """
+
+    help = "Insert the missing Monthly Bills of the active connections by Area"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of Bills inserted per transaction",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes billing the Areas in parallel, ignored on SQLite",
+        )
+
+    def handle(self, *args, **options):
+        billings = generate_area_bills(
+            chunk_size=options["chunk_size"], workers=options["workers"]
+        )
+        for billing in billings:
+            self.stdout.write(
+                f"{billing.name}: {billing.bills} Bills in {billing.seconds:.3f}s"
+            )
+        self.stdout.write(
+            f"Generated {sum(billing.bills for billing in billings)} Bills"
+        )
@@ -0,0 +1,33 @@
+"""
+Management Command to check and repair the Balance Ledger of the connections
+"""
+
+from django.core.management.base import BaseCommand
+
+from common.ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    """
+    Command to compare the stored Ledger of every connection with a full recompute
+    """
+
+    help = "Check the connection balances against a full recompute and repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the drifted connections without repairing them",
+        )
+
+    def handle(self, *args, **options):
+        drifts = rebuild_ledger(repair=not options["check"])
+        for drift in drifts:
+            self.stdout.write(
+                f"Connection {drift.connection_id}: balance {drift.balance} != "
+                f"{drift.computed_balance}, billed to {drift.last_billed_to} != "
+                f"{drift.computed_last_billed_to}"
+            )
+        action = "Found" if options["check"] else "Repaired"
+        self.stdout.write(f"{action} {len(drifts)} drifted connections")
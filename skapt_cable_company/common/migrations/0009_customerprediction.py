@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0008_bill_description_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerPrediction",
+            fields=[
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="common.customer",
+                    ),
+                ),
+                ("expected_delay", models.FloatField()),
+                ("expected_payment_date", models.DateField()),
+                ("default_probability", models.FloatField()),
+                ("model_version", models.CharField(max_length=64)),
+                ("computed_at", models.DateTimeField()),
+                ("stale", models.BooleanField(default=False)),
+            ],
+        ),
+    ]
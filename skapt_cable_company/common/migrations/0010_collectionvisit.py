@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0009_customerprediction"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectionVisit",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("date", models.DateField()),
+                ("expected_delay", models.FloatField()),
+                ("default_probability", models.FloatField()),
+                (
+                    "agent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="common.employee",
+                    ),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="common.customer",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["agent", "date"], name="common_coll_agent_i_749749_idx"
+                    )
+                ],
+            },
+        ),
+    ]
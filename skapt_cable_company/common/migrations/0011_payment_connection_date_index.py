@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0010_collectionvisit"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["connection", "date"], name="common_paym_connect_05fb3c_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:42
+
+from django.db import migrations, models
+from django.db.models import FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def get_amount_total(model):
+    """
+    Get the total amount of the Bills or Payments of the outer connection
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(connection=OuterRef("pk"))
+            .values("connection")
+            .annotate(total=Sum("amount"))
+            .values("total"),
+            output_field=FloatField(),
+        ),
+        Value(0.0),
+    )
+
+
+def compute_ledger(apps, schema_editor):
+    """
+    Compute the Ledger of the existing connections from their Bills and Payments
+    """
+    bill = apps.get_model("common", "Bill")
+    payment = apps.get_model("common", "Payment")
+    apps.get_model("common", "CustomerConnection").objects.update(
+        balance=get_amount_total(bill) - get_amount_total(payment),
+        last_billed_to=Subquery(
+            bill.objects.filter(connection=OuterRef("pk"))
+            .order_by("-to_date")
+            .values("to_date")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0011_payment_connection_date_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customerconnection",
+            name="balance",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="customerconnection",
+            name="last_billed_to",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(compute_ledger, migrations.RunPython.noop),
+    ]
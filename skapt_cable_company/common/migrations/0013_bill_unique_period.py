@@ -0,0 +1,104 @@
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+
+def get_amount_total(model):
+    """
+    Get the total amount of the Bills or Payments of the outer connection
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(connection=OuterRef("pk"))
+            .values("connection")
+            .annotate(total=Sum("amount"))
+            .values("total"),
+            output_field=FloatField(),
+        ),
+        Value(0.0),
+    )
+
+
+def remove_duplicate_bills(apps, schema_editor):
+    """
+    Keep the first Bill of every duplicated period, reporting the removed ones,
+    and recompute the Ledger of their connections
+
+    Aborts without removing any Bill when the Bills of a period differ in amount,
+    as those need to be resolved by hand
+    """
+    bill = apps.get_model("common", "Bill")
+    payment = apps.get_model("common", "Payment")
+    duplicates = list(
+        bill.objects.values("connection", "from_date")
+        .annotate(
+            count=Count("id"),
+            first_id=Min("id"),
+            amounts=Count("amount", distinct=True),
+        )
+        .filter(count__gt=1)
+        .order_by("connection", "from_date")
+    )
+    conflicts = []
+    for duplicate in duplicates:
+        if duplicate["amounts"] > 1:
+            bills = bill.objects.filter(
+                connection=duplicate["connection"], from_date=duplicate["from_date"]
+            ).order_by("id")
+            conflicts.append(
+                f"connection {duplicate['connection']} from {duplicate['from_date']}: "
+                + ", ".join(
+                    f"Bill {bill_id} of {amount}"
+                    for bill_id, amount in bills.values_list("id", "amount")
+                )
+            )
+    if conflicts:
+        raise RuntimeError(
+            "Bills of the same period differ in amount, remove the wrong ones"
+            " before migrating:\n" + "\n".join(conflicts)
+        )
+    connection_ids = set()
+    for duplicate in duplicates:
+        removed = bill.objects.filter(
+            connection=duplicate["connection"], from_date=duplicate["from_date"]
+        ).exclude(id=duplicate["first_id"])
+        for bill_id, amount in removed.order_by("id").values_list("id", "amount"):
+            logger.warning(
+                "Removed duplicate Bill %s of %s of connection %s from %s",
+                bill_id,
+                amount,
+                duplicate["connection"],
+                duplicate["from_date"],
+            )
+        removed.delete()
+        connection_ids.add(duplicate["connection"])
+    apps.get_model("common", "CustomerConnection").objects.filter(
+        pk__in=connection_ids
+    ).update(
+        balance=get_amount_total(bill) - get_amount_total(payment),
+        last_billed_to=Subquery(
+            bill.objects.filter(connection=OuterRef("pk"))
+            .order_by("-to_date")
+            .values("to_date")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0012_customerconnection_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_bills, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="bill",
+            constraint=models.UniqueConstraint(
+                fields=("connection", "from_date"), name="unique_bill_period"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0013_bill_unique_period"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AreaInflow",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("week", models.DateField()),
+                ("amount", models.FloatField()),
+                (
+                    "area",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="common.area"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="areainflow",
+            constraint=models.UniqueConstraint(
+                fields=("area", "week"), name="unique_area_week"
+            ),
+        ),
+    ]
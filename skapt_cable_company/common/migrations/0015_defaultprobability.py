@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0014_areainflow"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DefaultProbability",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("key", models.CharField(max_length=64, unique=True)),
+                ("probability", models.FloatField()),
+                ("computed_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -4,18 +4,28 @@ Module to contain all Common Models
 
 # pylint: disable=imported-auth-user
 
-from typing import Union
+from typing import Dict, List, Tuple, Union
 from datetime import datetime, timedelta
+from time import monotonic
 
-from django.db import models
-from django.db.models import Sum
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Coalesce, ExtractDay, RowNumber
 from django.contrib.auth.models import User, AbstractBaseUser, AnonymousUser
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.http import HttpRequest
 from django.utils.timezone import now
-from numpy import zeros, array
 
-from ml.predictors import DefaultPredictor, DelayPredictor
+from ml.cache import get_default_probabilities, predict_default_probabilities
+from ml.client import (
+    FALLBACK_VERSION,
+    TIME_SERIES_OFFSET,
+    get_customer_row,
+    get_payment_date,
+    predict,
+)
+from ml.registry import registry
 
 
 def pagination_handle(request: HttpRequest, default_size=10, default_page_number=1):
@@ -198,6 +208,43 @@ class Area(models.Model):
         )
 
 
+def sum_amounts(queryset: models.QuerySet, group_by: str) -> Coalesce:
+    """
+    Get the total amount of a Bill or Payment queryset filtered on an outer row,
+    zero when it is empty
+    """
+    return Coalesce(
+        Subquery(
+            queryset.values(group_by).annotate(total=Sum("amount")).values("total"),
+            output_field=FloatField(),
+        ),
+        Value(0.0),
+    )
+
+
+class CustomerQuerySet(models.QuerySet):
+    """
+    Class for Customer Query Set
+    """
+
+    def with_balances(self):
+        """
+        Annotate the billed, paid and unpaid totals of the Customers, summed in the
+        database
+        """
+        return self.annotate(
+            billed=sum_amounts(
+                Bill.objects.filter(connection__customer=OuterRef("pk")),
+                "connection__customer",
+            ),
+            paid=sum_amounts(
+                Payment.objects.filter(connection__customer=OuterRef("pk")),
+                "connection__customer",
+            ),
+            unpaid=F("billed") - F("paid"),
+        )
+
+
 class Customer(models.Model):
     """
     Class For Customer Model
@@ -226,6 +273,8 @@ class Customer(models.Model):
     connection_start_date = models.DateField(default=now())
     area = models.ForeignKey(Area, on_delete=models.RESTRICT)
 
+    objects = CustomerQuerySet.as_manager()
+
     def __str__(self):
         return str(self.user)
 
@@ -281,84 +330,92 @@ class Customer(models.Model):
             gender_code = int(self.identity_no[4:7])
         return gender_code < 500
 
-    @property
-    def expected_delay(self) -> int:
+    def predict_expected_delay(
+        self, budget: Union[float, None] = None
+    ) -> Tuple[float, str]:
         """
-        Get Payment Delay in Days
+        Run the Delay Prediction Model for the customer, within a budget in seconds if given
+
+        Returns the Expected Delay and the Model Version which predicted it
         """
-        pay_date = self.area.collection_date
-        delay_predictor = DelayPredictor()
-        payments = Payment.objects.filter(connection__customer=self).order_by("date")[
-            : delay_predictor.time_series_offset
-        ]
-        payments_array = (
-            zeros(delay_predictor.time_series_offset)
-            + delay_predictor.time_series_offset
+        payment_days = (
+            Payment.objects.filter(connection__customer=self)
+            .last_payment_days(TIME_SERIES_OFFSET)
+            .get(self.pk, [])
         )
-        for i, payment in enumerate(payments):
-            payments_array[(delay_predictor.time_series_offset - len(payments)) + i] = (
-                payment.date.day - pay_date
+        predictions = predict("delay", [get_customer_row(self, payment_days)], budget)
+        return predictions.values[0], predictions.model_version
+
+    def predict_default_probability(self) -> float:
+        """
+        Run the Default Prediction Model for the customer, or read its cached result
+        """
+        return get_default_probabilities([self])[self.pk]
+
+    @property
+    def prediction(self) -> "CustomerPrediction":
+        """
+        Get the stored Predictions of the customer, recomputing them when not fresh
+
+        Both Models share one latency budget. When they overrun it, the Priors they
+        fall back to are kept on the customer instead of being stored
+        """
+        # pylint: disable=access-member-before-definition,attribute-defined-outside-init
+        try:
+            prediction = self.customerprediction  # pylint: disable=no-member
+        except CustomerPrediction.DoesNotExist:
+            prediction = None
+        if prediction is None or not (prediction.fallback or prediction.is_fresh):
+            budget = (
+                None
+                if settings.ML_LATENCY_BUDGET_MS is None
+                else settings.ML_LATENCY_BUDGET_MS / 1000
             )
-        std_numerical_array = delay_predictor.normalize(
-            payments_array, self.age, pay_date
-        )
-        area_array = delay_predictor.get_area_array(self.area.name)
-        agent_array = delay_predictor.get_agent_array(self.area.agent.user.first_name)
-        cell_array = delay_predictor.get_cell_career_array(self.phone_number)
+            deadline = None if budget is None else monotonic() + budget
+            expected_delay, model_version = self.predict_expected_delay(budget)
+            default_probabilities = predict_default_probabilities(
+                [self], None if deadline is None else max(deadline - monotonic(), 0)
+            )
+            values = {
+                "expected_delay": expected_delay,
+                "expected_payment_date": get_payment_date(
+                    expected_delay, self.area.collection_date
+                ),
+                "default_probability": default_probabilities.probabilities[self.pk],
+                "model_version": model_version,
+                "computed_at": now(),
+                "stale": False,
+            }
+            if model_version == FALLBACK_VERSION or default_probabilities.fallback:
+                prediction = CustomerPrediction(
+                    **{**values, "model_version": FALLBACK_VERSION}
+                )
+                self.customerprediction = prediction
+            else:
+                prediction, _ = CustomerPrediction.objects.update_or_create(
+                    customer=self, defaults=values
+                )
+                prediction.customer = self
+        return prediction
 
-        model = delay_predictor.get_model()
-        return (
-            model.predict(
-                array(
-                    list(std_numerical_array)
-                    + list(area_array)
-                    + [int(self.is_male)]
-                    + [int(self.has_digital_box)]
-                    + list(cell_array)
-                    + list(agent_array)
-                ).reshape((1, -1))
-            )[0]
-            // 7
-        ) * 7
+    @property
+    def expected_delay(self) -> float:
+        """
+        Get Payment Delay in Days
+        """
+        return self.prediction.expected_delay
 
     @property
     def expected_payment_date(self):
         """
         Get Most probable Payment Date
         """
-        pay_date = self.area.collection_date
-        date = datetime.today()
-        return datetime(date.year, date.month, pay_date) + timedelta(
-            days=self.expected_delay + pay_date
-        )
+        return self.prediction.expected_payment_date
 
     @property
     def default_probability(self) -> float:
         """Get Defaulter Probability"""
-        deafult_predictor = DefaultPredictor()
-        model = deafult_predictor.get_model()
-        preprocessor = deafult_predictor.get_preprocessor()
-        input_arr = array(
-            [
-                deafult_predictor.area_prob.get(self.area.name, 21 / 1041),
-                deafult_predictor.agent_probs.get(self.area.agent.name, 21 / 1041),
-                deafult_predictor.cell_number_probs.get(
-                    int(self.phone_number[2]), deafult_predictor.cell_number_probs[-1]
-                ),
-                deafult_predictor.gender_probs.get(
-                    "Male" if self.is_male else "Female", 21 / 1041
-                ),
-                deafult_predictor.box_probs.get(
-                    "digital" if self.has_digital_box else "analog",
-                    21 / 1041,
-                ),
-                1 if self.offer_power_intake else 0.979452,
-                self.age,
-                self.area.collection_date,
-            ]
-        ).reshape((1, -1))
-        prob = 1 - model.predict(preprocessor.transform(input_arr))[0]
-        return prob
+        return self.prediction.default_probability
 
     @property
     def agent(self):
@@ -379,25 +436,53 @@ class Customer(models.Model):
         """
         Get Bills
         """
-        connections = CustomerConnection.objects.filter(customer=self)
-        bills = []
-        for connection in connections:
-            bills += connection.bills
-        return bills
+        return Bill.objects.filter(connection__customer=self).order_by("-to_date")
 
     @property
     def total_payment(self):
         """
-        Get Total Payment
+        Get Total Payment, annotated by with_balances or summed in the database
         """
-        return self.payments.aggregate(Sum("amount")).get("amount__sum", 0) or 0
+        paid = getattr(self, "paid", None)
+        if paid is None:
+            return self.payments.aggregate(Sum("amount")).get("amount__sum", 0) or 0
+        return paid
 
     @property
     def total_unpaid(self):
         """
-        Get Total Unpaid
+        Get Total Unpaid, annotated by with_balances or summed in a single query
         """
-        return sum(bill.amount for bill in self.bills) - self.total_payment
+        unpaid = getattr(self, "unpaid", None)
+        if unpaid is None:
+            return (
+                Customer.objects.filter(pk=self.pk)
+                .with_balances()
+                .values_list("unpaid", flat=True)
+                .get()
+            )
+        return unpaid
+
+
+class CustomerConnectionQuerySet(models.QuerySet):
+    """
+    Class for Customer Connection Query Set
+    """
+
+    def with_balances(self):
+        """
+        Annotate the billed and paid totals of the connections and the balance
+        computed from them, summed in the database
+        """
+        return self.annotate(
+            billed=sum_amounts(
+                Bill.objects.filter(connection=OuterRef("pk")), "connection"
+            ),
+            paid=sum_amounts(
+                Payment.objects.filter(connection=OuterRef("pk")), "connection"
+            ),
+            computed_balance=F("billed") - F("paid"),
+        )
 
 
 class CustomerConnection(models.Model):
@@ -410,6 +495,10 @@ class CustomerConnection(models.Model):
     active = models.BooleanField(default=True)
     start_date = models.DateField(auto_now_add=True)
     box_ca_number = models.CharField(max_length=16, unique=True)
+    balance = models.FloatField(default=0)
+    last_billed_to = models.DateField(null=True, blank=True)
+
+    objects = CustomerConnectionQuerySet.as_manager()
 
     def __str__(self) -> str:
         return f"Connection {self.id} by {self.customer.user.get_short_name()}"
@@ -419,52 +508,55 @@ class CustomerConnection(models.Model):
         end_date: Union[datetime, None] = None,
         billing_amount: Union[float, None] = None,
         description: Union[str, None] = None,
-    ):
+    ) -> Union["Bill", None]:
         """
         Generate Bill for the customer with the given optinal end date or with default gap
+
+        The connection row is locked while its latest Bill is read, and a Bill already
+        stored for the same period is returned instead of a duplicate. No Bill is
+        created when the latest one already covers the end date, as its period would
+        be empty and hold the start of the next Monthly Bill
         """
-        bills = Bill.objects.filter(connection=self).order_by("-to_date")
-        latest_bill = bills.first()
-        last_bill_date = latest_bill.to_date if latest_bill else self.start_date
-        from_date = last_bill_date + timedelta(days=1)
-        if description is None:
-            description = Bill.DescriptionChoices.Monthly
-        if billing_amount is not None:
-            amount = billing_amount
-        else:
-            amount = (
-                Bill.DIGITAL_FEE if self.customer.has_digital_box else Bill.ANALOG_FEE
+        with transaction.atomic():
+            CustomerConnection.objects.select_for_update().filter(pk=self.pk).first()
+            bills = Bill.objects.filter(connection=self).order_by("-to_date")
+            latest_bill = bills.first()
+            last_bill_date = latest_bill.to_date if latest_bill else self.start_date
+            from_date = last_bill_date + timedelta(days=1)
+            if description is None:
+                description = Bill.DescriptionChoices.Monthly
+            if billing_amount is not None:
+                amount = billing_amount
+            else:
+                amount = (
+                    Bill.DIGITAL_FEE
+                    if self.customer.has_digital_box
+                    else Bill.ANALOG_FEE
+                )
+            if end_date:
+                to_date = end_date.date()
+                if to_date < from_date:
+                    return latest_bill
+                amount = amount * ((to_date - from_date).days + 1) // 30
+            else:
+                to_date = from_date + timedelta(days=29)
+            latest_bill, _ = Bill.objects.get_or_create(
+                connection=self,
+                from_date=from_date,
+                defaults={
+                    "to_date": to_date,
+                    "amount": amount,
+                    "description": description,
+                },
             )
-        if end_date:
-            to_date = end_date
-            amount = amount * ((end_date.date() - from_date).days + 1) // 30
-        else:
-            to_date = from_date + timedelta(days=29)
-        latest_bill = Bill.objects.create(
-            connection=self,
-            from_date=from_date,
-            to_date=to_date,
-            amount=amount,
-            description=description,
-        )
-        latest_bill.save()
-        return latest_bill
+            return latest_bill
 
     @property
     def bills(self):
         """
-        Get Bills and generate bills for missing months
+        Get Bills, the missing months being generated by the generate_bills command
         """
-
-        bills = Bill.objects.filter(connection=self).order_by("-to_date")
-        if self.active:
-            latest_bill = bills.first()
-            last_bill_date = latest_bill.to_date if latest_bill else self.start_date
-            while (datetime.now().date() - last_bill_date) > timedelta(days=30):
-                latest_bill = self.generate_bill()
-                last_bill_date = latest_bill.to_date
-            bills = Bill.objects.filter(connection=self).order_by("-to_date")
-        return bills
+        return Bill.objects.filter(connection=self).order_by("-to_date")
 
     @property
     def payments(self):
@@ -473,14 +565,156 @@ class CustomerConnection(models.Model):
         """
         return Payment.objects.filter(connection=self)
 
+
+class CustomerPredictionQuerySet(models.QuerySet):
+    """
+    Class for Customer Prediction Query Set
+    """
+
+    def fresh(self):
+        """
+        Get Predictions made by the current Model Version within the freshness threshold
+        """
+        return self.filter(
+            stale=False,
+            model_version=registry.version,
+            computed_at__gte=now() - timedelta(seconds=settings.ML_PREDICTION_MAX_AGE),
+        )
+
+
+class CustomerPrediction(models.Model):
+    """
+    Class for Customer Prediction Model
+    """
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True
+    )
+    expected_delay = models.FloatField()
+    expected_payment_date = models.DateField()
+    default_probability = models.FloatField()
+    model_version = models.CharField(max_length=64)
+    computed_at = models.DateTimeField()
+    stale = models.BooleanField(default=False)
+
+    objects = CustomerPredictionQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"Prediction of {self.customer} computed at {self.computed_at}"
+
     @property
-    def balance(self):
+    def fallback(self) -> bool:
+        """
+        Check if the Prediction holds the Priors the Models fell back to
+        """
+        return self.model_version == FALLBACK_VERSION
+
+    @property
+    def is_fresh(self) -> bool:
+        """
+        Check if the Prediction is made by the current Model Version within the freshness threshold
+        """
+        return (
+            not self.stale
+            and self.model_version == registry.version
+            and self.computed_at
+            >= now() - timedelta(seconds=settings.ML_PREDICTION_MAX_AGE)
+        )
+
+
+class DefaultProbability(models.Model):
+    """
+    Class for Default Probability Model, the prediction of the Default Model shared
+    by every Customer with the same features under a Model Version
+    """
+
+    id = models.AutoField(primary_key=True)
+    key = models.CharField(max_length=64, unique=True)
+    probability = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"Default Probability of {self.key} computed at {self.computed_at}"
+
+
+class CollectionVisit(models.Model):
+    """
+    Class for Collection Visit Model, a Customer expected to pay an Agent on a day
+    """
+
+    id = models.AutoField(primary_key=True)
+    agent = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    date = models.DateField()
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    expected_delay = models.FloatField()
+    default_probability = models.FloatField()
+
+    class Meta:
+        """
+        Class for Collection Visit Model Meta Data
+        """
+
+        indexes = [models.Index(fields=["agent", "date"])]
+
+    def __str__(self) -> str:
+        return f"Visit to {self.customer} by {self.agent} on {self.date}"
+
+
+class AreaInflow(models.Model):
+    """
+    Class for Area Inflow Model, the Cash an Area is expected to collect in a week
+    """
+
+    id = models.AutoField(primary_key=True)
+    area = models.ForeignKey(Area, on_delete=models.CASCADE)
+    week = models.DateField()
+    amount = models.FloatField()
+
+    class Meta:
         """
-        Get Payment Due Balance of the Customer
+        Class for Area Inflow Model Meta Data
         """
-        return sum(bill.amount for bill in self.bills) - sum(
-            payment.amount for payment in self.payments
+
+        constraints = [
+            models.UniqueConstraint(fields=["area", "week"], name="unique_area_week")
+        ]
+
+    def __str__(self) -> str:
+        return f"Inflow of {self.area} in the week of {self.week}"
+
+
+class PaymentQuerySet(models.QuerySet):
+    """
+    Class for Payment Query Set
+    """
+
+    def last_payment_days(self, count: int) -> Dict[int, List[int]]:
+        """
+        Get the Payment Day offsets of the last `count` Payments of each Customer,
+        oldest first, keyed by Customer primary key
+
+        The Payments are ranked within each Customer in the database, so every
+        Customer is read in a single query
+        """
+        payments = (
+            self.annotate(
+                customer_id=F("connection__customer"),
+                rank=Window(
+                    RowNumber(),
+                    partition_by=F("connection__customer"),
+                    order_by=[F("date").desc(), F("pk").desc()],
+                ),
+                day_offset=ExtractDay("date")
+                - F("connection__customer__area__collection_date"),
+            )
+            .filter(rank__lte=count)
+            .order_by("customer_id", "date", "pk")
+            .values_list("customer_id", "day_offset")
         )
+        payment_days: Dict[int, List[int]] = {}
+        for customer_id, day_offset in payments:
+            payment_days.setdefault(customer_id, []).append(day_offset)
+        return payment_days
 
 
 class Payment(models.Model):
@@ -496,6 +730,15 @@ class Payment(models.Model):
         validators=[MinValueValidator(0, message="Value has to be a positive number")]
     )
 
+    objects = PaymentQuerySet.as_manager()
+
+    class Meta:
+        """
+        Class for Payment Model Meta Data
+        """
+
+        indexes = [models.Index(fields=["connection", "date"])]
+
     def __str__(self):
         return f"{self.connection.customer.user.get_short_name()} paid {self.amount} on {self.date} to {self.employee.user.get_short_name()}"
 
@@ -529,5 +772,16 @@ class Bill(models.Model):
         validators=[MinValueValidator(0, message="Value has to be a positive number")]
     )
 
+    class Meta:
+        """
+        Class for Bill Model Meta Data
+        """
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["connection", "from_date"], name="unique_bill_period"
+            )
+        ]
+
     def __str__(self):
         return f"{self.connection.customer.user.get_short_name()} billed {self.amount} on {self.date} for the duration from {self.from_date} to {self.to_date}"  # pylint: disable=line-too-long
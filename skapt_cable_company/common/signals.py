@@ -0,0 +1,58 @@
+"""
+Module to contain the Signal Handlers keeping the Balance Ledger of the Customer
+Connections
+"""
+
+# pylint: disable=unused-argument
+
+from typing import Union
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ledger import record_bills, record_payments, recompute_ledger
+from .models import Bill, CustomerConnection, Payment
+
+LEDGER_FIELDS = ("balance", "last_billed_to")
+
+
+def refresh_connection(instance: Union[Bill, Payment]) -> None:
+    """
+    Reload the Ledger of the connection of a Bill or Payment when it is loaded
+    """
+    if type(instance).connection.is_cached(instance):
+        instance.connection.refresh_from_db(fields=LEDGER_FIELDS)
+
+
+@receiver(post_save, sender=Bill)
+def record_bill(sender, instance: Bill, created: bool, **kwargs):
+    """
+    Add a new Bill to the Ledger, or recompute the Ledger of an edited one
+    """
+    if created:
+        record_bills([instance])
+    else:
+        recompute_ledger(CustomerConnection.objects.filter(pk=instance.connection_id))
+    refresh_connection(instance)
+
+
+@receiver(post_save, sender=Payment)
+def record_payment(sender, instance: Payment, created: bool, **kwargs):
+    """
+    Subtract a new Payment from the Ledger, or recompute the Ledger of an edited one
+    """
+    if created:
+        record_payments([instance])
+    else:
+        recompute_ledger(CustomerConnection.objects.filter(pk=instance.connection_id))
+    refresh_connection(instance)
+
+
+@receiver(post_delete, sender=Bill)
+@receiver(post_delete, sender=Payment)
+def remove_entry(sender, instance: Union[Bill, Payment], **kwargs):
+    """
+    Recompute the Ledger of the connection of a deleted Bill or Payment
+    """
+    recompute_ledger(CustomerConnection.objects.filter(pk=instance.connection_id))
+    refresh_connection(instance)
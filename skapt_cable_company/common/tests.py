@@ -2,22 +2,35 @@
 Module for all Common Models Tests
 """
 
-# pylint: disable=imported-auth-user
+# pylint: disable=imported-auth-user,too-many-lines
 
 from time import time
-from typing import List, Union
+from typing import Callable, List, Union
+from unittest.mock import patch
 from random import choices, choice, randint
 from string import ascii_letters
 from datetime import date, datetime, timedelta
+from io import StringIO
 
+from django.apps import apps
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db import connection as db_connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.test.client import RequestFactory
 
+from ml.client import Predictions
 from ml.predictors import DelayPredictor, DefaultPredictor
+from ml.registry import get_delay_predictor
 
+from .billing import generate_area_bills, generate_bills, init_billing_worker
+from .ledger import find_drift, recompute_ledger, record_bills, record_payments
 from .models import (
     CustomerConnection,
+    CustomerPrediction,
     Employee,
     Area,
     Customer,
@@ -27,9 +40,39 @@ from .models import (
 )
 
 
+class InlineProcessPool:
+    """
+    Process Pool running its initializer and tasks in the calling process
+    """
+
+    max_workers = 0
+
+    def __init__(self, max_workers: int, initializer: Callable[[], None]):
+        """
+        Class Initialization
+        """
+        InlineProcessPool.max_workers = max_workers
+        initializer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, function, *iterables):
+        """
+        Run the function over the iterables in turn
+        """
+        return map(function, *iterables)
+
+
+@override_settings(ML_LATENCY_BUDGET_MS=None)
 class BaseTestCase(TestCase):
     """
     Test Case Funcationalites Common for All App Test Cases
+
+    Predictions wait for the Models, which may still be loading in the first test
     """
 
     def setUp(self):
@@ -175,7 +218,7 @@ class BaseTestCase(TestCase):
             bills.append(
                 Bill.objects.create(
                     connection=choice(connections),
-                    from_date=date.today(),
+                    from_date=date.today() - timedelta(days=Bill.objects.count()),
                     to_date=date.today(),
                     amount=randint(1, 100),
                 )
@@ -527,6 +570,130 @@ class CustomerTestCase(BaseTestCase):
             self.assertIn(bill, bills)
 
 
+class BalanceAnnotationTestCase(BaseTestCase):
+    """
+    Test Cases to test the balances summed in the database
+    """
+
+    def test_customer_balances(self):
+        """
+        Test the annotated Customer totals match the summed Bills and Payments
+        """
+        customers = self.generate_customers(3)
+        connections = self.generate_connection(5, customers)
+        self.generate_bills(10, connections)
+        self.generate_payments(10, connections=connections)
+        with self.assertNumQueries(1):
+            annotated = list(Customer.objects.with_balances())
+        for customer in annotated:
+            billed = sum(bill.amount for bill in customer.bills)
+            paid = sum(payment.amount for payment in customer.payments)
+            with self.assertNumQueries(0):
+                self.assertAlmostEqual(customer.total_payment, paid)
+                self.assertAlmostEqual(customer.total_unpaid, billed - paid)
+            customer = Customer.objects.get(pk=customer.pk)
+            with self.assertNumQueries(1):
+                self.assertAlmostEqual(customer.total_unpaid, billed - paid)
+
+    def test_connection_balances(self):
+        """
+        Test the annotated connection balances match the stored Ledger
+        """
+        connections = self.generate_connection(3)
+        self.generate_bills(6, connections)
+        self.generate_payments(6, connections=connections)
+        for connection in CustomerConnection.objects.with_balances():
+            self.assertAlmostEqual(connection.computed_balance, connection.balance)
+            self.assertAlmostEqual(
+                connection.paid,
+                sum(payment.amount for payment in connection.payments),
+            )
+
+
+class CustomerPredictionTestCase(BaseTestCase):
+    """
+    Test Cases to test stored Customer Predictions
+    """
+
+    def test_stored_on_first_access(self):
+        """
+        Test the Predictions are stored on first access
+        """
+        customer = self.generate_customers(1)[0]
+        expected_delay = customer.expected_delay
+        prediction = CustomerPrediction.objects.get(customer=customer)
+        self.assertEqual(prediction.expected_delay, expected_delay)
+        self.assertEqual(prediction.default_probability, customer.default_probability)
+        self.assertEqual(
+            prediction.expected_payment_date, customer.expected_payment_date
+        )
+        self.assertTrue(prediction.is_fresh)
+        self.assertIn(str(customer), str(prediction))
+
+    def test_fresh_prediction_reused(self):
+        """
+        Test a fresh stored Prediction is read without running the models
+        """
+        customer = self.generate_customers(1)[0]
+        expected_delay = customer.expected_delay
+        customer = Customer.objects.get(pk=customer.pk)
+        with patch.object(
+            Customer, "predict_expected_delay", side_effect=AssertionError
+        ):
+            self.assertEqual(customer.expected_delay, expected_delay)
+
+    def test_stale_prediction_recomputed(self):
+        """
+        Test a stale stored Prediction is recomputed
+        """
+        customer = self.generate_customers(1)[0]
+        customer.prediction  # pylint: disable=pointless-statement
+        CustomerPrediction.objects.filter(customer=customer).update(
+            stale=True, expected_delay=-1
+        )
+        customer = Customer.objects.get(pk=customer.pk)
+        self.assertNotEqual(customer.expected_delay, -1)
+        self.assertFalse(CustomerPrediction.objects.get(customer=customer).stale)
+
+    @override_settings(ML_PREDICTION_MAX_AGE=0)
+    def test_expired_prediction(self):
+        """
+        Test a Prediction older than the freshness threshold is not fresh
+        """
+        customer = self.generate_customers(1)[0]
+        prediction = customer.prediction
+        self.assertFalse(prediction.is_fresh)
+        self.assertFalse(CustomerPrediction.objects.fresh().exists())
+
+    def test_other_model_version(self):
+        """
+        Test a Prediction of another Model Version is not fresh
+        """
+        customer = self.generate_customers(1)[0]
+        customer.prediction  # pylint: disable=pointless-statement
+        CustomerPrediction.objects.update(model_version="old")
+        self.assertFalse(CustomerPrediction.objects.get(customer=customer).is_fresh)
+        self.assertFalse(CustomerPrediction.objects.fresh().exists())
+
+    def test_records_predicting_model_version(self):
+        """
+        Test a Prediction records the Model Version which predicted it
+        """
+        customer = self.generate_customers(1)[0]
+        self.assertEqual(
+            customer.prediction.model_version, get_delay_predictor().version
+        )
+        customer = Customer.objects.get(pk=customer.pk)
+        CustomerPrediction.objects.update(stale=True)
+        with patch(
+            "common.models.predict", return_value=Predictions([7.0], "retrained")
+        ):
+            prediction = customer.prediction
+        self.assertEqual(prediction.model_version, "retrained")
+        self.assertEqual(prediction.expected_delay, 7.0)
+        self.assertFalse(prediction.is_fresh)
+
+
 class PaymentTestCase(BaseTestCase):
     """
     Test Cases to test Payment Model
@@ -543,6 +710,32 @@ class PaymentTestCase(BaseTestCase):
             f"{customer_name} paid {payment.amount} on {payment.date} to {payment.employee.user.get_short_name()}",
         )
 
+    def test_last_payment_days(self):
+        """
+        Test the Payment Day offsets of the last Payments of each Customer
+        """
+        customers = self.generate_customers(3)
+        connections = [
+            self.generate_connection(1, [customer])[0] for customer in customers
+        ]
+        start = date(2024, 1, 1)
+        for customer, connection in zip(customers[:2], connections):
+            for payment, day in zip(
+                self.generate_payments(7, connections=[connection]), range(1, 8)
+            ):
+                Payment.objects.filter(pk=payment.pk).update(
+                    date=start.replace(day=day)
+                )
+        with self.assertNumQueries(1):
+            payment_days = Payment.objects.all().last_payment_days(5)
+        self.assertNotIn(customers[2].pk, payment_days)
+        for customer in customers[:2]:
+            collection_date = customer.area.collection_date
+            self.assertEqual(
+                payment_days[customer.pk],
+                [day - collection_date for day in range(3, 8)],
+            )
+
 
 class CustomerConnectionTestCase(BaseTestCase):
     """
@@ -570,14 +763,23 @@ class CustomerConnectionTestCase(BaseTestCase):
 
     def test_bills(self):
         """
-        Test Connection's Bills Populated
+        Test reading the Connection's Bills creates none, and generating them does
         """
         connection = self.generate_connection(1)[0]
         connection.start_date = date.today() - timedelta(days=60)
-        bills = connection.bills
-        db_bills = Bill.objects.filter(connection=connection)
-        for bill in bills:
-            self.assertIn(bill, db_bills)
+        connection.save()
+        self.assertEqual(list(connection.bills), [])
+        self.assertFalse(Bill.objects.filter(connection=connection).exists())
+        self.assertEqual(
+            generate_bills(
+                connections=CustomerConnection.objects.filter(pk=connection.pk)
+            ),
+            1,
+        )
+        self.assertEqual(
+            list(connection.bills), list(Bill.objects.filter(connection=connection))
+        )
+        self.assertEqual(connection.bills.count(), 1)
 
     def test_payments(self):
         """
@@ -615,6 +817,443 @@ class BillTestCase(BaseTestCase):
         )
 
 
+class GenerateBillsTestCase(BaseTestCase):
+    """
+    Test Cases to test the scheduled generation of Monthly Bills
+    """
+
+    def test_missing_periods(self):
+        """
+        Test every missing period of an active connection is billed back to back
+        """
+        connection = self.generate_connection(1)[0]
+        start_date = date.today() - timedelta(days=95)
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            start_date=start_date
+        )
+        self.assertEqual(generate_bills(chunk_size=2), 3)
+        bills = list(Bill.objects.filter(connection=connection).order_by("from_date"))
+        self.assertEqual(
+            [(bill.from_date, bill.to_date) for bill in bills],
+            [
+                (
+                    start_date + timedelta(days=1 + 30 * i),
+                    start_date + timedelta(days=30 * (i + 1)),
+                )
+                for i in range(3)
+            ],
+        )
+        fee = (
+            Bill.DIGITAL_FEE if connection.customer.has_digital_box else Bill.ANALOG_FEE
+        )
+        self.assertTrue(all(bill.amount == fee for bill in bills))
+        self.assertEqual(generate_bills(), 0)
+
+    def test_continues_from_latest_bill(self):
+        """
+        Test the billing continues from the latest billed date
+        """
+        connection = self.generate_connection(1)[0]
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            start_date=date.today() - timedelta(days=200)
+        )
+        latest_date = date.today() - timedelta(days=40)
+        Bill.objects.create(
+            connection=connection,
+            from_date=latest_date - timedelta(days=29),
+            to_date=latest_date,
+            amount=0,
+        )
+        self.assertEqual(generate_bills(), 1)
+        latest_bill = connection.bills.first()
+        self.assertEqual(latest_bill.from_date, latest_date + timedelta(days=1))
+
+    def test_inactive_connection(self):
+        """
+        Test inactive connections are not billed
+        """
+        connection = self.generate_connection(1)[0]
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            active=False, start_date=date.today() - timedelta(days=95)
+        )
+        self.assertEqual(generate_bills(), 0)
+
+    def test_bills_read_only(self):
+        """
+        Test reading the Bills of a connection does not generate them
+        """
+        connection = self.generate_connection(1)[0]
+        connection.start_date = date.today() - timedelta(days=95)
+        connection.save()
+        with self.assertNumQueries(1):
+            self.assertFalse(connection.bills.exists())
+
+    def test_overlapping_runs(self):
+        """
+        Test periods billed by a concurrent run are skipped without duplicates
+        """
+        connection = self.generate_connection(1)[0]
+        start_date = date.today() - timedelta(days=95)
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            start_date=start_date
+        )
+        Bill.objects.bulk_create(
+            [
+                Bill(
+                    connection=connection,
+                    from_date=start_date + timedelta(days=1),
+                    to_date=start_date + timedelta(days=30),
+                    amount=0,
+                )
+            ]
+        )
+        self.assertEqual(generate_bills(), 2)
+        self.assertEqual(Bill.objects.filter(connection=connection).count(), 3)
+        self.assertEqual(find_drift(), [])
+
+    def test_concurrent_insert_not_counted(self):
+        """
+        Test a period billed by a concurrent run between chunks is neither
+        duplicated nor counted, while the rest of its chunk is
+        """
+        connections = self.generate_connection(2)
+        start_date = date.today() - timedelta(days=65)
+        CustomerConnection.objects.update(start_date=start_date)
+
+        def bill_concurrently(chunk_connections):
+            if not Bill.objects.filter(connection=connections[1]).exists():
+                Bill.objects.bulk_create(
+                    [
+                        Bill(
+                            connection=connections[1],
+                            from_date=start_date + timedelta(days=1),
+                            to_date=start_date + timedelta(days=30),
+                            amount=0,
+                        )
+                    ]
+                )
+            return recompute_ledger(chunk_connections)
+
+        with patch("common.billing.recompute_ledger", side_effect=bill_concurrently):
+            self.assertEqual(generate_bills(chunk_size=2), 3)
+        self.assertEqual(Bill.objects.count(), 4)
+        self.assertEqual(find_drift(), [])
+
+    def test_unique_period(self):
+        """
+        Test a connection can not be billed twice for the same period
+        """
+        bill = self.generate_bills(1)[0]
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Bill.objects.create(
+                connection=bill.connection,
+                from_date=bill.from_date,
+                to_date=bill.to_date,
+                amount=bill.amount,
+            )
+
+    def test_generate_bill_conflict(self):
+        """
+        Test generating a Bill for an already billed period returns the stored Bill
+        """
+        connection = self.generate_connection(1)[0]
+        latest_bill = connection.generate_bill()
+        stored_bill = Bill.objects.create(
+            connection=connection,
+            from_date=latest_bill.to_date + timedelta(days=1),
+            to_date=latest_bill.from_date,
+            amount=0,
+        )
+        self.assertEqual(connection.generate_bill(), stored_bill)
+        self.assertEqual(Bill.objects.filter(connection=connection).count(), 2)
+
+    def test_command(self):
+        """
+        Test the generate_bills command reports the Bills generated
+        """
+        connection = self.generate_connection(1)[0]
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            start_date=date.today() - timedelta(days=65)
+        )
+        out = StringIO()
+        call_command("generate_bills", "--chunk-size", "1", stdout=out)
+        self.assertIn(f"{connection.customer.area.name}: 2 Bills in", out.getvalue())
+        self.assertIn("Generated 2 Bills", out.getvalue())
+
+    def test_area_bills(self):
+        """
+        Test the Bills are reported for every Area
+        """
+        areas = self.generate_areas(3)
+        connections = self.generate_connection(6, self.generate_customers(6, areas))
+        CustomerConnection.objects.update(start_date=date.today() - timedelta(days=65))
+        billings = generate_area_bills(workers=1)
+        self.assertEqual(
+            [billing.area_id for billing in billings],
+            sorted(area.pk for area in areas),
+        )
+        for billing in billings:
+            self.assertEqual(
+                billing.bills,
+                2
+                * sum(
+                    connection.customer.area_id == billing.area_id
+                    for connection in connections
+                ),
+            )
+            self.assertGreaterEqual(billing.seconds, 0)
+        self.assertEqual(Bill.objects.count(), 2 * len(connections))
+        self.assertEqual(find_drift(), [])
+
+    def test_area_bills_sqlite(self):
+        """
+        Test parallel workers bill the Areas in a single process on SQLite
+        """
+        areas = self.generate_areas(2)
+        connections = self.generate_connection(4, self.generate_customers(4, areas))
+        CustomerConnection.objects.update(start_date=date.today() - timedelta(days=65))
+        with patch("common.billing.ProcessPoolExecutor") as executor, self.assertLogs(
+            "common.billing", "WARNING"
+        ):
+            billings = generate_area_bills(workers=2)
+        executor.assert_not_called()
+        self.assertEqual(len(billings), len(areas))
+        self.assertEqual(
+            sum(billing.bills for billing in billings), 2 * len(connections)
+        )
+        self.assertEqual(find_drift(), [])
+
+    def test_area_bills_pool(self):
+        """
+        Test the Areas are billed in a pool of set up workers on other databases
+        """
+        areas = self.generate_areas(2)
+        connections = self.generate_connection(4, self.generate_customers(4, areas))
+        CustomerConnection.objects.update(start_date=date.today() - timedelta(days=65))
+        with patch(
+            "common.billing.supports_parallel_billing", return_value=True
+        ), patch("common.billing.ProcessPoolExecutor", InlineProcessPool):
+            billings = generate_area_bills(workers=2)
+        self.assertEqual(InlineProcessPool.max_workers, 2)
+        self.assertEqual(
+            [billing.area_id for billing in billings],
+            sorted(area.pk for area in areas),
+        )
+        self.assertEqual(
+            sum(billing.bills for billing in billings), 2 * len(connections)
+        )
+        self.assertEqual(find_drift(), [])
+
+    def test_billing_worker_setup(self):
+        """
+        Test a spawned billing worker sets Django up before using the database
+        """
+        with patch.object(apps, "ready", False), patch("django.setup") as setup:
+            init_billing_worker()
+        setup.assert_called_once()
+
+
+class LedgerTestCase(BaseTestCase):
+    """
+    Test Cases to test the Balance Ledger of the connections
+    """
+
+    def test_records_bills_and_payments(self):
+        """
+        Test written Bills and Payments update the stored Ledger
+        """
+        connection = self.generate_connection(1)[0]
+        bills = self.generate_bills(3, connections=[connection])
+        payments = self.generate_payments(3, connections=[connection])
+        balance = sum(bill.amount for bill in bills) - sum(
+            payment.amount for payment in payments
+        )
+        self.assertEqual(connection.balance, balance)
+        self.assertEqual(connection.last_billed_to, date.today())
+        connection = CustomerConnection.objects.get(pk=connection.pk)
+        self.assertEqual(connection.balance, balance)
+        self.assertEqual(find_drift(), [])
+
+    def test_edits_and_deletes(self):
+        """
+        Test edited and deleted Bills and Payments recompute the Ledger
+        """
+        connection = self.generate_connection(1)[0]
+        bill = self.generate_bills(1, connections=[connection])[0]
+        payment = self.generate_payments(1, connections=[connection])[0]
+        payment.amount += 10
+        payment.save()
+        self.assertEqual(connection.balance, bill.amount - payment.amount)
+        bill.delete()
+        self.assertEqual(connection.balance, -payment.amount)
+        self.assertIsNone(connection.last_billed_to)
+        self.assertEqual(find_drift(), [])
+
+    def test_edited_bill(self):
+        """
+        Test an edited Bill recomputes the Ledger
+        """
+        connection = self.generate_connection(1)[0]
+        bill = self.generate_bills(1, connections=[connection])[0]
+        bill.amount += 10
+        bill.to_date += timedelta(days=5)
+        bill.save()
+        self.assertEqual(connection.balance, bill.amount)
+        self.assertEqual(connection.last_billed_to, bill.to_date)
+        self.assertEqual(find_drift(), [])
+
+    def test_no_entries(self):
+        """
+        Test recording no Bills or Payments updates nothing
+        """
+        with self.assertNumQueries(0):
+            record_bills([])
+            record_payments([])
+
+    def test_generated_bills(self):
+        """
+        Test the Bills of the billing run are recorded in the Ledger
+        """
+        connection = self.generate_connection(1)[0]
+        start_date = date.today() - timedelta(days=65)
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            start_date=start_date
+        )
+        generate_bills(chunk_size=1)
+        connection.refresh_from_db()
+        fee = (
+            Bill.DIGITAL_FEE if connection.customer.has_digital_box else Bill.ANALOG_FEE
+        )
+        self.assertEqual(connection.balance, 2 * fee)
+        self.assertEqual(connection.last_billed_to, start_date + timedelta(days=60))
+        self.assertEqual(find_drift(), [])
+
+    def test_rebuild(self):
+        """
+        Test the rebuild_ledger command reports and repairs drifted connections
+        """
+        connection = self.generate_connection(1)[0]
+        bill = self.generate_bills(1, connections=[connection])[0]
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            balance=F("balance") + 5, last_billed_to=None
+        )
+        out = StringIO()
+        call_command("rebuild_ledger", "--check", stdout=out)
+        self.assertIn("Found 1 drifted connections", out.getvalue())
+        self.assertEqual(len(find_drift()), 1)
+        out = StringIO()
+        call_command("rebuild_ledger", stdout=out)
+        self.assertIn("Repaired 1 drifted connections", out.getvalue())
+        self.assertEqual(find_drift(), [])
+        connection.refresh_from_db()
+        self.assertEqual(connection.balance, bill.amount)
+        self.assertEqual(connection.last_billed_to, bill.to_date)
+
+
+class BillPeriodMigrationTestCase(TransactionTestCase):
+    """
+    Test Cases to test the duplicated Bills of a period are removed by the
+    migration adding the unique period constraint
+    """
+
+    before = [("common", "0012_customerconnection_ledger")]
+    after = [("common", "0013_bill_unique_period")]
+
+    def setUp(self):
+        """
+        Migrate back before the constraint and seed a Bill of a connection
+        """
+        executor = MigrationExecutor(db_connection)
+        executor.migrate(self.before)
+        self.apps = executor.loader.project_state(self.before).apps
+        user = User.objects.create_user(username="agent", password="top_secret")
+        agent = self.apps.get_model("common", "Employee").objects.create(
+            user_id=user.pk, phone_number="0771234567"
+        )
+        user = User.objects.create_user(username="customer", password="top_secret")
+        customer = self.apps.get_model("common", "Customer").objects.create(
+            user_id=user.pk,
+            phone_number="0771234568",
+            address="Address",
+            identity_no="199912345678",
+            customer_number="C1",
+            area=self.apps.get_model("common", "Area").objects.create(
+                name="Area", agent=agent
+            ),
+        )
+        self.connection = self.apps.get_model(
+            "common", "CustomerConnection"
+        ).objects.create(customer=customer, box_ca_number="BOX1")
+        self.bill = self.create_bill(100)
+
+    def tearDown(self):
+        """
+        Migrate forward to the latest migrations
+        """
+        executor = MigrationExecutor(db_connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_bill(self, amount: float):
+        """
+        Create a Bill of the seeded period without the Ledger signals
+        """
+        return self.apps.get_model("common", "Bill").objects.create(
+            connection=self.connection,
+            from_date=date(2024, 1, 1),
+            to_date=date(2024, 1, 30),
+            amount=amount,
+        )
+
+    def migrate(self):
+        """
+        Apply the migration adding the constraint
+        """
+        MigrationExecutor(db_connection).migrate(self.after)
+
+    def test_removes_duplicates(self):
+        """
+        Test the duplicates of a period are removed, reported and the Ledger recomputed
+        """
+        duplicate = self.create_bill(100)
+        with self.assertLogs(
+            "common.migrations.0013_bill_unique_period", "WARNING"
+        ) as logs:
+            self.migrate()
+        self.assertEqual(
+            logs.output,
+            [
+                "WARNING:common.migrations.0013_bill_unique_period:Removed duplicate"
+                f" Bill {duplicate.pk} of 100.0 of connection {self.connection.pk}"
+                " from 2024-01-01"
+            ],
+        )
+        connection = CustomerConnection.objects.get(pk=self.connection.pk)
+        self.assertEqual(
+            list(connection.bills.values_list("pk", flat=True)), [self.bill.pk]
+        )
+        self.assertEqual(connection.balance, 100)
+        self.assertEqual(connection.last_billed_to, date(2024, 1, 30))
+
+    def test_conflicting_duplicates(self):
+        """
+        Test the migration aborts when the duplicates of a period differ in amount,
+        and applies once they are resolved
+        """
+        conflict = self.create_bill(50)
+        with self.assertRaisesMessage(
+            RuntimeError,
+            f"connection {self.connection.pk} from 2024-01-01: Bill {self.bill.pk}"
+            f" of 100.0, Bill {conflict.pk} of 50.0",
+        ):
+            self.migrate()
+        self.assertEqual(self.apps.get_model("common", "Bill").objects.count(), 2)
+        conflict.delete()
+        self.migrate()
+        self.assertEqual(
+            CustomerConnection.objects.get(pk=self.connection.pk).bills.count(), 1
+        )
+
+
 class PaginationHandleTestCase(BaseTestCase):
     """
     Test Cases to test Pagination Handler
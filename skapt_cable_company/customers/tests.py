@@ -4,13 +4,22 @@ Module to contain all Customers App View Controller Codes
 
 # pylint: disable=imported-auth-user
 
-from datetime import date
+from datetime import date, timedelta
+from time import sleep
+from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection as db_connection
+from django.db.models import F
 from django.forms import Form
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
+from common.billing import generate_bills
+from common.ledger import find_drift
 from common.tests import BaseTestCase
-from common.models import Customer, Area, CustomerConnection
+from common.models import Customer, Area, CustomerConnection, CustomerPrediction
 
 
 class CustomerBaseTestCase(BaseTestCase):
@@ -100,6 +109,88 @@ class CustomersTestCase(CustomerBaseTestCase):
         )
         self.assertEqual(response.context["customers"][0].pk, customers[0].pk)
 
+    def test_unpaid_balances(self):
+        """
+        Test the unpaid balances of a page are summed without a query per customer
+        """
+        customers = self.generate_customers(3)
+        connections = self.generate_connection(6, customers)
+        self.generate_bills(10, connections)
+        self.generate_payments(10, connections=connections)
+        self.login_as_superuser()
+        with CaptureQueriesContext(db_connection) as first_queries:
+            response = self.client.get("/customers/")
+        for customer in response.context["customers"]:
+            self.assertAlmostEqual(
+                customer.total_unpaid,
+                sum(bill.amount for bill in customer.bills) - customer.total_payment,
+            )
+        self.generate_customers(5)
+        with CaptureQueriesContext(db_connection) as second_queries:
+            self.client.get("/customers/")
+        self.assertEqual(len(first_queries), len(second_queries))
+
+
+class PortfolioRiskTestCase(CustomerBaseTestCase):
+    """
+    Test Cases for testing the Portfolio Risk Page
+    """
+
+    def setUp(self):
+        """
+        Setup Portfolio Risk Testings
+        """
+        super().setUp()
+        self.customers = self.generate_customers()
+        self.url = "/customers/risk"
+
+    def test_page_renders_for_employees(self):
+        """
+        Test the Portfolio Risk page renders every Customer for employees
+        """
+        self.login_as_employee()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "risk.html")
+        self.assertEqual(len(response.context["risks"]), len(self.customers))
+        self.assertContains(response, "Not predicted")
+
+    def test_filters(self):
+        """
+        Test the Portfolio Risk page filters by Area and Agent
+        """
+        area = self.customers[0].area
+        self.login_as_superuser()
+        response = self.client.get(self.url, {"area": area.pk, "agent": area.agent.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {risk["customer_id"] for risk in response.context["risks"]},
+            set(area.customers.values_list("pk", flat=True)),
+        )
+        self.assertEqual(response.context["area_id"], area.pk)
+
+    def test_invalid_filter(self):
+        """
+        Test the Portfolio Risk page rejects filters which are not primary keys
+        """
+        self.login_as_superuser()
+        response = self.client.get(self.url, {"area": "kallady"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_accessible(self):
+        """
+        Test the Portfolio Risk page does not render for non-employees
+        """
+        self.helper_non_render_test(self.url, True, False)
+
+    def test_other_request_method(self):
+        """
+        Test the Portfolio Risk page only renders for GET requests
+        """
+        self.login_as_superuser()
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 400)
+
 
 class AddCustomerTestCase(CustomerBaseTestCase):
     """
@@ -389,6 +480,94 @@ class ViewCustomerTestCase(CustomerBaseTestCase):
         response = self.client.get(f"/customers/{pk}")
         self.assertEqual(response.status_code, 404)
 
+    def test_predictions_loaded_separately(self):
+        """
+        Test the page renders without computing the Predictions
+        """
+        self.login_as_superuser()
+        with patch.object(
+            Customer, "predict_expected_delay", side_effect=AssertionError
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"{self.url}/predictions")
+
+
+class CustomerPredictionsTestCase(CustomerBaseTestCase):
+    """
+    Test cases for the Customer Predictions JSON View Controller
+    """
+
+    def setUp(self):
+        """
+        Setup Customer Predictions Testings
+        """
+        super().setUp()
+        self.customer = self.generate_customers(1)[0]
+        self.url = f"/customers/{self.customer.user.pk}/predictions"
+
+    def test_predictions(self):
+        """
+        Test the stored Predictions of the customer are returned
+        """
+        self.login_as_superuser()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        prediction = CustomerPrediction.objects.get(customer=self.customer)
+        data = response.json()
+        self.assertEqual(data["expected_delay"], prediction.expected_delay)
+        self.assertEqual(data["default_probability"], prediction.default_probability)
+        self.assertEqual(
+            data["expected_payment_date"], prediction.expected_payment_date.isoformat()
+        )
+        self.assertEqual(data["model_version"], prediction.model_version)
+
+    def test_cache_headers(self):
+        """
+        Test the Predictions may be reused privately by the browser
+        """
+        self.login_as_customer(self.customer)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn(
+            f"max-age={settings.ML_PREDICTION_HTTP_MAX_AGE}", response["Cache-Control"]
+        )
+        self.assertTrue(response.has_header("Last-Modified"))
+
+    def test_fallback_not_cached(self):
+        """
+        Test Predictions falling back to the Priors are not reused by the browser
+        """
+        self.login_as_superuser()
+        with override_settings(ML_LATENCY_BUDGET_MS=10), patch(
+            "ml.server.predict_rows", side_effect=lambda *args: sleep(1)
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["fallback"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_not_accessible(self):
+        """
+        Test the Predictions are not returned to non-employees
+        """
+        self.login_as_non_employee()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(
+            CustomerPrediction.objects.filter(customer=self.customer).exists()
+        )
+
+    def test_non_exist_customer(self):
+        """
+        Test the Predictions of a not existing customer
+        """
+        self.login_as_superuser()
+        response = self.client.get(f"/customers/{self.customer.user.pk}0/predictions")
+        self.assertEqual(response.status_code, 404)
+
 
 class UpdateCustomerTestCase(CustomerBaseTestCase):
     """
@@ -681,6 +860,54 @@ class ConnectionTestCase(CustomerBaseTestCase):
         self.client.get(url)
         self.assertTrue(CustomerConnection.objects.get(pk=connection.pk).active)
 
+    def test_toggle_then_bill(self):
+        """
+        Test the billing run bills a connection disabled and enabled through the views
+        """
+        self.login_as_employee(self.customer.agent)
+        connection = CustomerConnection.objects.create(customer=self.customer)
+        CustomerConnection.objects.filter(pk=connection.pk).update(
+            start_date=date.today() - timedelta(days=40)
+        )
+        url = f"/customers/{self.customer.user.pk}/{connection.pk}"
+        self.client.get(f"{url}/disableConnection")
+        connection.refresh_from_db()
+        self.assertEqual(connection.last_billed_to, date.today())
+        self.client.get(f"{url}/enableConnection")
+        self.assertEqual(connection.bills.count(), 1)
+        self.assertEqual(generate_bills(), 0)
+        self.assertEqual(generate_bills(date.today() + timedelta(days=45)), 1)
+        self.assertEqual(
+            connection.bills.first().from_date, date.today() + timedelta(days=1)
+        )
+        self.assertEqual(find_drift(), [])
+
+    def test_toggle_keeps_ledger(self):
+        """
+        Test enabling or disabling a connection keeps a Ledger written meanwhile
+        """
+        self.login_as_employee(self.customer.agent)
+        connection = CustomerConnection.objects.create(customer=self.customer)
+        get_connection = CustomerConnection.objects.get
+
+        def get_then_record(*args, **kwargs):
+            loaded = get_connection(*args, **kwargs)
+            CustomerConnection.objects.filter(pk=connection.pk).update(
+                balance=F("balance") + 100
+            )
+            return loaded
+
+        for action in ("disableConnection", "enableConnection"):
+            with patch.object(
+                CustomerConnection.objects, "get", side_effect=get_then_record
+            ):
+                self.client.get(
+                    f"/customers/{self.customer.user.pk}/{connection.pk}/{action}"
+                )
+        connection = CustomerConnection.objects.with_balances().get(pk=connection.pk)
+        self.assertTrue(connection.active)
+        self.assertEqual(connection.balance, connection.computed_balance + 200)
+
     def test_duplicate_card_connection(self):
         """
         Test if system gracefully fails duplicate card connection register request
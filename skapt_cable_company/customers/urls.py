@@ -9,7 +9,13 @@ from . import views
 urlpatterns = [
     path("", views.index, name="index"),
     path("add", views.add_customer, name="add Customer"),
+    path("risk", views.portfolio_risk, name="Portfolio Risk"),
     path("<str:username>", views.view_customer, name="View Customer"),
+    path(
+        "<str:username>/predictions",
+        views.customer_predictions,
+        name="Customer Predictions",
+    ),
     path("<str:username>/update", views.update_customer, name="Update Customer"),
     path(
         "<str:username>/addConnection",
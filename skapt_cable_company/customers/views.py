@@ -5,26 +5,31 @@ Module to contain all Customer View Controller Codes
 # pylint: disable=imported-auth-user
 
 from datetime import datetime
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, HttpRequest
+from django.http import HttpResponse, HttpRequest, JsonResponse
 from django.template import loader
 from django.core.exceptions import BadRequest, PermissionDenied
 from django.shortcuts import redirect, get_object_or_404
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.contrib.auth.models import User
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.utils.http import http_date
 
 from common.models import (
     Bill,
     Customer,
     Area,
     CustomerConnection,
+    Employee,
     query_or_logic,
     pagination_handle,
 )
 from common.form import UserBaseForm
 
 from employees.models import get_employee_or_super_admin, get_admin_employee
+from ml.portfolio import get_portfolio_risk
 
 from .forms import CustomerForm
 from .models import generate_customer_number
@@ -67,7 +72,7 @@ def index(request: HttpRequest):
                 .select_related("area__agent__user")
             )
             # pylint: enable=unsupported-binary-operation
-        p = Paginator(customers, size)
+        p = Paginator(customers.with_balances(), size)
         return HttpResponse(
             template.render(
                 {
@@ -80,6 +85,46 @@ def index(request: HttpRequest):
     raise BadRequest
 
 
+def get_filter_id(request: HttpRequest, name: str):
+    """
+    Get an optional primary key filter from the query string
+    """
+    value = request.GET.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise BadRequest
+    return int(value)
+
+
+@login_required
+def portfolio_risk(request: HttpRequest):
+    """
+    Portfolio Risk Page View Controller
+    """
+    if request.method == "GET":
+        template = loader.get_template("risk.html")
+        size, page_number = pagination_handle(request)
+        get_employee_or_super_admin(request)
+        area_id = get_filter_id(request, "area")
+        agent_id = get_filter_id(request, "agent")
+        p = Paginator(get_portfolio_risk(area_id, agent_id), size)
+        return HttpResponse(
+            template.render(
+                {
+                    "paginator": p,
+                    "risks": p.page(page_number),
+                    "areas": Area.objects.order_by("name"),
+                    "agents": Employee.objects.select_related("user"),
+                    "area_id": area_id,
+                    "agent_id": agent_id,
+                },
+                request,
+            )
+        )
+    raise BadRequest
+
+
 @login_required
 def add_customer(request: HttpRequest):
     """
@@ -147,6 +192,35 @@ def view_customer(request: HttpRequest, username: str):
     raise PermissionDenied
 
 
+@login_required
+def customer_predictions(request: HttpRequest, username: str):
+    """
+    Customer Predictions JSON View Controller
+    """
+    customer = get_object_or_404(Customer, pk=username)
+    if customer.is_accessible(request.user):
+        prediction = customer.prediction
+        response = JsonResponse(
+            {
+                "expected_delay": prediction.expected_delay,
+                "expected_payment_date": prediction.expected_payment_date,
+                "default_probability": prediction.default_probability,
+                "model_version": prediction.model_version,
+                "computed_at": prediction.computed_at,
+                "fallback": prediction.fallback,
+            }
+        )
+        if prediction.fallback:
+            add_never_cache_headers(response)
+            return response
+        patch_cache_control(
+            response, private=True, max_age=settings.ML_PREDICTION_HTTP_MAX_AGE
+        )
+        response["Last-Modified"] = http_date(prediction.computed_at.timestamp())
+        return response
+    raise PermissionDenied
+
+
 @login_required
 def update_customer(request: HttpRequest, username: str):
     """
@@ -218,7 +292,7 @@ def enable_connection(request: HttpRequest, username: str, connection_id: int):
     if customer.is_editable(request.user):
         connection = CustomerConnection.objects.get(pk=connection_id, customer=customer)
         connection.active = True
-        connection.save()
+        connection.save(update_fields=["active"])
         connection.generate_bill(
             end_date=datetime.now(),
             billing_amount=0,
@@ -237,7 +311,7 @@ def disable_connection(request: HttpRequest, username: str, connection_id: int):
     if customer.is_editable(request.user):
         connection = CustomerConnection.objects.get(pk=connection_id, customer=customer)
         connection.active = False
-        connection.save()
+        connection.save(update_fields=["active"])
         connection.generate_bill(
             end_date=datetime.now(),
             description=Bill.DescriptionChoices.ZeroDisconnection,
@@ -4,12 +4,15 @@ Module for all the Employees Related Test Cases
 
 # pylint: disable=imported-auth-user
 
+from datetime import date
+
 from django.contrib.auth.models import User
 from django.forms import Form
 
 
-from common.models import Employee
+from common.models import CollectionVisit, Employee
 from common.tests import BaseTestCase
+from ml.worklists import build_worklists
 
 
 class EmployeeBaseTestCase(BaseTestCase):
@@ -319,6 +322,63 @@ class ViewEmployeeTestCase(EmployeeBaseTestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class WorklistTestCase(EmployeeBaseTestCase):
+    """
+    Test cases for the Employee Daily Collection Worklist Page
+    """
+
+    def setUp(self):
+        """
+        Build the Worklists of the Agents of a few Customers
+        """
+        super().setUp()
+        self.customers = self.generate_customers()
+        build_worklists()
+        self.visit = CollectionVisit.objects.first()
+        self.url = f"/employees/{self.visit.agent.user.username}/worklist"
+
+    def test_page_renders_for_agent(self):
+        """
+        Test the Agent sees the Customers expected to pay on a day
+        """
+        self.login_as_employee(self.visit.agent)
+        response = self.client.get(self.url, {"date": self.visit.date.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "worklist.html")
+        self.assertEqual(
+            {visit.customer.pk for visit in response.context["visits"]},
+            set(
+                CollectionVisit.objects.filter(
+                    agent=self.visit.agent, date=self.visit.date
+                ).values_list("customer", flat=True)
+            ),
+        )
+        self.assertContains(response, self.visit.customer.phone_number)
+
+    def test_today_by_default(self):
+        """
+        Test the Worklist of today is shown without a date
+        """
+        self.login_as_superuser()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["date"], date.today())
+
+    def test_invalid_date(self):
+        """
+        Test the Worklist rejects dates which are not ISO formatted
+        """
+        self.login_as_superuser()
+        response = self.client.get(self.url, {"date": "tomorrow"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_admin_other_page_not_renders(self):
+        """
+        Test the Worklist does not render for other non-admin employees
+        """
+        self.helper_non_render_test(self.url, True, True)
+
+
 class UpdateEmployeeTestCase(EmployeeBaseTestCase):
     """
     Testcase for Update Employee UI and Functionality
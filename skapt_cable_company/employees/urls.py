@@ -11,4 +11,5 @@ urlpatterns = [
     path("add", views.add_employee, name="add Employee"),
     path("<str:username>", views.view_employee, name="View Employee"),
     path("<str:username>/update", views.update_employee, name="Update Employee"),
+    path("<str:username>/worklist", views.worklist, name="Employee Worklist"),
 ]
@@ -4,6 +4,8 @@ Module to contain all Employees App View Controller Codes
 
 # pylint: disable=imported-auth-user
 
+from datetime import date
+
 from django.http import HttpResponse, HttpRequest
 from django.template import loader
 from django.contrib.auth.decorators import login_required
@@ -12,7 +14,7 @@ from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth.models import User
 from django.db.models import Count
 
-from common.models import Employee
+from common.models import CollectionVisit, Employee
 from common.form import UserBaseForm
 
 from .models import get_employee_or_super_admin, get_employee
@@ -149,3 +151,29 @@ def update_employee(request: HttpRequest, username: str):
             )
         )
     raise PermissionDenied
+
+
+@login_required
+def worklist(request: HttpRequest, username: str):
+    """
+    Employee Daily Collection Worklist Page View Controller
+    """
+    template = loader.get_template("worklist.html")
+    employee = get_object_or_404(Employee, user__username=username)
+    request_employee = get_employee_or_super_admin(request)
+    if employee.is_accessible(request_employee):
+        try:
+            day = date.fromisoformat(request.GET.get("date", date.today().isoformat()))
+        except ValueError as exc:
+            raise BadRequest from exc
+        visits = (
+            CollectionVisit.objects.filter(agent=employee, date=day)
+            .select_related("customer", "customer__user", "customer__area")
+            .order_by("-default_probability")
+        )
+        return HttpResponse(
+            template.render(
+                {"employee": employee, "date": day, "visits": visits}, request
+            )
+        )
+    raise PermissionDenied
@@ -9,4 +9,10 @@ class MlConfig(AppConfig):
     """
 
     default_auto_field = "django.db.models.BigAutoField"
-    name = "ML"
+    name = "ml"
+
+    def ready(self) -> None:
+        """
+        Connect the Signal Handlers once the Apps are loaded
+        """
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
@@ -0,0 +1,199 @@
+"""
+Module to export and load the Memory Mapped Model Artifacts
+
+An artifact directory holds one .npy file per model array and a manifest naming
+the arrays and scalar parameters of every model. The arrays are opened memory
+mapped, so every worker process reads the same page cache pages instead of
+keeping its own unpickled copy of the models
+
+Each Model Version is published to its own directory under ML_ARTIFACT_DIR and
+a CURRENT file names the version in use. A published directory is never
+written again, so running processes keep reading their mapped arrays while the
+CURRENT file is switched to a new version
+
+A Model Version may also hold compact surrogates of its Models, which are used
+instead of the full Models when ML_COMPACT_MODELS is set
+
+Reading the Manifest and the Model Version stays free of NumPy, so stored
+predictions can be checked without importing the ML stack
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+from django.conf import settings
+
+MANIFEST_NAME = "manifest.json"
+CURRENT_NAME = "CURRENT"
+COMPACT_SUFFIX = "_compact"
+DELAY_PICKLES = ("grad_boost_model.pkl",)
+DEFAULT_PICKLES = ("SVC.pkl", "standard_scaler.pkl")
+
+
+def get_artifact_dir() -> Path:
+    """
+    Get the Directory of the Memory Mapped Model Artifacts
+    """
+    return Path(settings.ML_ARTIFACT_DIR)
+
+
+def get_pickle_version(
+    pickle_names: Iterable[str] = DELAY_PICKLES + DEFAULT_PICKLES,
+) -> str:
+    """
+    Get the Model Version of the pickled Model artifacts, a digest of their content
+    """
+    digest = sha256()
+    for pickle_name in pickle_names:
+        with open(f"{settings.BASE_DIR}//ml//{pickle_name}", "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def get_current_dir(root: Union[Path, None] = None) -> Union[Path, None]:
+    """
+    Get the Directory of the current Model Version, None if nothing is exported
+
+    A manifest directly under the root is a single unversioned export
+    """
+    root = root or get_artifact_dir()
+    current_path = root / CURRENT_NAME
+    if current_path.exists():
+        return root / current_path.read_text(encoding="utf-8").strip()
+    if (root / MANIFEST_NAME).exists():
+        return root
+    return None
+
+
+def read_manifest(directory: Union[Path, None] = None) -> Union[dict, None]:
+    """
+    Read the Manifest of an artifact directory, the current one by default
+
+    None if the directory has not been exported
+    """
+    directory = directory or get_current_dir()
+    if directory is None or not (directory / MANIFEST_NAME).exists():
+        return None
+    with open(directory / MANIFEST_NAME, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_model_name(manifest: dict, name: str) -> str:
+    """
+    Get the Manifest entry of a Model, its compact surrogate when one is selected
+    """
+    compact_name = f"{name}{COMPACT_SUFFIX}"
+    if settings.ML_COMPACT_MODELS and compact_name in manifest["models"]:
+        return compact_name
+    return name
+
+
+def get_version(directory: Union[Path, None]) -> str:
+    """
+    Get the Model Version of an artifact directory, or of the pickles without one
+
+    The compact surrogates predict differently, so their version is told apart
+    """
+    manifest = None if directory is None else read_manifest(directory)
+    if manifest is None:
+        return get_pickle_version()
+    if settings.ML_COMPACT_MODELS and any(
+        name.endswith(COMPACT_SUFFIX) for name in manifest["models"]
+    ):
+        return f"{manifest['version']}-compact"
+    return manifest["version"]
+
+
+def export_artifacts(
+    models: Dict[str, object],
+    directory: Path,
+    version: str,
+    features: Union[dict, None] = None,
+):
+    """
+    Write the arrays of compiled Models and their Manifest to an artifact directory
+
+    Fitted Feature parameters, when given, are kept in the Manifest next to the
+    Models. The Manifest is written last and atomically so readers never see a
+    partial export
+    """
+    from numpy import ascontiguousarray, save
+
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest: dict = {"version": version, "models": {}}
+    for name, model in models.items():
+        arrays = {}
+        for array_name, value in model.arrays.items():  # type: ignore
+            file_name = f"{name}.{array_name}.npy"
+            save(directory / file_name, ascontiguousarray(value))
+            arrays[array_name] = file_name
+        manifest["models"][name] = {
+            "type": type(model).__name__,
+            "arrays": arrays,
+            "parameters": model.parameters,  # type: ignore
+        }
+    if features is not None:
+        manifest["features"] = features
+    temporary_path = directory / f"{MANIFEST_NAME}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary_path, directory / MANIFEST_NAME)
+    return manifest
+
+
+def publish_artifacts(
+    models: Dict[str, object],
+    version: str,
+    root: Union[Path, None] = None,
+    features: Union[dict, None] = None,
+) -> dict:
+    """
+    Export compiled Models as a new Model Version and make it the current one
+
+    A version which is already exported is only made current again, so its
+    arrays are never rewritten under the processes mapping them
+    """
+    root = root or get_artifact_dir()
+    manifest = read_manifest(root / version)
+    if manifest is None:
+        manifest = export_artifacts(models, root / version, version, features)
+    temporary_path = root / f"{CURRENT_NAME}.tmp"
+    temporary_path.write_text(version, encoding="utf-8")
+    os.replace(temporary_path, root / CURRENT_NAME)
+    return manifest
+
+
+def load_model(manifest: dict, name: str, directory: Union[Path, None] = None):
+    """
+    Load a compiled Model of a Manifest with its arrays memory mapped read only
+    """
+    from numpy import load
+
+    from .compiled import (
+        CompiledGradientBoosting,
+        CompiledKernelApproximation,
+        CompiledStandardScaler,
+        CompiledSVC,
+    )
+
+    compiled_models = {
+        model_class.__name__: model_class
+        for model_class in (
+            CompiledGradientBoosting,
+            CompiledKernelApproximation,
+            CompiledStandardScaler,
+            CompiledSVC,
+        )
+    }
+    directory = directory or get_current_dir()
+    entry = manifest["models"][name]
+    arrays = {
+        array_name: load(directory / file_name, mmap_mode="r")
+        for array_name, file_name in entry["arrays"].items()
+    }
+    return compiled_models[entry["type"]](**arrays, **entry["parameters"])
@@ -0,0 +1,286 @@
+"""
+Module to contain the Benchmarks of the Prediction Models
+"""
+
+# pylint: disable=imported-auth-user
+
+import os
+import subprocess
+import sys
+from functools import partial
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from numpy import eye, hstack, percentile, vstack
+from numpy.random import Generator, default_rng
+
+from common.models import Area, Customer, Employee
+
+from .artifacts import get_current_dir, read_manifest
+from .client import get_customer_row
+from .encoders import CustomerColumns
+from .predictors import DefaultPredictor, DelayPredictor
+from .registry import get_default_predictor, get_delay_predictor, registry
+from .server import predict_rows
+
+INFERENCE_BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+MODEL_LOAD_CODE = (
+    "; from ml.registry import get_default_predictor, get_delay_predictor; "
+    "get_delay_predictor(); get_default_predictor()"
+)
+
+
+def time_call(function: Callable[[], object], repeat: int) -> List[float]:
+    """
+    Time each of `repeat` calls of a function in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def synthetic_delay_features(
+    delay_predictor: DelayPredictor, rows: int, generator: Generator
+):
+    """
+    Generate a Delay Feature Matrix of random normalized numbers and one hot categories
+    """
+    return hstack(
+        [
+            generator.normal(size=(rows, len(delay_predictor.mean))),
+            eye(len(delay_predictor.areas))[
+                generator.integers(len(delay_predictor.areas), size=rows)
+            ],
+            generator.integers(2, size=(rows, 2)),
+            eye(len(delay_predictor.cell))[
+                generator.integers(len(delay_predictor.cell), size=rows)
+            ],
+            eye(len(delay_predictor.agent))[
+                generator.integers(len(delay_predictor.agent), size=rows)
+            ],
+        ]
+    )
+
+
+def synthetic_customers(rows: int, generator: Generator) -> List[Customer]:
+    """
+    Generate unsaved Customers in known and unknown Areas with random identities
+    """
+    delay_predictor = get_delay_predictor()
+    agents = [
+        Employee(user=User(first_name=agent_name))
+        for agent_name in delay_predictor.agent + ("Unknown",)
+    ]
+    areas = [
+        Area(
+            name=area_name,
+            collection_date=int(generator.integers(1, 29)),
+            agent=agents[int(generator.integers(len(agents)))],
+        )
+        for area_name in delay_predictor.areas + ("Unknown Road",)
+    ]
+    customers = []
+    for i in range(rows):
+        birth_year = int(generator.integers(1950, 2000))
+        birth_day = int(generator.choice([1, 501])) + int(generator.integers(366))
+        serial = int(generator.integers(10000))
+        customers.append(
+            Customer(
+                area=areas[int(generator.integers(len(areas)))],
+                phone_number=f"07{generator.integers(10)}{generator.integers(10 ** 7):07d}",
+                identity_no=(
+                    f"{birth_year}{birth_day:03d}{serial:04d}0"
+                    if i % 2
+                    else f"{birth_year % 100}{birth_day:03d}{serial:04d}V"
+                ),
+                has_digital_box=bool(generator.integers(2)),
+                offer_power_intake=bool(generator.integers(2)),
+            )
+        )
+    return customers
+
+
+def benchmark_encoders(rows=100000, repeat=3, seed=0) -> List[Dict[str, float]]:
+    """
+    Compare the per row and vectorized Feature Encoding time in seconds of each Model
+    """
+    delay_predictor = get_delay_predictor()
+    default_predictor = get_default_predictor()
+    customers = synthetic_customers(rows, default_rng(seed))
+    payment_days = [[3, 10, -2]] * rows
+    encoders = (
+        (
+            "delay",
+            lambda: vstack(
+                [
+                    delay_predictor.get_customer_features(customer, days)
+                    for customer, days in zip(customers, payment_days)
+                ]
+            ),
+            lambda: delay_predictor.encode_features(
+                CustomerColumns.from_customers(customers), payment_days
+            ),
+        ),
+        (
+            "default",
+            lambda: vstack(
+                [
+                    default_predictor.get_customer_features(customer)
+                    for customer in customers
+                ]
+            ),
+            lambda: default_predictor.encode_features(
+                CustomerColumns.from_customers(customers)
+            ),
+        ),
+    )
+    results = []
+    for model, per_row, vectorized in encoders:
+        per_row_time = min(time_call(per_row, repeat))
+        vectorized_time = min(time_call(vectorized, repeat))
+        results.append(
+            {
+                "model": model,
+                "rows": rows,
+                "per_row": per_row_time,
+                "vectorized": vectorized_time,
+                "speedup": per_row_time / vectorized_time,
+            }
+        )
+    return results
+
+
+def benchmark_inference(
+    batch_sizes: Sequence[int] = INFERENCE_BATCH_SIZES,
+    latency_calls=200,
+    repeat=3,
+    seed=0,
+) -> dict:
+    """
+    Measure the load time, single row latency and batch throughput of each Model
+
+    Latencies and load times are in seconds and every timing encodes the raw
+    Customer Feature Rows, the way the Prediction Server and Client predict
+    """
+    generator = default_rng(seed)
+    rows = [
+        get_customer_row(customer, generator.integers(-5, 20, size=3).tolist())
+        for customer in synthetic_customers(max(batch_sizes), generator)
+    ]
+    models = {}
+    for model, predictor_class in (
+        ("delay", DelayPredictor),
+        ("default", DefaultPredictor),
+    ):
+        load_time = min(
+            time_call(lambda cls=predictor_class: cls().load(get_current_dir()), repeat)
+        )
+        latencies = time_call(
+            lambda model=model: predict_rows(model, rows[:1]), latency_calls
+        )
+        throughput = []
+        for batch_size in batch_sizes:
+            batch_time = min(
+                time_call(partial(predict_rows, model, rows[:batch_size]), repeat)
+            )
+            throughput.append(
+                {
+                    "batch_size": batch_size,
+                    "batch_time": batch_time,
+                    "rows_per_second": batch_size / batch_time,
+                }
+            )
+        models[model] = {
+            "load_time": load_time,
+            "latency": {
+                "p50": float(percentile(latencies, 50)),
+                "p99": float(percentile(latencies, 99)),
+            },
+            "throughput": throughput,
+        }
+    return {
+        "model_version": registry.version,
+        "artifacts": "memory mapped" if read_manifest() else "pickled",
+        "models": models,
+    }
+
+
+def benchmark_compiled_delay(
+    row_counts: Sequence[int] = (1, 10000), repeat=5, seed=0
+) -> List[Dict[str, float]]:
+    """
+    Compare the sklearn and compiled Delay Model latency in seconds for each row count
+    """
+    delay_predictor = get_delay_predictor()
+    generator = default_rng(seed)
+    results = []
+    for rows in row_counts:
+        features = synthetic_delay_features(delay_predictor, rows, generator)
+        sklearn_time = min(
+            time_call(partial(delay_predictor.model.predict, features), repeat)
+        )
+        compiled_time = min(
+            time_call(partial(delay_predictor.compiled_model.predict, features), repeat)
+        )
+        results.append(
+            {
+                "rows": rows,
+                "sklearn": sklearn_time,
+                "compiled": compiled_time,
+                "speedup": sklearn_time / compiled_time,
+            }
+        )
+    return results
+
+
+def benchmark_startup(load_models=False) -> dict:
+    """
+    Measure a fresh process setting up Django and loading the URLs
+
+    The import time is broken down by top level package, summing the time spent
+    importing each module itself so nested imports are not counted twice
+    """
+    start = perf_counter()
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            STARTUP_CODE + (MODEL_LOAD_CODE if load_models else ""),
+        ],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "skapt_cable_company.settings"
+            ),
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_time = perf_counter() - start
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, _, module = line[len("import time:") :].split("|")
+        package = module.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time) / 1e6
+    return {
+        "wall_time": wall_time,
+        "import_time": sum(packages.values()),
+        "packages": dict(
+            sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        ),
+    }
@@ -0,0 +1,155 @@
+"""
+Module to Store the Default Probabilities of Customers
+
+Every input of the Default Model is static for a customer, so a probability is
+stored under a digest of those feature values and the Model Version and is
+shared by every customer with the same features. The probabilities live in a
+table, so every process shares them, and are read and upserted in bulk
+"""
+
+from datetime import timedelta
+from hashlib import sha256
+from typing import Dict, Iterable, List, NamedTuple, Union
+
+from django.apps import apps
+from django.conf import settings
+from django.utils.timezone import now
+
+from .client import get_customer_row, predict
+from .registry import registry
+
+KEY_QUERY_CHUNK_SIZE = 900
+
+
+def get_default_probability_model():
+    """
+    Get the Default Probability Model, looked up as the models module imports this one
+    """
+    return apps.get_model("common", "DefaultProbability")
+
+
+def get_default_features(customer) -> tuple:
+    """
+    Get the static feature values the Default Model uses for a Customer
+    """
+    return (
+        customer.area.name,
+        customer.area.agent.name,
+        customer.phone_number[2],
+        customer.is_male,
+        customer.has_digital_box,
+        customer.offer_power_intake,
+        customer.age,
+        customer.area.collection_date,
+    )
+
+
+def get_default_probability_key(customer, version: Union[str, None] = None) -> str:
+    """
+    Get the Key of a Customer's Default Probability, for the current version
+    unless another Model Version is given
+    """
+    return sha256(
+        repr((get_default_features(customer), version or registry.version)).encode()
+    ).hexdigest()
+
+
+def read_default_probabilities(keys: Iterable[str]) -> Dict[str, float]:
+    """
+    Read the unexpired Default Probabilities stored under the Keys
+    """
+    default_probability = get_default_probability_model()
+    keys = list(keys)
+    computed_after = now() - timedelta(
+        seconds=settings.ML_DEFAULT_PROBABILITY_CACHE_TIMEOUT
+    )
+    probabilities: Dict[str, float] = {}
+    for i in range(0, len(keys), KEY_QUERY_CHUNK_SIZE):
+        probabilities.update(
+            default_probability.objects.filter(
+                key__in=keys[i : i + KEY_QUERY_CHUNK_SIZE],
+                computed_at__gte=computed_after,
+            ).values_list("key", "probability")
+        )
+    return probabilities
+
+
+def store_default_probabilities(probabilities: Dict[str, float]) -> None:
+    """
+    Insert or overwrite the Default Probabilities stored under their Keys
+    """
+    default_probability = get_default_probability_model()
+    computed_at = now()
+    default_probability.objects.bulk_create(
+        [
+            default_probability(
+                key=key, probability=probability, computed_at=computed_at
+            )
+            for key, probability in probabilities.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["probability", "computed_at"],
+    )
+
+
+class DefaultProbabilities(NamedTuple):
+    """
+    Default Probabilities keyed by Customer primary key
+    """
+
+    probabilities: Dict[int, float]
+    fallback: bool
+
+
+def predict_default_probabilities(
+    customers: List, budget: Union[float, None] = None
+) -> DefaultProbabilities:
+    """
+    Get the Default Probabilities of Customers, within a budget in seconds if given
+
+    Stored probabilities are read in bulk and the rest are predicted together in
+    one request and stored, unless another Model Version or the Priors predicted them
+    """
+    version = registry.version
+    keys = {
+        customer.pk: get_default_probability_key(customer, version)
+        for customer in customers
+    }
+    stored = read_default_probabilities(set(keys.values()))
+    missing = [customer for customer in customers if keys[customer.pk] not in stored]
+    fallback = False
+    if missing:
+        probabilities = predict(
+            "default", [get_customer_row(customer) for customer in missing], budget
+        )
+        predicted = {
+            keys[customer.pk]: float(probability)
+            for customer, probability in zip(missing, probabilities.values)
+        }
+        if not probabilities.fallback and probabilities.model_version == version:
+            store_default_probabilities(predicted)
+        stored.update(predicted)
+        fallback = probabilities.fallback
+    return DefaultProbabilities(
+        {customer_id: stored[key] for customer_id, key in keys.items()}, fallback
+    )
+
+
+def get_default_probabilities(customers: List) -> Dict[int, float]:
+    """
+    Get the Default Probabilities of Customers keyed by primary key
+    """
+    return predict_default_probabilities(customers).probabilities
+
+
+def invalidate_default_probabilities(customers: Iterable) -> None:
+    """
+    Drop the stored Default Probabilities of Customers
+    """
+    default_probability = get_default_probability_model()
+    keys = list({get_default_probability_key(customer) for customer in customers})
+    for i in range(0, len(keys), KEY_QUERY_CHUNK_SIZE):
+        default_probability.objects.filter(
+            key__in=keys[i : i + KEY_QUERY_CHUNK_SIZE]
+        ).delete()
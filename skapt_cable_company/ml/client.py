@@ -0,0 +1,165 @@
+"""
+Module to contain the Client of the Prediction Server
+
+A request is a line of JSON naming the model and the feature rows to predict and
+the response is a line of JSON with one prediction per row and the Model
+Version which predicted them. When no server is
+configured or it cannot be reached the rows are predicted in process
+
+Page renders predict within a latency budget. When loading or running the Models
+takes longer, or fails, the Priors are returned under the fallback Model Version
+while the Models keep loading in the background
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import json
+from calendar import monthrange
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, timedelta
+from typing import List, NamedTuple, Union
+
+from django.conf import settings
+
+from .metrics import metrics
+from .priors import get_fallback_values
+from .registry import FALLBACK_VERSION
+
+TIME_SERIES_OFFSET = 5
+BUDGET_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+budget_executor = ThreadPoolExecutor(
+    max_workers=BUDGET_WORKERS, thread_name_prefix="PredictionBudget"
+)
+
+
+class Predictions(NamedTuple):
+    """
+    Predictions of Feature Rows and the Model Version which predicted them
+    """
+
+    values: List[float]
+    model_version: str
+
+    @property
+    def fallback(self) -> bool:
+        """
+        Check if the Predictions are the Priors the Models fell back to
+        """
+        return self.model_version == FALLBACK_VERSION
+
+
+def get_customer_row(customer, payment_days: Union[List[int], None] = None) -> dict:
+    """
+    Get the JSON serializable Feature Row of a Customer
+    """
+    return {
+        "area_name": customer.area.name,
+        "agent_name": customer.area.agent.user.first_name,
+        "phone_number": customer.phone_number,
+        "identity_number": customer.identity_no,
+        "has_digital_box": customer.has_digital_box,
+        "offer_power_intake": customer.offer_power_intake,
+        "collection_date": customer.area.collection_date,
+        "payment_days": payment_days or [],
+    }
+
+
+def get_payment_date(
+    expected_delay: float, pay_date: int, today: Union[date, None] = None
+) -> date:
+    """
+    Get Most probable Payment Date from the Expected Delay
+
+    The Collection Date of the current month is clamped to the days of the month
+    """
+    today = today or date.today()
+    day = min(max(pay_date, 1), monthrange(today.year, today.month)[1])
+    return date(today.year, today.month, day) + timedelta(days=expected_delay)
+
+
+def send_request(request: dict) -> dict:
+    """
+    Send a request to the Prediction Server and get its response
+
+    Raises an OSError if the server cannot be reached or fails the request
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(settings.ML_PREDICTION_TIMEOUT)
+        connection.connect(settings.ML_PREDICTION_SOCKET)
+        with connection.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode())
+            stream.write(b"\n")
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("Prediction Server closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise ConnectionError(f"Prediction Server failed: {response['error']}")
+    return response
+
+
+def request_predictions(model: str, rows: List[dict]) -> Predictions:
+    """
+    Predict Feature Rows with a Model of the Prediction Server
+
+    Raises an OSError if the server cannot be reached or fails the request
+    """
+    response = send_request({"model": model, "rows": rows})
+    return Predictions(response["predictions"], response["model_version"])
+
+
+def request_metrics() -> Union[dict, None]:
+    """
+    Get the Metrics of the Prediction Server, None without a reachable one
+    """
+    if not settings.ML_PREDICTION_SOCKET:
+        return None
+    try:
+        return send_request({"metrics": True})["metrics"]
+    except OSError:
+        return None
+
+
+def predict_within_budget(model: str, rows: List[dict], budget: float) -> Predictions:
+    """
+    Predict Feature Rows within a budget in seconds, falling back to the Priors
+    when the Models take longer to load and predict or fail
+
+    A timed out prediction keeps running, so a cold worker finishes loading the
+    Models for the next requests
+    """
+    future = budget_executor.submit(predict, model, rows)
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeoutError:
+        metrics.increment(f"prediction_timeouts.{model}")
+    except Exception:  # pylint: disable=broad-exception-caught
+        metrics.increment(f"prediction_errors.{model}")
+        logger.exception("The %s Model failed, falling back to the Priors", model)
+    return Predictions(get_fallback_values(model, rows), FALLBACK_VERSION)
+
+
+def predict(
+    model: str, rows: List[dict], budget: Union[float, None] = None
+) -> Predictions:
+    """
+    Predict Feature Rows through the Prediction Server, or in process without one
+
+    With a budget in seconds, the Priors are returned when the Models overrun it
+    """
+    if budget is not None:
+        return predict_within_budget(model, rows, budget)
+    if settings.ML_PREDICTION_SOCKET:
+        try:
+            return request_predictions(model, rows)
+        except OSError:
+            pass
+    from .server import predict_rows
+
+    return Predictions(*predict_rows(model, rows))
@@ -0,0 +1,265 @@
+"""
+Module to Compact the Prediction Models into smaller surrogate Models
+
+The surrogates are fitted against the full Models on synthetic Customers: a
+Gradient Boosting Regressor of fewer and shallower trees learns the predictions
+of the Delay Model and a linear function over a Nystroem approximation of the
+RBF Kernel learns the decision values of the Default SVC. A held out synthetic
+set then measures how far their predictions move and how much faster they are
+"""
+
+from functools import partial
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+from numpy import abs as absolute
+from numpy import ndarray, percentile
+from numpy.random import Generator, default_rng
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import Ridge
+
+from .artifacts import (
+    COMPACT_SUFFIX,
+    get_pickle_version,
+    load_model,
+    read_manifest,
+)
+from .benchmarks import synthetic_customers, time_call
+from .compiled import (
+    CompiledGradientBoosting,
+    CompiledKernelApproximation,
+    CompiledStandardScaler,
+    CompiledSVC,
+)
+from .encoders import CustomerColumns
+from .predictors import DefaultPredictor, DelayPredictor
+
+FULL_MODELS = ("delay_model", "default_model", "default_preprocessor")
+COMPACT_TREES = 100
+COMPACT_DEPTH = 3
+COMPACT_COMPONENTS = 100
+SURROGATE_SAMPLES = 20000
+HOLDOUT_SAMPLES = 5000
+
+
+def compile_pickled_models() -> Dict[str, object]:
+    """
+    Compile the pickled Models into NumPy arrays
+    """
+    default_predictor = DefaultPredictor()
+    return {
+        "delay_model": CompiledGradientBoosting.from_model(
+            DelayPredictor().get_model()
+        ),
+        "default_model": CompiledSVC.from_model(default_predictor.get_model()),
+        "default_preprocessor": CompiledStandardScaler.from_model(
+            default_predictor.get_preprocessor()
+        ),
+    }
+
+
+def get_full_models(manifest: Union[dict, None], directory: Union[Path, None]):
+    """
+    Get the full compiled Models of an artifact directory, or of the pickles without one
+    """
+    if manifest is None:
+        return compile_pickled_models()
+    return {name: load_model(manifest, name, directory) for name in FULL_MODELS}
+
+
+def synthetic_features(
+    directory: Union[Path, None], rows: int, generator: Generator
+) -> Tuple[ndarray, ndarray]:
+    """
+    Get the Delay and Default Feature Matrices of synthetic Customers
+    """
+    columns = CustomerColumns.from_customers(synthetic_customers(rows, generator))
+    payment_days = [
+        generator.integers(-5, 20, size=int(generator.integers(6))).tolist()
+        for _ in range(rows)
+    ]
+    return (
+        DelayPredictor().load(directory).encode_features(columns, payment_days),
+        DefaultPredictor().load(directory).encode_features(columns),
+    )
+
+
+def fit_surrogates(  # pylint: disable=too-many-arguments
+    full_models: Dict[str, object],
+    delay_features: ndarray,
+    default_features: ndarray,
+    *,
+    trees=COMPACT_TREES,
+    depth=COMPACT_DEPTH,
+    components=COMPACT_COMPONENTS,
+    seed=0,
+) -> Dict[str, object]:
+    """
+    Fit the compact surrogates on the predictions of the full Models
+
+    The Nystroem landmarks are drawn from the Support Vectors of the SVC, whose
+    Kernels its decision function is made of. Without components the surrogate
+    is linear in the standardized features
+    """
+    delay_model = GradientBoostingRegressor(
+        n_estimators=trees, max_depth=depth, random_state=seed
+    ).fit(
+        delay_features,
+        full_models["delay_model"].predict(delay_features),  # type: ignore
+    )
+    default_model: CompiledSVC = full_models["default_model"]  # type: ignore
+    standardized = full_models["default_preprocessor"].transform(  # type: ignore
+        default_features
+    )
+    feature_map = None
+    surrogate_features = standardized
+    if components:
+        feature_map = Nystroem(
+            gamma=default_model.gamma,
+            n_components=min(components, len(default_model.support_vectors)),
+            random_state=seed,
+        ).fit(default_model.support_vectors)
+        surrogate_features = feature_map.transform(standardized)
+    surrogate = Ridge(alpha=1e-3).fit(
+        surrogate_features, default_model.decision_function(standardized)
+    )
+    return {
+        f"delay_model{COMPACT_SUFFIX}": CompiledGradientBoosting.from_model(
+            delay_model
+        ),
+        f"default_model{COMPACT_SUFFIX}": CompiledKernelApproximation.from_model(
+            surrogate, default_model.classes.tolist(), feature_map
+        ),
+    }
+
+
+def get_size(model) -> int:
+    """
+    Get the Bytes of the arrays of a compiled Model
+    """
+    return sum(value.nbytes for value in model.arrays.values())
+
+
+def measure(model, features: ndarray, latency_calls: int) -> dict:
+    """
+    Measure the size, single row latency and batch time in seconds of a Model
+    """
+    return {
+        "size": get_size(model),
+        "latency": float(
+            percentile(
+                time_call(partial(model.predict, features[:1]), latency_calls), 50
+            )
+        ),
+        "batch_time": min(time_call(partial(model.predict, features), 3)),
+    }
+
+
+def get_gains(full: dict, compact: dict) -> dict:
+    """
+    Get how much smaller and faster a compact surrogate is than its full Model
+    """
+    return {
+        "full": full,
+        "compact": compact,
+        "size_ratio": compact["size"] / full["size"],
+        "latency_gain": full["latency"] / compact["latency"],
+        "batch_gain": full["batch_time"] / compact["batch_time"],
+    }
+
+
+def evaluate_surrogates(
+    models: Dict[str, object],
+    delay_features: ndarray,
+    default_features: ndarray,
+    latency_calls=200,
+) -> dict:
+    """
+    Report the accuracy change and speed up of the surrogates on held out features
+
+    The Delay accuracy is the mean absolute change of the Delay in days and the
+    share of Delays rounded to the same week. The Default accuracy is the share
+    of Customers classified alike and the share of the full Model's defaulters
+    the surrogate still finds
+    """
+    delay_model = models["delay_model"]
+    compact_delay_model = models[f"delay_model{COMPACT_SUFFIX}"]
+    default_model = models["default_model"]
+    compact_default_model = models[f"default_model{COMPACT_SUFFIX}"]
+    scaled = models["default_preprocessor"].transform(default_features)  # type: ignore
+    delays = delay_model.predict(delay_features)  # type: ignore
+    compact_delays = compact_delay_model.predict(delay_features)  # type: ignore
+    classes = default_model.predict(scaled)  # type: ignore
+    compact_classes = compact_default_model.predict(scaled)  # type: ignore
+    defaulters = classes == 0
+    return {
+        "rows": len(delay_features),
+        "delay": {
+            "mean_absolute_error": float(absolute(delays - compact_delays).mean()),
+            "weekly_agreement": float((delays // 7 == compact_delays // 7).mean()),
+            **get_gains(
+                measure(delay_model, delay_features, latency_calls),
+                measure(compact_delay_model, delay_features, latency_calls),
+            ),
+        },
+        "default": {
+            "agreement": float((classes == compact_classes).mean()),
+            "defaulters": int(defaulters.sum()),
+            "defaulter_recall": (
+                float((compact_classes[defaulters] == 0).mean())
+                if defaulters.any()
+                else None
+            ),
+            **get_gains(
+                measure(default_model, scaled, latency_calls),
+                measure(compact_default_model, scaled, latency_calls),
+            ),
+        },
+    }
+
+
+def compact_models(  # pylint: disable=too-many-arguments
+    directory: Union[Path, None],
+    *,
+    samples=SURROGATE_SAMPLES,
+    holdout=HOLDOUT_SAMPLES,
+    trees=COMPACT_TREES,
+    depth=COMPACT_DEPTH,
+    components=COMPACT_COMPONENTS,
+    latency_calls=200,
+    seed=0,
+) -> Tuple[Dict[str, object], dict]:
+    """
+    Fit compact surrogates of the Models of an artifact directory and evaluate them
+
+    Returns the full and compact Models and the Report of the surrogates
+    """
+    manifest = None if directory is None else read_manifest(directory)
+    models = get_full_models(manifest, directory)
+    generator = default_rng(seed)
+    delay_features, default_features = synthetic_features(
+        directory, samples + holdout, generator
+    )
+    models.update(
+        fit_surrogates(
+            models,
+            delay_features[:samples],
+            default_features[:samples],
+            trees=trees,
+            depth=depth,
+            components=components,
+            seed=seed,
+        )
+    )
+    return models, {
+        "model_version": (
+            get_pickle_version() if manifest is None else manifest["version"]
+        ),
+        **evaluate_surrogates(
+            models,
+            delay_features[samples:],
+            default_features[samples:],
+            latency_calls,
+        ),
+    }
@@ -0,0 +1,352 @@
+"""
+Module to contain Prediction Models compiled into contiguous NumPy arrays
+"""
+
+from typing import TYPE_CHECKING, Dict, Union
+
+from numpy import (
+    arange,
+    array,
+    asarray,
+    exp,
+    float32,
+    float64,
+    full,
+    inf,
+    int32,
+    intp,
+    ndarray,
+    zeros,
+)
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.linear_model import Ridge
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
+
+def rbf_kernel(features: ndarray, vectors: ndarray, gamma: float) -> ndarray:
+    """
+    Get the RBF Kernel between every row and every vector
+    """
+    features = asarray(features, dtype=float64)
+    squared_distances = (
+        (features**2).sum(axis=1)[:, None]
+        + (vectors**2).sum(axis=1)[None, :]
+        - 2 * features @ vectors.T
+    )
+    return exp(-gamma * squared_distances.clip(min=0))
+
+
+class CompiledGradientBoosting:
+    """
+    Class for a Gradient Boosting Regressor flattened into contiguous arrays
+
+    Every tree is padded to a complete tree of the model's depth and stored in
+    heap order, so the children of node i are 2i + 1 and 2i + 2 and only the
+    feature, threshold and leaf value arrays have to be kept. A leaf above the
+    full depth becomes a node with an infinite threshold that always goes left
+    and repeats its value in every leaf below it
+    """
+
+    def __init__(
+        self, feature: ndarray, threshold: ndarray, value: ndarray, baseline: float
+    ) -> None:
+        """
+        Initialize from the flattened arrays
+
+        `feature` and `threshold` hold 2 ** depth - 1 nodes per tree and `value`
+        holds the 2 ** depth leaves per tree already scaled by the learning rate
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.baseline = baseline
+        self.tree_count = len(value) - len(feature)
+        self.depth = (len(value) // self.tree_count).bit_length() - 1
+
+    @property
+    def arrays(self) -> Dict[str, ndarray]:
+        """
+        Get the Arrays needed to rebuild the Model
+        """
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "value": self.value,
+        }
+
+    @property
+    def parameters(self) -> Dict[str, float]:
+        """
+        Get the Scalar Parameters needed to rebuild the Model
+        """
+        return {"baseline": self.baseline}
+
+    @property
+    def node_count(self) -> int:
+        """
+        Get the Number of Nodes of each padded tree
+        """
+        return 2**self.depth - 1
+
+    @property
+    def leaf_count(self) -> int:
+        """
+        Get the Number of Leaves of each padded tree
+        """
+        return 2**self.depth
+
+    @classmethod
+    def from_model(
+        cls, model: "GradientBoostingRegressor"
+    ) -> "CompiledGradientBoosting":
+        """
+        Flatten the trees of a fitted Gradient Boosting Regressor
+        """
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        depth = max(tree.max_depth for tree in trees)
+        node_count = 2**depth - 1
+        feature = zeros((len(trees), node_count), dtype=int32)
+        threshold = full((len(trees), node_count), inf)
+        value = zeros((len(trees), node_count + 1))
+        for i, tree in enumerate(trees):
+            stack = [(0, 0)]
+            while stack:
+                position, node = stack.pop()
+                if position >= node_count:
+                    value[i, position - node_count] = (
+                        tree.value[node, 0, 0] * model.learning_rate
+                    )
+                elif tree.children_left[node] == -1:
+                    stack += [(2 * position + 1, node), (2 * position + 2, node)]
+                else:
+                    feature[i, position] = tree.feature[node]
+                    threshold[i, position] = tree.threshold[node]
+                    stack += [
+                        (2 * position + 1, tree.children_left[node]),
+                        (2 * position + 2, tree.children_right[node]),
+                    ]
+        baseline = model._raw_predict_init(  # pylint: disable=protected-access
+            zeros((1, model.n_features_in_))
+        )[0, 0]
+        return cls(feature.ravel(), threshold.ravel(), value.ravel(), float(baseline))
+
+    def predict(self, features: ndarray, chunk_size=64) -> ndarray:
+        """
+        Predict a Feature Matrix walking every tree at once for a chunk of rows
+
+        Features are rounded to float32 first, the same as the sklearn trees do
+        """
+        features = asarray(features, dtype=float32).astype(float64)
+        predictions = zeros(len(features))
+        tree_nodes = (arange(self.tree_count) * self.node_count)[None, :]
+        tree_leaves = (arange(self.tree_count) * self.leaf_count)[None, :]
+        for start in range(0, len(features), chunk_size):
+            chunk = features[start : start + chunk_size]
+            row_starts = (arange(len(chunk)) * chunk.shape[1])[:, None]
+            positions = zeros((len(chunk), self.tree_count), dtype=intp)
+            for _ in range(self.depth):
+                nodes = tree_nodes + positions
+                goes_right = (
+                    chunk.ravel()[row_starts + self.feature[nodes]]
+                    > self.threshold[nodes]
+                )
+                positions = 2 * positions + 1 + goes_right
+            predictions[start : start + chunk_size] = self.value[
+                tree_leaves + positions - self.node_count
+            ].sum(axis=1)
+        return predictions + self.baseline
+
+
+class CompiledSVC:
+    """
+    Class for a binary RBF Support Vector Classifier kept as NumPy arrays
+    """
+
+    def __init__(
+        self,
+        support_vectors: ndarray,
+        dual_coef: ndarray,
+        intercept: float,
+        gamma: float,
+        classes: list,
+    ) -> None:
+        """
+        Initialize from the Support Vectors and their Dual Coefficients
+        """
+        self.support_vectors = support_vectors
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+        self.gamma = gamma
+        self.classes = array(classes)
+
+    @classmethod
+    def from_model(cls, model: "SVC") -> "CompiledSVC":
+        """
+        Copy the Support Vectors of a fitted binary RBF SVC
+        """
+        if model.kernel != "rbf" or len(model.classes_) != 2:
+            raise ValueError("Only binary SVCs with an RBF kernel can be compiled")
+        return cls(
+            model.support_vectors_,
+            model.dual_coef_[0],
+            float(model.intercept_[0]),
+            float(model._gamma),  # pylint: disable=protected-access
+            model.classes_.tolist(),
+        )
+
+    @property
+    def arrays(self) -> Dict[str, ndarray]:
+        """
+        Get the Arrays needed to rebuild the Model
+        """
+        return {"support_vectors": self.support_vectors, "dual_coef": self.dual_coef}
+
+    @property
+    def parameters(self) -> dict:
+        """
+        Get the Scalar Parameters needed to rebuild the Model
+        """
+        return {
+            "intercept": self.intercept,
+            "gamma": self.gamma,
+            "classes": self.classes.tolist(),
+        }
+
+    def decision_function(self, features: ndarray) -> ndarray:
+        """
+        Get the signed distance of each row to the separating hyperplane
+        """
+        return (
+            rbf_kernel(features, self.support_vectors, self.gamma) @ self.dual_coef
+            + self.intercept
+        )
+
+    def predict(self, features: ndarray) -> ndarray:
+        """
+        Predict the Class of each row
+        """
+        return self.classes[(self.decision_function(features) > 0).astype(int)]
+
+
+class CompiledKernelApproximation:
+    """
+    Class for a linear decision function over a Nystroem approximation of an RBF
+    Kernel, or over the features themselves without one, kept as NumPy arrays
+
+    It stands in for an RBF SVC with a few landmark rows instead of every Support
+    Vector. The Nystroem normalization is folded into the coefficients, so only
+    the landmarks and one coefficient per landmark are kept
+    """
+
+    def __init__(
+        self,
+        coef: ndarray,
+        intercept: float,
+        classes: list,
+        components: Union[ndarray, None] = None,
+        gamma: float = 0.0,
+    ) -> None:
+        """
+        Initialize from the linear Coefficients and the optional Nystroem landmarks
+        """
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = array(classes)
+        self.components = components
+        self.gamma = gamma
+
+    @classmethod
+    def from_model(
+        cls, model: "Ridge", classes: list, feature_map: Union["Nystroem", None] = None
+    ) -> "CompiledKernelApproximation":
+        """
+        Copy a Ridge Regression fitted on decision values and its Nystroem feature map
+        """
+        if feature_map is None:
+            return cls(model.coef_, float(model.intercept_), classes)
+        return cls(
+            feature_map.normalization_.T @ model.coef_,
+            float(model.intercept_),
+            classes,
+            feature_map.components_,
+            float(feature_map.gamma),
+        )
+
+    @property
+    def arrays(self) -> Dict[str, ndarray]:
+        """
+        Get the Arrays needed to rebuild the Model
+        """
+        if self.components is None:
+            return {"coef": self.coef}
+        return {"coef": self.coef, "components": self.components}
+
+    @property
+    def parameters(self) -> dict:
+        """
+        Get the Scalar Parameters needed to rebuild the Model
+        """
+        return {
+            "intercept": self.intercept,
+            "classes": self.classes.tolist(),
+            "gamma": self.gamma,
+        }
+
+    def decision_function(self, features: ndarray) -> ndarray:
+        """
+        Get the approximated signed distance of each row to the separating hyperplane
+        """
+        features = asarray(features, dtype=float64)
+        if self.components is not None:
+            features = rbf_kernel(features, self.components, self.gamma)
+        return features @ self.coef + self.intercept
+
+    def predict(self, features: ndarray) -> ndarray:
+        """
+        Predict the Class of each row
+        """
+        return self.classes[(self.decision_function(features) > 0).astype(int)]
+
+
+class CompiledStandardScaler:
+    """
+    Class for a Standard Scaler kept as NumPy arrays
+    """
+
+    def __init__(self, mean: ndarray, scale: ndarray) -> None:
+        """
+        Initialize from the Mean and Scale of every feature
+        """
+        self.mean = mean
+        self.scale = scale
+
+    @classmethod
+    def from_model(cls, model: "StandardScaler") -> "CompiledStandardScaler":
+        """
+        Copy the Mean and Scale of a fitted Standard Scaler
+        """
+        return cls(model.mean_, model.scale_)
+
+    @property
+    def arrays(self) -> Dict[str, ndarray]:
+        """
+        Get the Arrays needed to rebuild the Model
+        """
+        return {"mean": self.mean, "scale": self.scale}
+
+    @property
+    def parameters(self) -> dict:
+        """
+        Get the Scalar Parameters needed to rebuild the Model
+        """
+        return {}
+
+    def transform(self, features: ndarray) -> ndarray:
+        """
+        Standardize each feature
+        """
+        return (asarray(features, dtype=float64) - self.mean) / self.scale
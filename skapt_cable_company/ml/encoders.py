@@ -0,0 +1,140 @@
+"""
+Module to contain the Vectorized Feature Encoders of the Prediction Models
+
+The encoders take a column of values of many Customers and encode it at once,
+looking up each distinct value a single time instead of once per row
+"""
+
+# pylint: disable=invalid-sequence-index
+
+from datetime import datetime
+from typing import List, Mapping, NamedTuple, Sequence, Tuple, Union
+
+from numpy import asarray, char, int64, ndarray, nonzero, uint32, unique, where, zeros
+
+DIGIT_WEIGHTS = (1000, 100, 10, 1)
+
+
+class CustomerColumns(NamedTuple):
+    """
+    Feature Columns of many Customers
+    """
+
+    area_names: Sequence[str]
+    agent_names: Sequence[str]
+    phone_numbers: Sequence[str]
+    identity_numbers: Sequence[str]
+    has_digital_boxes: Sequence[bool]
+    offer_power_intakes: Sequence[bool]
+    collection_dates: Sequence[int]
+
+    @classmethod
+    def from_customers(cls, customers: List) -> "CustomerColumns":
+        """
+        Get the Feature Columns of Customers with their Area and Agent loaded
+        """
+        return cls(
+            area_names=[customer.area.name for customer in customers],
+            agent_names=[customer.area.agent.user.first_name for customer in customers],
+            phone_numbers=[customer.phone_number for customer in customers],
+            identity_numbers=[customer.identity_no for customer in customers],
+            has_digital_boxes=[customer.has_digital_box for customer in customers],
+            offer_power_intakes=[customer.offer_power_intake for customer in customers],
+            collection_dates=[customer.area.collection_date for customer in customers],
+        )
+
+    @classmethod
+    def from_rows(cls, rows: List[dict]) -> "CustomerColumns":
+        """
+        Get the Feature Columns of the Feature Rows sent to the Prediction Server
+        """
+        return cls(
+            area_names=[row["area_name"] for row in rows],
+            agent_names=[row["agent_name"] for row in rows],
+            phone_numbers=[row["phone_number"] for row in rows],
+            identity_numbers=[row["identity_number"] for row in rows],
+            has_digital_boxes=[row["has_digital_box"] for row in rows],
+            offer_power_intakes=[row["offer_power_intake"] for row in rows],
+            collection_dates=[row["collection_date"] for row in rows],
+        )
+
+
+def lookup(
+    values: Sequence[str], table: Mapping[str, Union[int, float]], default
+) -> ndarray:
+    """
+    Look up every value in a table, once per distinct value
+    """
+    distinct, inverse = unique(asarray(values, dtype=str), return_inverse=True)
+    return asarray([table.get(value, default) for value in distinct.tolist()])[inverse]
+
+
+def count_unknown(values: Sequence[str], table: Mapping[str, object]) -> int:
+    """
+    Count the values missing from a table, checking each distinct value once
+    """
+    distinct, counts = unique(asarray(values, dtype=str), return_counts=True)
+    return sum(
+        count
+        for value, count in zip(distinct.tolist(), counts.tolist())
+        if value not in table
+    )
+
+
+def lookup_digit(digits: ndarray, table: Sequence, default) -> ndarray:
+    """
+    Look up every digit in a table of the ten digits, -1 being a non digit
+    """
+    return where(digits >= 0, asarray(table)[digits], default)
+
+
+def one_hot(columns: ndarray, width: int) -> ndarray:
+    """
+    One hot Encode column indices, a negative index encodes to a row of zeros
+    """
+    encoded = zeros((len(columns), width))
+    rows = nonzero(columns >= 0)[0]
+    encoded[rows, columns[rows].astype(int64)] = 1
+    return encoded
+
+
+def get_digits(values: Sequence[str], count: int) -> ndarray:
+    """
+    Get the first `count` characters of each value as digits, -1 if not a digit
+    """
+    characters = asarray(values, dtype=f"U{count}")
+    digits = (
+        characters.view(uint32).reshape((len(characters), count)).astype(int64) - 48
+    )
+    return where((digits >= 0) & (digits <= 9), digits, -1)
+
+
+def get_digit(values: Sequence[str], position: int) -> ndarray:
+    """
+    Get the character at a position of each value as a digit, -1 if not a digit
+    """
+    return get_digits(values, position + 1)[:, position]
+
+
+def to_number(digits: ndarray) -> ndarray:
+    """
+    Get the Numbers written by rows of digits
+    """
+    return digits @ asarray(DIGIT_WEIGHTS[-digits.shape[1] :])
+
+
+def decode_identity_numbers(
+    identity_numbers: Sequence[str],
+) -> Tuple[ndarray, ndarray]:
+    """
+    Get the Ages and Genders of Identity Numbers the way a Customer decodes them
+    """
+    digits = get_digits(identity_numbers, 7)
+    lengths = char.str_len(asarray(identity_numbers, dtype=str))
+    birth_years = where(
+        lengths == 12, to_number(digits[:, :4]), 1900 + to_number(digits[:, :2])
+    )
+    gender_codes = where(
+        lengths == 10, to_number(digits[:, 2:5]), to_number(digits[:, 4:7])
+    )
+    return datetime.now().year - birth_years, gender_codes < 500
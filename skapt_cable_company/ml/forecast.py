@@ -0,0 +1,180 @@
+"""
+Module to Forecast the weekly Cash Inflow of every Area
+
+A connected Customer is expected to pay its latest billed amount on its Expected
+Payment Date and every billing period after it, weighted by the probability it
+does not default. The Predictions are refreshed in batches and the expected
+payments summed into Area and week cells in one vectorized pass. A forecast is
+built and stored by a scheduled run, so the page only reads it
+"""
+
+from datetime import date, timedelta
+from math import ceil
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from numpy import add, arange, array, asarray, broadcast_to, ndarray, zeros
+
+from common.models import Area, AreaInflow, Bill, Customer, CustomerPrediction
+
+from .scoring import refresh_expired_predictions
+
+FORECAST_WEEKS = 8
+BILLING_PERIOD_DAYS = 30
+
+
+class AreaForecast(NamedTuple):
+    """
+    Expected Cash Inflow of a single Area
+    """
+
+    area_id: int
+    name: str
+    inflows: List[float]
+    total: float
+
+
+class CashForecast(NamedTuple):
+    """
+    Expected Cash Inflow of every Area for the weeks starting on the given dates
+    """
+
+    weeks: List[date]
+    areas: List[AreaForecast]
+    totals: List[float]
+
+
+def get_week_start(day: date) -> date:
+    """
+    Get the Monday of the week of a day
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def get_expected_payments():
+    """
+    Get the Area, Expected Payment Date, Default Probability and latest billed
+    amount of every connected Customer with a Prediction
+    """
+    latest_bills = Bill.objects.filter(
+        connection__customer=OuterRef("customer")
+    ).order_by("-to_date", "-id")
+    return (
+        CustomerPrediction.objects.filter(customer__active_connection=True)
+        .annotate(
+            area=F("customer__area"),
+            billed=Coalesce(
+                Subquery(latest_bills.values("amount")[:1], output_field=FloatField()),
+                Case(
+                    When(
+                        customer__has_digital_box=True,
+                        then=Value(float(Bill.DIGITAL_FEE)),
+                    ),
+                    default=Value(float(Bill.ANALOG_FEE)),
+                ),
+            ),
+        )
+        .values_list("area", "expected_payment_date", "default_probability", "billed")
+    )
+
+
+def add_weekly_inflows(
+    inflows: ndarray, rows: ndarray, days: ndarray, amounts: ndarray
+) -> None:
+    """
+    Add expected payments to the Area rows and week columns of the inflows
+
+    A payment of an amount due days after the first week is repeated every billing
+    period, and only those falling within the weeks of the inflows are added
+    """
+    weeks = inflows.shape[1]
+    periods = arange(ceil(weeks * 7 / BILLING_PERIOD_DAYS) + 1)
+    period_days = days[:, None] + periods * BILLING_PERIOD_DAYS
+    period_weeks = period_days // 7
+    due = (period_days >= 0) & (period_weeks < weeks)
+    add.at(
+        inflows,
+        (broadcast_to(rows[:, None], due.shape)[due], period_weeks[due]),
+        broadcast_to(amounts[:, None], due.shape)[due],
+    )
+
+
+def compute_cash_forecast(
+    start: Union[date, None] = None, weeks=FORECAST_WEEKS, batch_size=500
+) -> CashForecast:
+    """
+    Forecast the weekly Cash Inflow of every Area for weeks from the week of start
+    """
+    start = get_week_start(start or date.today())
+    refresh_expired_predictions(
+        Customer.objects.filter(active_connection=True), batch_size
+    )
+    areas = list(Area.objects.order_by("name").values_list("pk", "name"))
+    area_rows = {area_id: row for row, (area_id, _) in enumerate(areas)}
+    inflows = zeros((len(areas), weeks))
+    payments = list(get_expected_payments())
+    if payments:
+        area_ids, payment_dates, default_probabilities, billed = zip(*payments)
+        add_weekly_inflows(
+            inflows,
+            array([area_rows[area_id] for area_id in area_ids]),
+            array([(payment_date - start).days for payment_date in payment_dates]),
+            asarray(billed, dtype=float)
+            * (1 - asarray(default_probabilities, dtype=float)),
+        )
+    return CashForecast(
+        weeks=[start + timedelta(weeks=week) for week in range(weeks)],
+        areas=[
+            AreaForecast(
+                area_id, name, inflows[row].tolist(), float(inflows[row].sum())
+            )
+            for row, (area_id, name) in enumerate(areas)
+        ],
+        totals=inflows.sum(axis=0).tolist(),
+    )
+
+
+def build_cash_forecast(weeks=FORECAST_WEEKS, batch_size=500) -> CashForecast:
+    """
+    Replace the stored Cash Inflow Forecast with one from the current week
+    """
+    forecast = compute_cash_forecast(weeks=weeks, batch_size=batch_size)
+    with transaction.atomic():
+        AreaInflow.objects.all().delete()
+        AreaInflow.objects.bulk_create(
+            (
+                AreaInflow(area_id=area.area_id, week=week, amount=inflow)
+                for area in forecast.areas
+                for week, inflow in zip(forecast.weeks, area.inflows)
+            ),
+            batch_size=batch_size,
+        )
+    return forecast
+
+
+def get_cash_forecast(weeks=FORECAST_WEEKS) -> CashForecast:
+    """
+    Get the stored Cash Inflow Forecast from the current week, without any week
+    or Area when none is stored
+    """
+    start = get_week_start(date.today())
+    rows = list(
+        AreaInflow.objects.filter(
+            week__gte=start, week__lt=start + timedelta(weeks=weeks)
+        )
+        .order_by("area__name", "area", "week")
+        .values_list("area", "area__name", "week", "amount")
+    )
+    inflows: Dict[Tuple[int, str], List[float]] = {}
+    for area_id, name, _, amount in rows:
+        inflows.setdefault((area_id, name), []).append(amount)
+    return CashForecast(
+        weeks=sorted({week for _, _, week, _ in rows}),
+        areas=[
+            AreaForecast(area_id, name, area_inflows, sum(area_inflows))
+            for (area_id, name), area_inflows in inflows.items()
+        ],
+        totals=[sum(week_inflows) for week_inflows in zip(*inflows.values())],
+    )
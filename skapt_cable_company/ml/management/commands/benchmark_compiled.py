@@ -0,0 +1,36 @@
+"""
+Management Command to benchmark the compiled Delay Model against sklearn
+"""
+
+from django.core.management.base import BaseCommand
+
+from ml.benchmarks import benchmark_compiled_delay
+
+
+class Command(BaseCommand):
+    """
+    Command to compare the sklearn and compiled Delay Model latency
+    """
+
+    help = "Compare the sklearn and compiled Delay Model latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[1, 10000],
+            help="Row counts of the benchmarked Feature Matrices",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timed calls per row count"
+        )
+
+    def handle(self, *args, **options):
+        for result in benchmark_compiled_delay(options["rows"], options["repeat"]):
+            self.stdout.write(
+                f"{result['rows']:>8} rows: "
+                f"sklearn {result['sklearn'] * 1000:.3f} ms, "
+                f"compiled {result['compiled'] * 1000:.3f} ms, "
+                f"speedup {result['speedup']:.2f}x"
+            )
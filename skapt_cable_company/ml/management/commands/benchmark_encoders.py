@@ -0,0 +1,32 @@
+"""
+Management Command to benchmark the vectorized Feature Encoders against the per row ones
+"""
+
+from django.core.management.base import BaseCommand
+
+from ml.benchmarks import benchmark_encoders
+
+
+class Command(BaseCommand):
+    """
+    Command to compare the per row and vectorized Feature Encoding time
+    """
+
+    help = "Compare the per row and vectorized Feature Encoding time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100000, help="Number of encoded Customers"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Timed calls per encoder"
+        )
+
+    def handle(self, *args, **options):
+        for result in benchmark_encoders(options["rows"], options["repeat"]):
+            self.stdout.write(
+                f"{result['model']:>8} {result['rows']} rows: "
+                f"per row {result['per_row'] * 1000:.3f} ms, "
+                f"vectorized {result['vectorized'] * 1000:.3f} ms, "
+                f"speedup {result['speedup']:.2f}x"
+            )
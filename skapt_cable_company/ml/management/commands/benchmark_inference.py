@@ -0,0 +1,56 @@
+"""
+Management Command to benchmark the Inference latency and throughput of the Models
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from ml.benchmarks import INFERENCE_BATCH_SIZES, benchmark_inference
+
+
+class Command(BaseCommand):
+    """
+    Command to write a JSON Report of the Model load time, latency and throughput
+    """
+
+    help = "Write a JSON Report of the Model load time, latency and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="File to write the JSON Report to, printed when not given",
+        )
+        parser.add_argument(
+            "--batch-sizes",
+            type=int,
+            nargs="+",
+            default=list(INFERENCE_BATCH_SIZES),
+            help="Batch Sizes of the throughput measurements",
+        )
+        parser.add_argument(
+            "--latency-calls",
+            type=int,
+            default=200,
+            help="Single row predictions timed for the latency percentiles",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Timed calls per measurement"
+        )
+
+    def handle(self, *args, **options):
+        report = json.dumps(
+            benchmark_inference(
+                options["batch_sizes"], options["latency_calls"], options["repeat"]
+            ),
+            indent=2,
+            sort_keys=True,
+        )
+        if options["output"] is None:
+            self.stdout.write(report)
+        else:
+            options["output"].write_text(report + "\n", encoding="utf-8")
+            self.stdout.write(f"Wrote the Inference Benchmark to {options['output']}")
@@ -0,0 +1,34 @@
+"""
+Management Command to benchmark the Startup Time of a Django process
+"""
+
+from django.core.management.base import BaseCommand
+
+from ml.benchmarks import benchmark_startup
+
+
+class Command(BaseCommand):
+    """
+    Command to report the Import Time breakdown of a fresh Django process
+    """
+
+    help = "Report the Import Time breakdown of a fresh Django process"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--load-models",
+            action="store_true",
+            help="Also load the Prediction Models after setting up Django",
+        )
+        parser.add_argument(
+            "--top", type=int, default=15, help="Number of packages to report"
+        )
+
+    def handle(self, *args, **options):
+        result = benchmark_startup(options["load_models"])
+        self.stdout.write(f"Wall time   {result['wall_time'] * 1000:10.1f} ms")
+        self.stdout.write(f"Import time {result['import_time'] * 1000:10.1f} ms")
+        for package, import_time in list(result["packages"].items())[
+            : options["top"]
+        ]:
+            self.stdout.write(f"  {package:<30} {import_time * 1000:10.1f} ms")
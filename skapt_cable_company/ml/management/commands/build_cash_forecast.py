@@ -0,0 +1,36 @@
+"""
+Management Command to build the weekly Cash Inflow Forecast of the Areas
+"""
+
+from django.core.management.base import BaseCommand
+
+from ml.forecast import FORECAST_WEEKS, build_cash_forecast
+
+
+class Command(BaseCommand):
+    """
+    Command to store the Cash Inflow Forecast shown on the Cash Forecast Page
+    """
+
+    help = "Rebuild the weekly Cash Inflow Forecast of the Areas from the Predictions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--weeks",
+            type=int,
+            default=FORECAST_WEEKS,
+            help="Number of weeks forecast from the current week",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of Customers scored and Inflows stored per batch",
+        )
+
+    def handle(self, *args, **options):
+        forecast = build_cash_forecast(options["weeks"], options["batch_size"])
+        self.stdout.write(
+            f"Forecast {sum(forecast.totals):.0f} LKR over {len(forecast.weeks)} weeks"
+            f" for {len(forecast.areas)} Areas"
+        )
@@ -0,0 +1,27 @@
+"""
+Management Command to build the daily Collection Worklists of the Agents
+"""
+
+from django.core.management.base import BaseCommand
+
+from ml.worklists import build_worklists
+
+
+class Command(BaseCommand):
+    """
+    Command to rebuild the Collection Visits from the Expected Payment Dates
+    """
+
+    help = "Rebuild the daily Collection Worklists of the Agents from the Predictions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of Customers scored and Visits stored per batch",
+        )
+
+    def handle(self, *args, **options):
+        visits = build_worklists(options["batch_size"])
+        self.stdout.write(f"Built {visits} Collection Visits")
@@ -0,0 +1,127 @@
+"""
+Management Command to fit and publish compact surrogates of the Prediction Models
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from ml.artifacts import (
+    get_artifact_dir,
+    get_current_dir,
+    publish_artifacts,
+    read_manifest,
+)
+from ml.compaction import (
+    COMPACT_COMPONENTS,
+    COMPACT_DEPTH,
+    COMPACT_TREES,
+    HOLDOUT_SAMPLES,
+    SURROGATE_SAMPLES,
+    compact_models,
+)
+
+
+class Command(BaseCommand):
+    """
+    Command to fit compact surrogates of the current Models and report their accuracy
+    """
+
+    help = (
+        "Fit compact surrogates of the current Models, report their accuracy change "
+        "and speed up and publish them next to the full Models"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="Artifact directory of the current Models, ML_ARTIFACT_DIR by default",
+        )
+        parser.add_argument(
+            "--model-version",
+            default=None,
+            help="Model Version to publish, the current one suffixed by default",
+        )
+        parser.add_argument(
+            "--report",
+            type=Path,
+            default=None,
+            help="File to write the JSON Report to, printed when not given",
+        )
+        parser.add_argument(
+            "--report-only",
+            action="store_true",
+            help="Only report on the surrogates without publishing them",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=SURROGATE_SAMPLES,
+            help="Synthetic Customers the surrogates are fitted on",
+        )
+        parser.add_argument(
+            "--holdout",
+            type=int,
+            default=HOLDOUT_SAMPLES,
+            help="Held out synthetic Customers the surrogates are evaluated on",
+        )
+        parser.add_argument(
+            "--trees",
+            type=int,
+            default=COMPACT_TREES,
+            help="Trees of the Delay surrogate",
+        )
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=COMPACT_DEPTH,
+            help="Depth of the trees of the Delay surrogate",
+        )
+        parser.add_argument(
+            "--components",
+            type=int,
+            default=COMPACT_COMPONENTS,
+            help="Kernel landmarks of the Default surrogate, 0 for a linear one",
+        )
+        parser.add_argument(
+            "--latency-calls",
+            type=int,
+            default=200,
+            help="Single row predictions timed for the latency",
+        )
+
+    def handle(self, *args, **options):
+        root = options["output"] or get_artifact_dir()
+        directory = get_current_dir(root)
+        models, report = compact_models(
+            directory,
+            samples=options["samples"],
+            holdout=options["holdout"],
+            trees=options["trees"],
+            depth=options["depth"],
+            components=options["components"],
+            latency_calls=options["latency_calls"],
+        )
+        report_json = json.dumps(report, indent=2, sort_keys=True)
+        if options["report"] is None:
+            self.stdout.write(report_json)
+        else:
+            options["report"].write_text(report_json + "\n", encoding="utf-8")
+            self.stdout.write(f"Wrote the Surrogate Report to {options['report']}")
+        if options["report_only"]:
+            return
+        version = options["model_version"] or f"{report['model_version']}-surrogates"
+        manifest = None if directory is None else read_manifest(directory)
+        publish_artifacts(
+            models,
+            version,
+            root,
+            None if manifest is None else manifest.get("features"),
+        )
+        self.stdout.write(
+            f"Published Model Version {version} to {root}, "
+            "set ML_COMPACT_MODELS=1 to use its compact surrogates"
+        )
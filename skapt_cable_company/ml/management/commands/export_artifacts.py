@@ -0,0 +1,38 @@
+"""
+Management Command to publish the pickled Models as Memory Mapped Model Artifacts
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from ml.artifacts import get_artifact_dir, get_pickle_version, publish_artifacts
+from ml.compaction import compile_pickled_models
+from ml.predictors import DefaultPredictor, DelayPredictor
+
+
+class Command(BaseCommand):
+    """
+    Command to publish the pickled Models as a Model Version of .npy arrays
+    """
+
+    help = "Publish the pickled Models as a Model Version of .npy arrays"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="Artifact directory to publish to, ML_ARTIFACT_DIR by default",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["output"] or get_artifact_dir()
+        manifest = publish_artifacts(
+            compile_pickled_models(),
+            get_pickle_version(DelayPredictor.artifacts + DefaultPredictor.artifacts),
+            directory,
+        )
+        self.stdout.write(
+            f"Published Model Version {manifest['version']} to {directory}"
+        )
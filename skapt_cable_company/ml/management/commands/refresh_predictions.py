@@ -0,0 +1,34 @@
+"""
+Management Command to refresh the stored Customer Predictions
+"""
+
+from django.core.management.base import BaseCommand
+
+from common.models import Customer
+from ml.scoring import refresh_expired_predictions, refresh_predictions
+
+
+class Command(BaseCommand):
+    """
+    Command to refresh missing, stale and expired Customer Predictions in batches
+    """
+
+    help = "Refresh missing, stale and expired Customer Predictions in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of Customers scored per batch",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Refresh every Customer, even those with fresh Predictions",
+        )
+
+    def handle(self, *args, **options):
+        refresh = refresh_predictions if options["all"] else refresh_expired_predictions
+        refreshed = refresh(Customer.objects.all(), options["batch_size"])
+        self.stdout.write(f"Refreshed {refreshed} Customer Predictions")
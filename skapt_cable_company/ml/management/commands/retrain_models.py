@@ -0,0 +1,80 @@
+"""
+Management Command to retrain the Prediction Models from the live database
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.artifacts import get_artifact_dir
+from ml.training import (
+    DEFAULT_DAYS,
+    DEFAULT_MAX_ROWS,
+    DELAY_TREES,
+    FEATURE_CHUNK_SIZE,
+    retrain_models,
+)
+
+
+class Command(BaseCommand):
+    """
+    Command to fit new Models on the database and publish them as a Model Version
+    """
+
+    help = "Fit new Models on the database and publish them as a Model Version"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model-version",
+            default=None,
+            help="Model Version to publish, the current time by default",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="Artifact directory of the new Model Version, ML_ARTIFACT_DIR by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=FEATURE_CHUNK_SIZE,
+            help="Rows read from the database at a time",
+        )
+        parser.add_argument(
+            "--default-days",
+            type=int,
+            default=DEFAULT_DAYS,
+            help="Days without a Payment after which a Customer owing a balance defaults",
+        )
+        parser.add_argument(
+            "--trees",
+            type=int,
+            default=DELAY_TREES,
+            help="Trees of the Delay Model",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=DEFAULT_MAX_ROWS,
+            help="Customers sampled to fit the Default Model",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["output"] or get_artifact_dir()
+        version = options["model_version"] or datetime.now().strftime("%Y%m%d%H%M%S")
+        try:
+            manifest = retrain_models(
+                version,
+                directory,
+                chunk_size=options["chunk_size"],
+                default_days=options["default_days"],
+                trees=options["trees"],
+                max_rows=options["max_rows"],
+            )
+        except ValueError as error:
+            raise CommandError(error) from error
+        self.stdout.write(
+            f"Published Model Version {manifest['version']} to {directory}"
+        )
@@ -0,0 +1,57 @@
+"""
+Management Command to run the micro batching Prediction Server
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.registry import get_default_predictor, get_delay_predictor
+from ml.server import PredictionServer
+
+
+class Command(BaseCommand):
+    """
+    Command to serve batched Predictions on a Unix Socket
+    """
+
+    help = "Serve batched Predictions on a Unix Socket"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=None,
+            help="Unix Socket to listen on, ML_PREDICTION_SOCKET by default",
+        )
+        parser.add_argument(
+            "--window-ms",
+            type=float,
+            default=None,
+            help="Milliseconds to collect requests, ML_BATCH_WINDOW_MS by default",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=1000,
+            help="Rows after which a batch is predicted without waiting",
+        )
+
+    def handle(self, *args, **options):
+        path = options["socket"] or settings.ML_PREDICTION_SOCKET
+        if not path:
+            raise CommandError("Set ML_PREDICTION_SOCKET or pass --socket")
+        window_ms = options["window_ms"]
+        if window_ms is None:
+            window_ms = settings.ML_BATCH_WINDOW_MS
+        get_delay_predictor()
+        get_default_predictor()
+        if os.path.exists(path):
+            os.unlink(path)
+        with PredictionServer(path, window_ms / 1000, options["max_rows"]) as server:
+            self.stdout.write(f"Serving Predictions on {path}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        os.unlink(path)
@@ -0,0 +1,136 @@
+"""
+Module to contain the in process Metrics of the Prediction Models
+
+Counters count events such as timeouts and unknown categories, and Histograms
+count durations into fixed buckets of seconds along with their total
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List, Tuple
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Counts of observed values falling under each bucket bound, the last bucket
+    counting the values above every bound
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """
+        Class Initialization
+        """
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Count a value into its bucket
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> dict:
+        """
+        Get the bucket counts keyed by their upper bound, with the count and total
+        """
+        return {
+            "buckets": dict(
+                zip([str(bound) for bound in self.bounds] + ["+Inf"], self.counts)
+            ),
+            "count": self.count,
+            "sum": self.total,
+        }
+
+
+class Metrics:
+    """
+    Counters and Histograms of the events of the Prediction Models, shared by
+    every thread
+    """
+
+    def __init__(self) -> None:
+        """
+        Class Initialization
+        """
+        self._lock = Lock()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Add to a Counter
+        """
+        if amount:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def get(self, name: str) -> int:
+        """
+        Get the value of a Counter
+        """
+        return self.counters.get(name, 0)
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Count a value into a Histogram
+        """
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Count the seconds a block takes into a Histogram
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """
+        Get a copy of every Counter and Histogram
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: histogram.snapshot()
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def clear(self) -> None:
+        """
+        Reset every Counter and Histogram
+        """
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,52 @@
+"""
+Module to rank the Customers of the Portfolio by their Expected Loss
+
+The Expected Loss of a Customer is its outstanding balance times the Default
+Probability of its stored Prediction, both computed in the database on every
+request, so the ranking follows the data and no Customer is scored in the
+request. Customers without a stored Prediction are ranked last
+"""
+
+from typing import Union
+
+from django.db.models import F, QuerySet, Value
+from django.db.models.functions import Greatest
+
+from common.models import Customer
+
+
+def rank_customers(queryset: "QuerySet[Customer]") -> QuerySet:
+    """
+    Rank the Customers of the queryset by their Expected Loss, highest first
+    """
+    return (
+        queryset.with_balances()
+        .annotate(
+            default_probability=F("customerprediction__default_probability"),
+            expected_loss=Greatest(F("unpaid"), Value(0.0)) * F("default_probability"),
+        )
+        .order_by(F("expected_loss").desc(nulls_last=True), "pk")
+        .values(
+            "default_probability",
+            "expected_loss",
+            customer_id=F("pk"),
+            name=F("user__first_name"),
+            area_name=F("area__name"),
+            agent=F("area__agent__user__first_name"),
+            balance=F("unpaid"),
+        )
+    )
+
+
+def get_portfolio_risk(
+    area_id: Union[int, None] = None, agent_id: Union[int, None] = None
+) -> QuerySet:
+    """
+    Get the Customers ranked by their Expected Loss, optionally of an Area or Agent
+    """
+    customers = Customer.objects.all()
+    if area_id is not None:
+        customers = customers.filter(area=area_id)
+    if agent_id is not None:
+        customers = customers.filter(area__agent=agent_id)
+    return rank_customers(customers)
@@ -4,28 +4,120 @@ Module to contain all the Prediction Models
 
 from pickle import load
 from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple, Union
 
-
-from numpy import array, ndarray, zeros
+from numpy import argmax, array, asarray, column_stack, full, ndarray, where, zeros
 from django.conf import settings
-from sklearn.ensemble import (
-    GradientBoostingRegressor,
+
+from .artifacts import (
+    DEFAULT_PICKLES,
+    DELAY_PICKLES,
+    get_model_name,
+    get_version,
+    load_model,
+    read_manifest,
+)
+from .client import TIME_SERIES_OFFSET, get_payment_date
+from .compiled import (
+    CompiledGradientBoosting,
+    CompiledKernelApproximation,
+    CompiledStandardScaler,
+    CompiledSVC,
 )
-from sklearn.svm import SVC
-from sklearn.preprocessing import StandardScaler
+from .encoders import (
+    CustomerColumns,
+    count_unknown,
+    decode_identity_numbers,
+    get_digit,
+    lookup,
+    lookup_digit,
+    one_hot,
+)
+from .metrics import metrics
+from .priors import AREA_PROBS, PADDING_VALUE, UNKNOWN_PROB
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.svm import SVC
+    from sklearn.preprocessing import StandardScaler
 
 
-class DelayPredictor:
+class Predictor:
+    """
+    Base Class for the Prediction Models
+
+    A Predictor becomes read only once its artifacts are loaded so that a single
+    instance can be shared between every thread of the process. The time taken
+    to load, build Features and predict is recorded in the Metrics under its name
+    """
+
+    _frozen = False
+    name = ""
+    artifacts: Tuple[str, ...] = ()
+    feature_parameters: Tuple[str, ...] = ()
+    version = ""
+
+    def __setattr__(self, name: str, value) -> None:
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} is read only once loaded")
+        super().__setattr__(name, value)
+
+    def load_artifacts(self, directory: Union[Path, None]) -> None:
+        """
+        Load the Model artifacts of an artifact directory, or the pickles without one
+        """
+        raise NotImplementedError
+
+    def set_features(self, features: dict) -> None:
+        """
+        Replace the Feature parameters with the ones fitted along with the Model
+        """
+        for name in self.feature_parameters:
+            setattr(self, name, features[name])
+        self.index_features()
+
+    def index_features(self) -> None:
+        """
+        Build the lookup tables derived from the Feature parameters
+        """
+
+    def load(self, directory: Union[Path, None] = None):
+        """
+        Load the Model artifacts and freeze the Predictor
+        """
+        with metrics.timer(f"model_load_seconds.{self.name}"):
+            self.load_artifacts(directory)
+        self.version = get_version(directory)
+        for name, value in vars(self).items():
+            if isinstance(value, list):
+                value = tuple(value)
+            elif isinstance(value, dict):
+                value = MappingProxyType(value)
+            elif isinstance(value, ndarray):
+                value.setflags(write=False)
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+
+class DelayPredictor(Predictor):  # pylint: disable=too-many-instance-attributes
     """
     Class for the Delay Prediction Model
     """
 
+    name = "delay"
+    artifacts = DELAY_PICKLES
+    feature_parameters = ("padding_value", "mean", "var", "areas", "agent")
+    compiled_row_limit = 32
+
     def __init__(self) -> None:
         """
         Class Initialization
         """
-        self.time_series_offset = 5
-        self.padding_value = 3.8676470588235294
+        self.time_series_offset = TIME_SERIES_OFFSET
+        self.padding_value = PADDING_VALUE
         self.mean = array(
             [
                 3.91867997,
@@ -92,14 +184,48 @@ class DelayPredictor:
         ]
         self.cell = ["Airtel", "Dialog", "Mobital"]
         self.agent = ["Jeya", "Sai", "Seera"]
+        self.area_columns: Dict[str, int] = {}
+        self.agent_columns: Dict[str, int] = {}
+        self.cell_columns = [
+            int(argmax(self.get_cell_career_array(f"07{digit}"))) for digit in range(10)
+        ]
+        self.index_features()
+        self.model: Union["GradientBoostingRegressor", None] = None
+        self.compiled_model: Union[CompiledGradientBoosting, None] = None
 
-    def get_model(self) -> GradientBoostingRegressor:
+    def get_model(self) -> "GradientBoostingRegressor":
         """
         Function to load the Prediction Model
         """
         with open(f"{settings.BASE_DIR}//ml//grad_boost_model.pkl", "rb") as f:
             return load(f)
 
+    def index_features(self) -> None:
+        """
+        Build the One hot Encoder columns of the Areas and Agents
+        """
+        self.mean = asarray(self.mean, dtype=float)
+        self.var = asarray(self.var, dtype=float)
+        self.area_columns = {area_name: i for i, area_name in enumerate(self.areas)}
+        self.agent_columns = {agent_name: i for i, agent_name in enumerate(self.agent)}
+
+    def load_artifacts(self, directory: Union[Path, None]) -> None:
+        """
+        Load the memory mapped Model, or the pickled Model compiled into NumPy arrays
+
+        A retrained Model brings the Feature parameters it was fitted with
+        """
+        manifest = None if directory is None else read_manifest(directory)
+        if manifest is None:
+            self.model = self.get_model()
+            self.compiled_model = CompiledGradientBoosting.from_model(self.model)
+        else:
+            self.compiled_model = load_model(
+                manifest, get_model_name(manifest, "delay_model"), directory
+            )
+            if "features" in manifest:
+                self.set_features(manifest["features"]["delay"])
+
     def normalize(self, arr: ndarray, age: int, pay_date: int):
         """
         Normalize all the numerical features
@@ -139,56 +265,127 @@ class DelayPredictor:
             cell_array[2] = 1
         return cell_array
 
+    def get_payments_array(self, payment_days: List[int]) -> ndarray:
+        """
+        Get the Time Series of Payment Day offsets padded to the Time Series Offset
+        """
+        payments_array = zeros(self.time_series_offset) + self.time_series_offset
+        payment_days = payment_days[: self.time_series_offset]
+        payments_array[self.time_series_offset - len(payment_days) :] = payment_days
+        return payments_array
+
+    def get_payments_arrays(self, payment_days: Sequence[List[int]]) -> ndarray:
+        """
+        Get the padded Time Series of Payment Day offsets of many Customers
+        """
+        payments_arrays = (
+            zeros((len(payment_days), self.time_series_offset))
+            + self.time_series_offset
+        )
+        for payments_array, days in zip(payments_arrays, payment_days):
+            days = days[: self.time_series_offset]
+            payments_array[self.time_series_offset - len(days) :] = days
+        return payments_arrays
+
+    def get_customer_features(self, customer, payment_days: List[int]) -> ndarray:
+        """
+        Get the Feature Row of a Customer from its Payment Day offsets
+        """
+        pay_date = customer.area.collection_date
+        std_numerical_array = self.normalize(
+            self.get_payments_array(payment_days), customer.age, pay_date
+        )
+        area_array = self.get_area_array(customer.area.name)
+        agent_array = self.get_agent_array(customer.area.agent.user.first_name)
+        cell_array = self.get_cell_career_array(customer.phone_number)
+        return array(
+            list(std_numerical_array)
+            + list(area_array)
+            + [int(customer.is_male)]
+            + [int(customer.has_digital_box)]
+            + list(cell_array)
+            + list(agent_array)
+        )
+
+    def encode_features(
+        self, columns: CustomerColumns, payment_days: Sequence[List[int]]
+    ) -> ndarray:
+        """
+        Get the Feature Matrix of many Customers from their Feature Columns
 
-class DefaultPredictor:
+        Areas and Agents the Model was not fitted on encode to rows of zeros and
+        are counted in the Metrics
+        """
+        with metrics.timer("feature_build_seconds.delay"):
+            ages, is_male = decode_identity_numbers(columns.identity_numbers)
+            numerical_array = column_stack(
+                [
+                    self.get_payments_arrays(payment_days),
+                    full(len(ages), datetime.now().month),
+                    ages,
+                    asarray(columns.collection_dates),
+                ]
+            )
+            area_columns = lookup(columns.area_names, self.area_columns, -1)
+            agent_columns = lookup(columns.agent_names, self.agent_columns, -1)
+            metrics.increment("unknown_areas.delay", int((area_columns < 0).sum()))
+            metrics.increment("unknown_agents.delay", int((agent_columns < 0).sum()))
+            return column_stack(
+                [
+                    (numerical_array - self.mean) / self.var,
+                    one_hot(area_columns, len(self.areas)),
+                    is_male,
+                    asarray(columns.has_digital_boxes, dtype=bool),
+                    one_hot(
+                        lookup_digit(
+                            get_digit(columns.phone_numbers, 2),
+                            self.cell_columns,
+                            self.cell_columns[-1],
+                        ),
+                        len(self.cell),
+                    ),
+                    one_hot(agent_columns, len(self.agent)),
+                ]
+            ).astype(float)
+
+    def predict(self, features: ndarray) -> ndarray:
+        """
+        Predict the Payment Delays in Days rounded down to weeks for a Feature Matrix
+
+        Small matrices skip the sklearn input validation through the compiled model
+        while large ones are faster in the sklearn tree traversal when it is loaded
+        """
+        with metrics.timer("predict_seconds.delay"):
+            if self.model is None or len(features) <= self.compiled_row_limit:
+                return (self.compiled_model.predict(features) // 7) * 7
+            return (self.model.predict(features) // 7) * 7
+
+    get_payment_date = staticmethod(get_payment_date)
+
+
+class DefaultPredictor(Predictor):  # pylint: disable=too-many-instance-attributes
     """
     Class for the Default Prediction Model
     """
 
+    name = "default"
+    artifacts = DEFAULT_PICKLES
+    feature_parameters = (
+        "area_prob",
+        "agent_probs",
+        "gender_probs",
+        "cell_number_probs",
+        "box_probs",
+        "power_intake_probs",
+        "unknown_prob",
+    )
+
     def __init__(self):
         """
         Initialize Predictor
         """
-        self.area_prob = {
-            "2nd Croos Kallady": 1.000000,
-            "3rd Croos Kallady": 0.933333,
-            "4th Croos Kallady - 1": 1.000000,
-            "4th Croos Kallady - 2": 1.000000,
-            "4th Croos Kallady - 3": 1.000000,
-            "4th Croos Kallady - 4": 1.000000,
-            "5th Croos Kallady": 1.000000,
-            "6th Croos Kallady": 1.000000,
-            "7th Croos Kallady": 1.000000,
-            "8th Croos Kallady": 0.870968,
-            "9th Croos Kallady": 1.000000,
-            "Babisingam Rd": 1.000000,
-            "Babisingam Road": 1.000000,
-            "Baugger mavadi Road": 1.000000,
-            "Dharmasena Rd": 1.000000,
-            "Dutch Bar Road": 1.000000,
-            "Govt Quaters Rd": 1.000000,
-            "Iqnasiyas Road": 0.977778,
-            "Kallady 1st Cross": 1.000000,
-            "Krishnankovil Road": 0.941176,
-            "Malaimakal Road": 1.000000,
-            "Mariyamman Kovil": 0.979592,
-            "Music College": 1.000000,
-            "New Dutchbar Rd": 0.980769,
-            "New Kalmunai Road": 0.970588,
-            "Old Kalmunai Road": 0.941176,
-            "Pillayar Kovil Road": 1.000000,
-            "Puvalapillai Road": 1.000000,
-            "Sai Lane": 0.800000,
-            "Saravana Rd": 0.966667,
-            "Thiruchanthur": 1.000000,
-            "Thiruchenthoor Beach road": 0.818182,
-            "Thiruchenthu Road": 1.000000,
-            "Thiruchenthur West": 0.800000,
-            "Thirumakal Road": 1.000000,
-            "Thomas Antony Road": 1.000000,
-            "Varnakulasinam Road": 1.000000,
-            "Velankerney Road": 1.000000,
-        }
+        self.unknown_prob = UNKNOWN_PROB
+        self.area_prob = dict(AREA_PROBS)
         self.age_prob = {
             33: 0.000000,
             35: 0.941176,
@@ -229,21 +426,141 @@ class DefaultPredictor:
             5: cell_career_probs["Airtel"],
             6: cell_career_probs["Dialog"],
             7: cell_career_probs["Dialog"],
-            -1: 21 / 1041,
+            -1: self.unknown_prob,
         }
         self.agent_probs = {"Jeya": 0.986784, "Sai": 0.994220, "Seera": 0.966184}
         self.box_probs = {"analog": 0.933962, "digital": 0.985027}
+        self.power_intake_probs = {"offered": 1.0, "not offered": 0.979452}
+        self.cell_digit_probs: List[float] = []
+        self.known_cell_digits = zeros(10, dtype=bool)
+        self.index_features()
+        self.model: Union["SVC", CompiledSVC, CompiledKernelApproximation, None] = None
+        self.preprocessor: Union["StandardScaler", CompiledStandardScaler, None] = None
 
-    def get_model(self) -> SVC:
+    def get_model(self) -> "SVC":
         """
         Function to load the Prediction Model
         """
         with open(f"{settings.BASE_DIR}//ml//SVC.pkl", "rb") as f:
             return load(f)
 
-    def get_preprocessor(self) -> StandardScaler:
+    def get_preprocessor(self) -> "StandardScaler":
         """
         Function to load the Standard Scaler
         """
         with open(f"{settings.BASE_DIR}//ml//standard_scaler.pkl", "rb") as f:
             return load(f)
+
+    def index_features(self) -> None:
+        """
+        Build the Probability table of the ten Cell Number digits and which of
+        them have a probability of their own
+        """
+        self.cell_number_probs = {
+            int(digit): prob for digit, prob in self.cell_number_probs.items()
+        }
+        self.cell_digit_probs = [
+            self.cell_number_probs.get(digit, self.cell_number_probs[-1])
+            for digit in range(10)
+        ]
+        self.known_cell_digits = array(
+            [digit in self.cell_number_probs for digit in range(10)]
+        )
+
+    def load_artifacts(self, directory: Union[Path, None]) -> None:
+        """
+        Load the memory mapped SVC Model and Standard Scaler, or the pickled ones
+
+        A retrained Model brings the Probability tables it was fitted with
+        """
+        manifest = None if directory is None else read_manifest(directory)
+        if manifest is None:
+            self.model = self.get_model()
+            self.preprocessor = self.get_preprocessor()
+        else:
+            self.model = load_model(
+                manifest, get_model_name(manifest, "default_model"), directory
+            )
+            self.preprocessor = load_model(manifest, "default_preprocessor", directory)
+            if "features" in manifest:
+                self.set_features(manifest["features"]["default"])
+
+    def get_customer_features(self, customer) -> ndarray:
+        """
+        Get the Feature Row of a Customer
+        """
+        return array(
+            [
+                self.area_prob.get(customer.area.name, self.unknown_prob),
+                self.agent_probs.get(customer.area.agent.name, self.unknown_prob),
+                self.cell_number_probs.get(
+                    int(customer.phone_number[2]), self.cell_number_probs[-1]
+                ),
+                self.gender_probs.get(
+                    "Male" if customer.is_male else "Female", self.unknown_prob
+                ),
+                self.box_probs.get(
+                    "digital" if customer.has_digital_box else "analog",
+                    self.unknown_prob,
+                ),
+                self.power_intake_probs[
+                    "offered" if customer.offer_power_intake else "not offered"
+                ],
+                customer.age,
+                customer.area.collection_date,
+            ]
+        )
+
+    def encode_features(self, columns: CustomerColumns) -> ndarray:
+        """
+        Get the Feature Matrix of many Customers from their Feature Columns
+
+        Areas, Agents and Cell Number prefixes without a probability fall back to
+        the unknown probability and are counted in the Metrics
+        """
+        with metrics.timer("feature_build_seconds.default"):
+            ages, is_male = decode_identity_numbers(columns.identity_numbers)
+            digits = get_digit(columns.phone_numbers, 2)
+            metrics.increment(
+                "unknown_areas.default",
+                count_unknown(columns.area_names, self.area_prob),
+            )
+            metrics.increment(
+                "unknown_agents.default",
+                count_unknown(columns.agent_names, self.agent_probs),
+            )
+            metrics.increment(
+                "unknown_cell_prefixes.default",
+                int((~self.known_cell_digits[digits] | (digits < 0)).sum()),
+            )
+            return column_stack(
+                [
+                    lookup(columns.area_names, self.area_prob, self.unknown_prob),
+                    lookup(columns.agent_names, self.agent_probs, self.unknown_prob),
+                    lookup_digit(
+                        digits, self.cell_digit_probs, self.cell_number_probs[-1]
+                    ),
+                    where(
+                        is_male, self.gender_probs["Male"], self.gender_probs["Female"]
+                    ),
+                    where(
+                        asarray(columns.has_digital_boxes, dtype=bool),
+                        self.box_probs["digital"],
+                        self.box_probs["analog"],
+                    ),
+                    where(
+                        asarray(columns.offer_power_intakes, dtype=bool),
+                        self.power_intake_probs["offered"],
+                        self.power_intake_probs["not offered"],
+                    ),
+                    ages,
+                    asarray(columns.collection_dates),
+                ]
+            ).astype(float)
+
+    def predict(self, features: ndarray) -> ndarray:
+        """
+        Predict the Default Probabilities for a Feature Matrix
+        """
+        with metrics.timer("predict_seconds.default"):
+            return 1 - self.model.predict(self.preprocessor.transform(features))
@@ -0,0 +1,105 @@
+"""
+Module to contain the Priors the Prediction Models fall back to
+
+When the Models cannot predict within the latency budget, a Customer's Delay is
+the mean Payment Day offset and its Default Probability is the share of
+defaulters of its Area. A retrained Model Version brings its own Priors in its
+Manifest, the ones below are those of the pickled Models
+
+Like the Manifest, the Priors stay free of NumPy so they are at hand while the
+Models are still loading
+"""
+
+from typing import Dict, List, NamedTuple
+
+from .artifacts import read_manifest
+
+PADDING_VALUE = 3.8676470588235294
+UNKNOWN_PROB = 21 / 1041
+AREA_PROBS = {
+    "2nd Croos Kallady": 1.000000,
+    "3rd Croos Kallady": 0.933333,
+    "4th Croos Kallady - 1": 1.000000,
+    "4th Croos Kallady - 2": 1.000000,
+    "4th Croos Kallady - 3": 1.000000,
+    "4th Croos Kallady - 4": 1.000000,
+    "5th Croos Kallady": 1.000000,
+    "6th Croos Kallady": 1.000000,
+    "7th Croos Kallady": 1.000000,
+    "8th Croos Kallady": 0.870968,
+    "9th Croos Kallady": 1.000000,
+    "Babisingam Rd": 1.000000,
+    "Babisingam Road": 1.000000,
+    "Baugger mavadi Road": 1.000000,
+    "Dharmasena Rd": 1.000000,
+    "Dutch Bar Road": 1.000000,
+    "Govt Quaters Rd": 1.000000,
+    "Iqnasiyas Road": 0.977778,
+    "Kallady 1st Cross": 1.000000,
+    "Krishnankovil Road": 0.941176,
+    "Malaimakal Road": 1.000000,
+    "Mariyamman Kovil": 0.979592,
+    "Music College": 1.000000,
+    "New Dutchbar Rd": 0.980769,
+    "New Kalmunai Road": 0.970588,
+    "Old Kalmunai Road": 0.941176,
+    "Pillayar Kovil Road": 1.000000,
+    "Puvalapillai Road": 1.000000,
+    "Sai Lane": 0.800000,
+    "Saravana Rd": 0.966667,
+    "Thiruchanthur": 1.000000,
+    "Thiruchenthoor Beach road": 0.818182,
+    "Thiruchenthu Road": 1.000000,
+    "Thiruchenthur West": 0.800000,
+    "Thirumakal Road": 1.000000,
+    "Thomas Antony Road": 1.000000,
+    "Varnakulasinam Road": 1.000000,
+    "Velankerney Road": 1.000000,
+}
+
+
+class Priors(NamedTuple):
+    """
+    Priors of a Model Version
+    """
+
+    padding_value: float
+    area_prob: Dict[str, float]
+    unknown_prob: float
+
+
+def get_priors() -> Priors:
+    """
+    Get the Priors of the current Model Version, the built in ones when it has none
+    or its Manifest cannot be read
+    """
+    try:
+        features = (read_manifest() or {}).get("features")
+    except (OSError, ValueError):
+        features = None
+    if features is None:
+        return Priors(PADDING_VALUE, AREA_PROBS, UNKNOWN_PROB)
+    return Priors(
+        features["delay"]["padding_value"],
+        features["default"]["area_prob"],
+        features["default"]["unknown_prob"],
+    )
+
+
+def get_fallback_values(model: str, rows: List[dict]) -> List[float]:
+    """
+    Get the Prior Delays or Default Probabilities of Feature Rows
+    """
+    priors = get_priors()
+    if model == "delay":
+        return [priors.padding_value] * len(rows)
+    if model == "default":
+        return [
+            (
+                1 - priors.area_prob[row["area_name"]]
+                if row["area_name"] in priors.area_prob
+                else priors.unknown_prob
+            )
+            for row in rows
+        ]
+    raise ValueError(f"Unknown Model {model}")
@@ -0,0 +1,176 @@
+"""
+Module to contain the Process wide Model Registry
+
+The Predictors are imported on first use only, so importing the registry does
+not pull NumPy and sklearn into every process that loads the models module
+
+The registry checks for a newly published Model Version at most once every
+ML_MODEL_RELOAD_INTERVAL seconds. A new version replaces the old one in a single
+assignment and its Predictors are loaded on first use, so running processes pick
+up retrained models without a restart, a caller never mixes versions and reading
+the version never loads a Model
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import tracemalloc
+from pathlib import Path
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, Dict, NamedTuple, Type, TypeVar, Union
+
+from django.conf import settings
+
+from .artifacts import get_current_dir, get_version
+
+if TYPE_CHECKING:
+    from .predictors import DefaultPredictor, DelayPredictor, Predictor
+
+PredictorT = TypeVar("PredictorT", bound="Predictor")
+
+FALLBACK_VERSION = "fallback"
+
+
+class Generation(NamedTuple):
+    """
+    Predictors loaded from a single Model Version
+    """
+
+    directory: Union[Path, None]
+    version: str
+    predictors: Dict[Type["Predictor"], "Predictor"]
+
+
+class ModelRegistry:
+    """
+    Class to load every Prediction Model once per Model Version and process
+
+    Predictors are loaded lazily on first access and shared by every thread.
+    The load time and the memory allocated while loading are kept for reporting
+    """
+
+    def __init__(self) -> None:
+        """
+        Registry Initialization
+        """
+        self._lock = Lock()
+        self._generation: Union[Generation, None] = None
+        self._checked_at = 0.0
+        self.load_times: Dict[str, float] = {}
+        self.resident_sizes: Dict[str, int] = {}
+
+    def get(self, predictor_class: Type[PredictorT]) -> PredictorT:
+        """
+        Get the loaded Predictor of the given class, loading it if needed
+        """
+        predictor = self._current().predictors.get(predictor_class)
+        if predictor is None:
+            with self._lock:
+                generation = self._generation
+                predictor = generation.predictors.get(predictor_class)
+                if predictor is None:
+                    predictor = self._load(predictor_class, generation.directory)
+                    generation.predictors[predictor_class] = predictor
+        return predictor  # type: ignore
+
+    def _current(self) -> Generation:
+        """
+        Get the current Generation, swapping in a newly published Model Version
+        whose Predictors are loaded on first use
+        """
+        generation = self._generation
+        if (
+            generation is not None
+            and monotonic() - self._checked_at < settings.ML_MODEL_RELOAD_INTERVAL
+        ):
+            return generation
+        with self._lock:
+            generation = self._generation
+            if (
+                generation is None
+                or monotonic() - self._checked_at >= settings.ML_MODEL_RELOAD_INTERVAL
+            ):
+                directory = get_current_dir()
+                version = get_version(directory)
+                if generation is None or (directory, version) != (
+                    generation.directory,
+                    generation.version,
+                ):
+                    generation = Generation(directory, version, {})
+                    self._generation = generation
+                self._checked_at = monotonic()
+            return generation
+
+    def _load(
+        self, predictor_class: Type[PredictorT], directory: Union[Path, None]
+    ) -> PredictorT:
+        """
+        Load a Predictor while measuring the time and memory it takes
+        """
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = perf_counter()
+        predictor = predictor_class().load(directory)
+        self.load_times[predictor_class.__name__] = perf_counter() - start
+        self.resident_sizes[predictor_class.__name__] = (
+            tracemalloc.get_traced_memory()[0] - memory_before
+        )
+        if not was_tracing:
+            tracemalloc.stop()
+        return predictor
+
+    @property
+    def version(self) -> str:
+        """
+        Get the Model Version of the current artifacts without loading any Predictor,
+        the fallback version when the published Manifest cannot be read
+        """
+        try:
+            return self._current().version
+        except (OSError, ValueError, KeyError):
+            return FALLBACK_VERSION
+
+    def stats(self):
+        """
+        Get the Load Time in seconds and Resident Size in bytes of each loaded Predictor
+        """
+        return {
+            name: {
+                "load_time": load_time,
+                "resident_size": self.resident_sizes[name],
+            }
+            for name, load_time in self.load_times.items()
+        }
+
+    def clear(self) -> None:
+        """
+        Drop every loaded Predictor so the next access loads it again
+        """
+        with self._lock:
+            self._generation = None
+            self._checked_at = 0.0
+            self.load_times.clear()
+            self.resident_sizes.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_delay_predictor() -> "DelayPredictor":
+    """
+    Get the shared Delay Predictor
+    """
+    from .predictors import DelayPredictor
+
+    return registry.get(DelayPredictor)
+
+
+def get_default_predictor() -> "DefaultPredictor":
+    """
+    Get the shared Default Predictor
+    """
+    from .predictors import DefaultPredictor
+
+    return registry.get(DefaultPredictor)
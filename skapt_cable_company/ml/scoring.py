@@ -0,0 +1,127 @@
+"""
+Module to Score many Customers with the Prediction Models at once
+"""
+
+from datetime import date
+from typing import Dict, List, NamedTuple
+
+from django.db.models import QuerySet
+from django.utils.timezone import now
+
+from common.models import Customer, CustomerPrediction, Payment
+
+from .cache import get_default_probabilities
+from .encoders import CustomerColumns
+from .registry import get_delay_predictor
+
+PAYMENT_QUERY_CHUNK_SIZE = 900
+
+
+class CustomerScore(NamedTuple):
+    """
+    Predictions of a single Customer
+    """
+
+    expected_delay: float
+    expected_payment_date: date
+    default_probability: float
+    model_version: str
+
+
+def get_payment_days(customers: List[Customer], limit: int) -> Dict[int, List[int]]:
+    """
+    Get the last `limit` Payment Day offsets of each Customer ordered by date
+    """
+    payment_days: Dict[int, List[int]] = {customer.pk: [] for customer in customers}
+    customer_ids = list(payment_days.keys())
+    for i in range(0, len(customer_ids), PAYMENT_QUERY_CHUNK_SIZE):
+        payment_days.update(
+            Payment.objects.filter(
+                connection__customer__in=customer_ids[i : i + PAYMENT_QUERY_CHUNK_SIZE]
+            ).last_payment_days(limit)
+        )
+    return payment_days
+
+
+def score_customers(queryset: "QuerySet[Customer]") -> Dict[int, CustomerScore]:
+    """
+    Score every Customer of the queryset with a single predict call per model
+
+    Returns the Customer Scores keyed by the Customer primary key
+    """
+    customers = list(
+        queryset.select_related("area", "area__agent", "area__agent__user")
+    )
+    if not customers:
+        return {}
+    delay_predictor = get_delay_predictor()
+    payment_days = get_payment_days(customers, delay_predictor.time_series_offset)
+    expected_delays = delay_predictor.predict(
+        delay_predictor.encode_features(
+            CustomerColumns.from_customers(customers),
+            [payment_days[customer.pk] for customer in customers],
+        )
+    )
+    default_probabilities = get_default_probabilities(customers)
+    return {
+        customer.pk: CustomerScore(
+            expected_delay=expected_delay,
+            expected_payment_date=delay_predictor.get_payment_date(
+                expected_delay, customer.area.collection_date
+            ),
+            default_probability=default_probabilities[customer.pk],
+            model_version=delay_predictor.version,
+        )
+        for customer, expected_delay in zip(customers, expected_delays)
+    }
+
+
+def refresh_predictions(queryset: "QuerySet[Customer]", batch_size=500) -> int:
+    """
+    Score the Customers of the queryset in batches and store their Predictions
+
+    Returns the number of Customers refreshed
+    """
+    customer_ids = list(queryset.order_by("pk").values_list("pk", flat=True))
+    for i in range(0, len(customer_ids), batch_size):
+        scores = score_customers(
+            Customer.objects.filter(pk__in=customer_ids[i : i + batch_size])
+        )
+        computed_at = now()
+        CustomerPrediction.objects.bulk_create(
+            [
+                CustomerPrediction(
+                    customer_id=customer_id,
+                    expected_delay=score.expected_delay,
+                    expected_payment_date=score.expected_payment_date,
+                    default_probability=score.default_probability,
+                    model_version=score.model_version,
+                    computed_at=computed_at,
+                    stale=False,
+                )
+                for customer_id, score in scores.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["customer"],
+            update_fields=[
+                "expected_delay",
+                "expected_payment_date",
+                "default_probability",
+                "model_version",
+                "computed_at",
+                "stale",
+            ],
+        )
+    return len(customer_ids)
+
+
+def refresh_expired_predictions(queryset: "QuerySet[Customer]", batch_size=500) -> int:
+    """
+    Refresh the missing, stale and expired Predictions of the Customers of the queryset
+
+    Returns the number of Customers refreshed
+    """
+    return refresh_predictions(
+        queryset.exclude(pk__in=CustomerPrediction.objects.fresh().values("customer")),
+        batch_size,
+    )
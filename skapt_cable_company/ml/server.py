@@ -0,0 +1,189 @@
+"""
+Module to contain the micro batching Prediction Server
+
+Web workers send their feature rows over a Unix Socket. The requests arriving
+within a short window are predicted together with one call per model, so the
+models live in a single process and concurrent page loads share their inference
+"""
+
+import json
+from queue import Empty, Queue
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from threading import Event, Thread
+from time import monotonic
+from typing import List, Tuple, Union
+
+from .encoders import CustomerColumns
+from .metrics import metrics
+from .registry import get_default_predictor, get_delay_predictor
+
+
+def predict_rows(model: str, rows: List[dict]) -> Tuple[List[float], str]:
+    """
+    Predict Feature Rows with the Delay or Default Model
+
+    Returns the Predictions and the Model Version which predicted them
+    """
+    columns = CustomerColumns.from_rows(rows)
+    if model == "delay":
+        delay_predictor = get_delay_predictor()
+        features = delay_predictor.encode_features(
+            columns, [row["payment_days"] for row in rows]
+        )
+        return delay_predictor.predict(features).tolist(), delay_predictor.version
+    if model == "default":
+        default_predictor = get_default_predictor()
+        return (
+            default_predictor.predict(
+                default_predictor.encode_features(columns)
+            ).tolist(),
+            default_predictor.version,
+        )
+    raise ValueError(f"Unknown Model {model}")
+
+
+class PendingPrediction:  # pylint: disable=too-few-public-methods
+    """
+    Feature Rows of a request waiting for their batch to be predicted
+    """
+
+    def __init__(self, model: str, rows: List[dict]) -> None:
+        """
+        Class Initialization
+        """
+        self.model = model
+        self.rows = rows
+        self.predictions: List[float] = []
+        self.model_version = ""
+        self.error: Union[Exception, None] = None
+        self.done = Event()
+
+
+class MicroBatcher(Thread):
+    """
+    Thread collecting the Pending Predictions of a window into one batch
+    """
+
+    def __init__(self, window: float, max_rows: int) -> None:
+        """
+        Class Initialization
+        """
+        super().__init__(name="MicroBatcher", daemon=True)
+        self.window = window
+        self.max_rows = max_rows
+        self.queue: "Queue[Union[PendingPrediction, None]]" = Queue()
+        self.batch_count = 0
+
+    def submit(self, model: str, rows: List[dict]) -> Tuple[List[float], str]:
+        """
+        Wait for the Predictions of Feature Rows from the next batch and their Model Version
+        """
+        pending = PendingPrediction(model, rows)
+        self.queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.predictions, pending.model_version
+
+    def collect(self, first: PendingPrediction) -> List[PendingPrediction]:
+        """
+        Collect the Pending Predictions arriving within the window after the first
+        """
+        batch = [first]
+        rows = len(first.rows)
+        deadline = monotonic() + self.window
+        while rows < self.max_rows:
+            try:
+                pending = self.queue.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                break
+            if pending is None:
+                self.queue.put(None)
+                break
+            batch.append(pending)
+            rows += len(pending.rows)
+        return batch
+
+    def flush(self, batch: List[PendingPrediction]) -> None:
+        """
+        Predict a batch with one call per Model and hand out the Predictions
+        """
+        for model in {pending.model for pending in batch}:
+            group = [pending for pending in batch if pending.model == model]
+            try:
+                predictions, model_version = predict_rows(
+                    model, [row for pending in group for row in pending.rows]
+                )
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                for pending in group:
+                    pending.error = error
+            else:
+                start = 0
+                for pending in group:
+                    pending.predictions = predictions[start : start + len(pending.rows)]
+                    pending.model_version = model_version
+                    start += len(pending.rows)
+            self.batch_count += 1
+            for pending in group:
+                pending.done.set()
+
+    def run(self) -> None:
+        while True:
+            pending = self.queue.get()
+            if pending is None:
+                return
+            self.flush(self.collect(pending))
+
+    def stop(self) -> None:
+        """
+        Predict the waiting requests and stop the thread
+        """
+        self.queue.put(None)
+        self.join()
+
+
+class PredictionRequestHandler(StreamRequestHandler):
+    """
+    Handler answering each JSON line of a connection with its Predictions, or
+    with the Metrics of the server when they are requested
+    """
+
+    server: "PredictionServer"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("metrics"):
+                    response = {"metrics": metrics.snapshot()}
+                else:
+                    predictions, model_version = self.server.batcher.submit(
+                        request["model"], request["rows"]
+                    )
+                    response = {
+                        "predictions": predictions,
+                        "model_version": model_version,
+                    }
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                response = {"error": repr(error)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class PredictionServer(ThreadingUnixStreamServer):
+    """
+    Prediction Server handling every connection in its own thread
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, window: float, max_rows: int) -> None:
+        """
+        Class Initialization
+        """
+        self.batcher = MicroBatcher(window, max_rows)
+        super().__init__(path, PredictionRequestHandler)
+        self.batcher.start()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.stop()
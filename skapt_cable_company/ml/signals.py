@@ -0,0 +1,92 @@
+"""
+Module to contain the Signal Handlers invalidating stored Customer Predictions
+"""
+
+# pylint: disable=imported-auth-user,unused-argument
+
+from typing import Tuple
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from common.models import Area, Customer, CustomerPrediction, Payment
+
+from .cache import invalidate_default_probabilities
+
+CUSTOMER_FEATURE_FIELDS = (
+    "phone_number",
+    "identity_no",
+    "has_digital_box",
+    "offer_power_intake",
+    "area_id",
+)
+AREA_FEATURE_FIELDS = ("name", "collection_date", "agent_id")
+AGENT_FEATURE_FIELDS = ("first_name",)
+
+
+def feature_fields_changed(
+    instance: models.Model, fields: Tuple[str, ...], update_fields=None
+) -> bool:
+    """
+    Check if any of the feature fields of a saved instance differs from the stored row
+    """
+    if instance._state.adding:  # pylint: disable=protected-access
+        return False
+    if update_fields is not None and not any(
+        field in update_fields or field.removesuffix("_id") in update_fields
+        for field in fields
+    ):
+        return False
+    stored = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+    return stored is not None and any(
+        stored[field] != getattr(instance, field) for field in fields
+    )
+
+
+def invalidate_customers(customers: "models.QuerySet[Customer]") -> None:
+    """
+    Mark the stored Predictions stale and drop the cached Default Probabilities
+    """
+    CustomerPrediction.objects.filter(customer__in=customers).update(stale=True)
+    invalidate_default_probabilities(
+        customers.select_related("area", "area__agent", "area__agent__user")
+    )
+
+
+@receiver(post_save, sender=Payment)
+def mark_payment_customer_stale(sender, instance: Payment, **kwargs):
+    """
+    Mark the Prediction of the paying Customer stale
+    """
+    CustomerPrediction.objects.filter(
+        customer__customerconnection=instance.connection_id
+    ).update(stale=True)
+
+
+@receiver(pre_save, sender=Customer)
+def mark_customer_stale(sender, instance: Customer, update_fields=None, **kwargs):
+    """
+    Invalidate the Prediction of the Customer when one of its features changes
+    """
+    if feature_fields_changed(instance, CUSTOMER_FEATURE_FIELDS, update_fields):
+        invalidate_customers(Customer.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Area)
+def mark_area_customers_stale(sender, instance: Area, update_fields=None, **kwargs):
+    """
+    Invalidate the Predictions of the Area's Customers when one of its features changes
+    """
+    if feature_fields_changed(instance, AREA_FEATURE_FIELDS, update_fields):
+        invalidate_customers(Customer.objects.filter(area=instance))
+
+
+@receiver(pre_save, sender=User)
+def mark_agent_customers_stale(sender, instance: User, update_fields=None, **kwargs):
+    """
+    Invalidate the Predictions of the Agent's Customers when the Agent's name changes
+    """
+    if feature_fields_changed(instance, AGENT_FEATURE_FIELDS, update_fields):
+        invalidate_customers(Customer.objects.filter(area__agent__user=instance))
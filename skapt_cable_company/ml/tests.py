@@ -0,0 +1,2012 @@
+"""
+Module for all ML App Tests
+"""
+
+# pylint: disable=imported-auth-user,too-many-lines
+
+import json
+import os
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from socketserver import StreamRequestHandler, UnixStreamServer
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import sleep
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection as db_connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from numpy import load, memmap, vstack
+from numpy.random import default_rng
+from numpy.testing import assert_allclose, assert_array_equal
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import Ridge
+from sklearn.svm import SVC
+
+from common.models import (
+    Area,
+    AreaInflow,
+    Bill,
+    CollectionVisit,
+    Customer,
+    CustomerConnection,
+    CustomerPrediction,
+    DefaultProbability,
+    Payment,
+)
+from common.tests import BaseTestCase
+
+from .benchmarks import (
+    benchmark_startup,
+    synthetic_customers,
+    synthetic_delay_features,
+)
+from .artifacts import (
+    CURRENT_NAME,
+    MANIFEST_NAME,
+    export_artifacts,
+    get_current_dir,
+    load_model,
+    publish_artifacts,
+    read_manifest,
+)
+from .cache import (
+    get_default_probabilities,
+    get_default_probability_key,
+    predict_default_probabilities,
+)
+from .client import (
+    FALLBACK_VERSION,
+    Predictions,
+    get_customer_row,
+    get_payment_date,
+    predict,
+    request_metrics,
+    request_predictions,
+)
+from .compiled import (
+    CompiledGradientBoosting,
+    CompiledKernelApproximation,
+    CompiledSVC,
+)
+from .forecast import (
+    build_cash_forecast,
+    compute_cash_forecast,
+    get_cash_forecast,
+    get_week_start,
+)
+from .metrics import Metrics, metrics
+from .encoders import (
+    CustomerColumns,
+    decode_identity_numbers,
+    get_digit,
+    lookup,
+    lookup_digit,
+    one_hot,
+)
+from .portfolio import get_portfolio_risk
+from .predictors import DefaultPredictor, DelayPredictor, Predictor
+from .priors import AREA_PROBS, PADDING_VALUE, UNKNOWN_PROB, get_fallback_values
+from .registry import (
+    ModelRegistry,
+    get_default_predictor,
+    get_delay_predictor,
+    registry,
+)
+from .scoring import refresh_predictions, score_customers
+from .server import MicroBatcher, PendingPrediction, PredictionServer, predict_rows
+from .training import extract_features, extract_payments, load_features
+
+
+class ModelRegistryTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Process wide Model Registry
+    """
+
+    def test_shared_predictors(self):
+        """
+        Test the same Predictor instance is returned on every access
+        """
+        self.assertIs(get_delay_predictor(), get_delay_predictor())
+        self.assertIs(get_default_predictor(), get_default_predictor())
+        self.assertIs(get_delay_predictor(), registry.get(DelayPredictor))
+
+    def test_loads_once(self):
+        """
+        Test the artifacts are read from disk only once
+        """
+        model_registry = ModelRegistry()
+        with patch.object(
+            DelayPredictor,
+            "get_model",
+            autospec=True,
+            return_value=get_delay_predictor().model,
+        ) as get_model:
+            for _ in range(3):
+                model_registry.get(DelayPredictor)
+        self.assertEqual(get_model.call_count, 1)
+
+    def test_loads_once_across_threads(self):
+        """
+        Test concurrent first accesses share a single load
+        """
+        model_registry = ModelRegistry()
+        predictors = []
+        with patch.object(
+            DefaultPredictor, "load_artifacts", autospec=True
+        ) as load_artifacts:
+            threads = [
+                Thread(
+                    target=lambda: predictors.append(
+                        model_registry.get(DefaultPredictor)
+                    )
+                )
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(load_artifacts.call_count, 1)
+        self.assertEqual(len({id(predictor) for predictor in predictors}), 1)
+
+    def test_read_only(self):
+        """
+        Test loaded Predictors can not be modified
+        """
+        delay_predictor = get_delay_predictor()
+        with self.assertRaises(AttributeError):
+            delay_predictor.model = None
+        with self.assertRaises(AttributeError):
+            delay_predictor.areas.append("New Area")  # type: ignore
+        with self.assertRaises(ValueError):
+            delay_predictor.mean[0] = 0
+        with self.assertRaises(TypeError):
+            get_default_predictor().area_prob["New Area"] = 1  # type: ignore
+
+    def test_stats(self):
+        """
+        Test Load Time and Resident Size are reported
+        """
+        model_registry = ModelRegistry()
+        model_registry.get(DefaultPredictor)
+        stats = model_registry.stats()
+        self.assertEqual(list(stats.keys()), ["DefaultPredictor"])
+        self.assertGreater(stats["DefaultPredictor"]["load_time"], 0)
+        self.assertGreater(stats["DefaultPredictor"]["resident_size"], 0)
+
+    def test_clear(self):
+        """
+        Test clearing the Registry loads the Predictor again
+        """
+        model_registry = ModelRegistry()
+        predictor = model_registry.get(DefaultPredictor)
+        model_registry.clear()
+        self.assertEqual(model_registry.stats(), {})
+        self.assertIsNot(model_registry.get(DefaultPredictor), predictor)
+
+    def test_base_predictor_has_no_artifacts(self):
+        """
+        Test the base Predictor has to be extended with artifacts
+        """
+        with self.assertRaises(NotImplementedError):
+            Predictor().load()
+
+
+class ScoreCustomersTestCase(BaseTestCase):
+    """
+    Test Cases to test Batch Scoring of Customers
+    """
+
+    def generate_scorable_customers(self):
+        """
+        Generate Customers in Areas and Agents known to the Prediction Models
+        """
+        delay_predictor = get_delay_predictor()
+        areas = self.generate_areas(3)
+        for i, area in enumerate(areas):
+            area.name = delay_predictor.areas[i]
+            area.collection_date = i + 1
+            area.save()
+            area.agent.user.first_name = delay_predictor.agent[i]
+            area.agent.user.save()
+        customers = self.generate_customers(6, areas)
+        for i, customer in enumerate(customers):
+            customer.identity_no = f"19{70 + i}{i}840224{i}"
+            customer.phone_number = f"07{i}00684{i}{i}"
+            customer.has_digital_box = i % 2 == 0
+            customer.save()
+        self.generate_payments(12, customers=customers[:4])
+        return customers
+
+    def test_matches_single_customer_predictions(self):
+        """
+        Test Batch Scores are the same as the per Customer Predictions
+        """
+        self.generate_scorable_customers()
+        scores = score_customers(Customer.objects.all())
+        self.assertEqual(len(scores), Customer.objects.count())
+        for customer in Customer.objects.all():
+            score = scores[customer.pk]
+            self.assertAlmostEqual(score.expected_delay, customer.expected_delay)
+            self.assertEqual(
+                score.expected_payment_date, customer.expected_payment_date
+            )
+            self.assertAlmostEqual(
+                score.default_probability, customer.default_probability
+            )
+
+    def test_empty_queryset(self):
+        """
+        Test Scoring no Customers
+        """
+        self.assertEqual(score_customers(Customer.objects.none()), {})
+
+
+class PaymentDateTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Payment Date of an Expected Delay
+    """
+
+    def test_adds_delay_to_collection_date(self):
+        """
+        Test the Expected Delay is added to the Collection Date of the month once
+        """
+        self.assertEqual(get_payment_date(3, 10, date(2024, 5, 20)), date(2024, 5, 13))
+        self.assertEqual(get_payment_date(-2, 10, date(2024, 5, 20)), date(2024, 5, 8))
+
+    def test_collection_date_zero(self):
+        """
+        Test a Collection Date of zero falls on the first day of the month
+        """
+        self.assertEqual(get_payment_date(0, 0, date(2024, 5, 20)), date(2024, 5, 1))
+
+    def test_collection_date_after_month_end(self):
+        """
+        Test a Collection Date past the end of February falls on its last day
+        """
+        self.assertEqual(get_payment_date(1, 30, date(2023, 2, 10)), date(2023, 3, 1))
+        self.assertEqual(get_payment_date(0, 30, date(2024, 2, 10)), date(2024, 2, 29))
+
+
+class RefreshPredictionsTestCase(BaseTestCase):
+    """
+    Test Cases to test refreshing stored Customer Predictions
+    """
+
+    def test_refresh_in_batches(self):
+        """
+        Test every Customer gets a stored Prediction matching the Batch Scores
+        """
+        self.generate_payments(8)
+        self.assertEqual(
+            refresh_predictions(Customer.objects.all(), batch_size=2),
+            Customer.objects.count(),
+        )
+        scores = score_customers(Customer.objects.all())
+        for prediction in CustomerPrediction.objects.all():
+            score = scores[prediction.customer_id]
+            self.assertAlmostEqual(prediction.expected_delay, score.expected_delay)
+            self.assertAlmostEqual(
+                prediction.default_probability, score.default_probability
+            )
+            self.assertTrue(prediction.is_fresh)
+
+    def test_command_refreshes_only_outdated(self):
+        """
+        Test the Command refreshes only Customers without a fresh Prediction
+        """
+        customers = self.generate_customers(3)
+        customers[0].prediction  # pylint: disable=pointless-statement
+        out = StringIO()
+        call_command("refresh_predictions", stdout=out)
+        self.assertIn("Refreshed 2 Customer Predictions", out.getvalue())
+        self.assertEqual(CustomerPrediction.objects.fresh().count(), 3)
+        out = StringIO()
+        call_command("refresh_predictions", "--all", "--batch-size", "1", stdout=out)
+        self.assertIn("Refreshed 3 Customer Predictions", out.getvalue())
+
+
+class StalePredictionTestCase(BaseTestCase):
+    """
+    Test Cases to test stored Predictions are marked stale when their features change
+    """
+
+    def setUp(self):
+        """
+        Store a Prediction of a Customer
+        """
+        super().setUp()
+        self.customer = self.generate_customers(1)[0]
+        self.customer.prediction  # pylint: disable=pointless-statement
+
+    def assert_stale(self, stale=True):
+        """
+        Assert the stored Prediction of the Customer is stale or not
+        """
+        self.assertEqual(
+            CustomerPrediction.objects.get(customer=self.customer).stale, stale
+        )
+
+    def test_payment_saved(self):
+        """
+        Test a new Payment marks the Prediction stale
+        """
+        self.generate_payments(1, customers=[self.customer])
+        self.assert_stale()
+
+    def test_customer_feature_changed(self):
+        """
+        Test changing a Customer feature marks the Prediction stale
+        """
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.phone_number = "0710068454"
+        customer.save()
+        self.assert_stale()
+
+    def test_customer_other_field_changed(self):
+        """
+        Test changing a Customer field which is not a feature keeps the Prediction fresh
+        """
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.address = self.get_random_string(20)
+        customer.save()
+        customer.phone_number = "0710068454"
+        customer.save(update_fields=["address"])
+        self.assert_stale(False)
+
+    def test_area_feature_changed(self):
+        """
+        Test changing the Customer's Area marks the Prediction stale
+        """
+        area = Area.objects.get(pk=self.customer.area.pk)
+        area.collection_date = area.collection_date + 1
+        area.save()
+        self.assert_stale()
+
+    def test_agent_name_changed(self):
+        """
+        Test renaming the Customer's Agent marks the Prediction stale
+        """
+        agent = User.objects.get(pk=self.customer.area.agent.pk)
+        agent.first_name = self.get_random_string()
+        agent.save()
+        self.assert_stale()
+
+    def test_agent_login(self):
+        """
+        Test an Agent login does not mark the Prediction stale
+        """
+        self.login_as_employee(self.customer.area.agent)
+        self.assert_stale(False)
+
+
+class DefaultProbabilityCacheTestCase(BaseTestCase):
+    """
+    Test Cases to test Default Probabilities are stored by their features
+    """
+
+    def setUp(self):
+        """
+        Generate a Customer
+        """
+        super().setUp()
+        self.customer = self.generate_customers(1)[0]
+
+    def assert_invalidated(self, key: str):
+        """
+        Assert a stored Default Probability Key has been dropped
+        """
+        self.assertFalse(DefaultProbability.objects.filter(key=key).exists())
+
+    def test_cached(self):
+        """
+        Test a stored Default Probability is read without predicting again
+        """
+        probability = self.customer.predict_default_probability()
+        key = get_default_probability_key(self.customer)
+        stored = DefaultProbability.objects.get(key=key)
+        self.assertEqual(stored.probability, probability)
+        self.assertIn(key, str(stored))
+        with patch.object(DefaultPredictor, "predict") as default_predict:
+            self.assertEqual(self.customer.predict_default_probability(), probability)
+        default_predict.assert_not_called()
+
+    def test_shared_by_same_features(self):
+        """
+        Test Customers with the same features share the cached Default Probability
+        """
+        other = self.generate_customers(1, [self.customer.area])[0]
+        other.phone_number = self.customer.phone_number[:3] + "1234567"
+        other.identity_no = self.customer.identity_no
+        other.save()
+        self.assertEqual(
+            get_default_probability_key(other),
+            get_default_probability_key(self.customer),
+        )
+        probability = self.customer.predict_default_probability()
+        with patch.object(DefaultPredictor, "predict") as default_predict:
+            self.assertEqual(
+                get_default_probabilities([other]), {other.pk: probability}
+            )
+        default_predict.assert_not_called()
+
+    def test_stored_in_bulk(self):
+        """
+        Test the probabilities of many Customers are read and stored in a few queries
+        and all kept
+        """
+        customers = synthetic_customers(2000, default_rng(0))
+        for pk, customer in enumerate(customers, 1):
+            customer.pk = pk
+        predictions = Predictions([0.25] * len(customers), registry.version)
+        with patch("ml.cache.predict", return_value=predictions), CaptureQueriesContext(
+            db_connection
+        ) as queries:
+            get_default_probabilities(customers)
+        self.assertLess(len(queries), 20)
+        with patch("ml.cache.predict") as default_predict:
+            probabilities = get_default_probabilities(customers)
+        default_predict.assert_not_called()
+        self.assertEqual(len(probabilities), len(customers))
+
+    def test_expired(self):
+        """
+        Test an expired Default Probability is predicted again
+        """
+        self.customer.predict_default_probability()
+        DefaultProbability.objects.update(
+            computed_at=now() - timedelta(days=30), probability=2
+        )
+        self.assertLessEqual(self.customer.predict_default_probability(), 1)
+
+    def test_uncached_other_version(self):
+        """
+        Test Default Probabilities of another Model Version are not stored
+        """
+        with patch("ml.cache.predict", return_value=Predictions([0.5], "retrained")):
+            self.assertEqual(
+                get_default_probabilities([self.customer]), {self.customer.pk: 0.5}
+            )
+        self.assertFalse(DefaultProbability.objects.exists())
+
+    def test_batch_scoring_uses_cache(self):
+        """
+        Test Batch Scoring reads cached Default Probabilities
+        """
+        probability = self.customer.predict_default_probability()
+        with patch.object(DefaultPredictor, "predict") as default_predict:
+            scores = score_customers(Customer.objects.all())
+        default_predict.assert_not_called()
+        self.assertEqual(scores[self.customer.pk].default_probability, probability)
+
+    def test_customer_feature_changed(self):
+        """
+        Test changing a Customer feature drops its cached Default Probability
+        """
+        self.customer.predict_default_probability()
+        key = get_default_probability_key(self.customer)
+        self.customer.has_digital_box = not self.customer.has_digital_box
+        self.customer.save()
+        self.assert_invalidated(key)
+        self.assertNotEqual(get_default_probability_key(self.customer), key)
+
+    def test_area_feature_changed(self):
+        """
+        Test changing the Customer's Area drops its cached Default Probability
+        """
+        self.customer.predict_default_probability()
+        key = get_default_probability_key(self.customer)
+        area = Area.objects.get(pk=self.customer.area.pk)
+        area.collection_date = area.collection_date + 1
+        area.save()
+        self.assert_invalidated(key)
+
+    def test_agent_name_changed(self):
+        """
+        Test renaming the Customer's Agent drops its cached Default Probability
+        """
+        self.customer.predict_default_probability()
+        key = get_default_probability_key(self.customer)
+        agent = User.objects.get(pk=self.customer.area.agent.pk)
+        agent.first_name = self.get_random_string()
+        agent.save()
+        self.assert_invalidated(key)
+
+
+class FeatureEncodersTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Vectorized Feature Encoders
+    """
+
+    def setUp(self):
+        """
+        Generate Customers in known and unknown Areas
+        """
+        self.customers = synthetic_customers(300, default_rng(0))
+        self.columns = CustomerColumns.from_customers(self.customers)
+
+    def test_delay_parity(self):
+        """
+        Test the Delay Feature Matrix matches the per row Features
+        """
+        delay_predictor = get_delay_predictor()
+        payment_days = [
+            list(range(i % (delay_predictor.time_series_offset + 2)))
+            for i in range(len(self.customers))
+        ]
+        assert_array_equal(
+            delay_predictor.encode_features(self.columns, payment_days),
+            vstack(
+                [
+                    delay_predictor.get_customer_features(customer, days)
+                    for customer, days in zip(self.customers, payment_days)
+                ]
+            ),
+        )
+
+    def test_default_parity(self):
+        """
+        Test the Default Feature Matrix matches the per row Features
+        """
+        default_predictor = get_default_predictor()
+        assert_array_equal(
+            default_predictor.encode_features(self.columns),
+            vstack(
+                [
+                    default_predictor.get_customer_features(customer)
+                    for customer in self.customers
+                ]
+            ),
+        )
+
+    def test_one_hot_parity(self):
+        """
+        Test every Cell Career prefix and unknown names encode as the per row encoders
+        """
+        delay_predictor = get_delay_predictor()
+        phone_numbers = [f"07{digit}1234567" for digit in range(10)] + ["07+1234567"]
+        assert_array_equal(
+            one_hot(
+                lookup_digit(
+                    get_digit(phone_numbers, 2),
+                    delay_predictor.cell_columns,
+                    delay_predictor.cell_columns[-1],
+                ),
+                len(delay_predictor.cell),
+            ),
+            vstack(
+                [
+                    delay_predictor.get_cell_career_array(phone_number)
+                    for phone_number in phone_numbers
+                ]
+            ),
+        )
+        agent_names = list(delay_predictor.agent) + ["Unknown"]
+        assert_array_equal(
+            one_hot(
+                lookup(agent_names, delay_predictor.agent_columns, -1),
+                len(delay_predictor.agent),
+            ),
+            vstack(
+                [
+                    delay_predictor.get_agent_array(agent_name)
+                    for agent_name in agent_names
+                ]
+            ),
+        )
+
+    def test_identity_numbers(self):
+        """
+        Test Ages and Genders are decoded as the Customer does
+        """
+        ages, is_male = decode_identity_numbers(self.columns.identity_numbers)
+        self.assertEqual(ages.tolist(), [customer.age for customer in self.customers])
+        self.assertEqual(
+            is_male.tolist(), [customer.is_male for customer in self.customers]
+        )
+
+    def test_no_customers(self):
+        """
+        Test encoding no Customers
+        """
+        columns = CustomerColumns.from_customers([])
+        self.assertEqual(
+            get_delay_predictor().encode_features(columns, []).shape, (0, 54)
+        )
+        self.assertEqual(get_default_predictor().encode_features(columns).shape, (0, 8))
+
+    def test_benchmark_command(self):
+        """
+        Test the Encoder Benchmark Command reports both Models
+        """
+        out = StringIO()
+        call_command("benchmark_encoders", rows=50, repeat=1, stdout=out)
+        self.assertIn("delay 50 rows", out.getvalue())
+        self.assertIn("default 50 rows", out.getvalue())
+
+
+class PredictionServerTestCase(SimpleTestCase):
+    """
+    Test Cases to test the micro batching Prediction Server and its Client
+    """
+
+    def setUp(self):
+        """
+        Serve Predictions on a Unix Socket of a temporary directory
+        """
+        self.temporary_directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = str(Path(self.temporary_directory.name) / "prediction.sock")
+        self.server = PredictionServer(self.path, 0.2, 1000)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.rows = [
+            get_customer_row(customer, [3, -1])
+            for customer in synthetic_customers(20, default_rng(0))
+        ]
+
+    def tearDown(self):
+        """
+        Stop the Prediction Server
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        self.temporary_directory.cleanup()
+
+    def test_matches_in_process(self):
+        """
+        Test served Predictions are the in process ones
+        """
+        with override_settings(ML_PREDICTION_SOCKET=self.path):
+            for model in ("delay", "default"):
+                self.assertEqual(
+                    predict(model, self.rows), predict_rows(model, self.rows)
+                )
+        self.assertEqual(self.server.batcher.batch_count, 2)
+
+    def test_concurrent_requests_batched(self):
+        """
+        Test concurrent requests within the window share one predict call
+        """
+        results = {}
+
+        def request(i):
+            results[i] = request_predictions("default", self.rows[i : i + 1])
+
+        with override_settings(ML_PREDICTION_SOCKET=self.path):
+            threads = [Thread(target=request, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(self.server.batcher.batch_count, 1)
+        self.assertEqual(
+            [results[i].values[0] for i in range(8)],
+            predict_rows("default", self.rows[:8])[0],
+        )
+
+    def test_metrics_request(self):
+        """
+        Test the Metrics of the Prediction Server are requested over its socket
+        """
+        metrics.clear()
+        with override_settings(ML_PREDICTION_SOCKET=self.path):
+            predict("default", self.rows)
+            server_metrics = request_metrics()
+        self.assertEqual(
+            server_metrics["histograms"]["predict_seconds.default"]["count"], 1
+        )
+
+    def test_failed_request(self):
+        """
+        Test a failed request is reported to the Client
+        """
+        with override_settings(ML_PREDICTION_SOCKET=self.path):
+            with self.assertRaises(ConnectionError):
+                request_predictions("unknown", self.rows)
+            with self.assertRaises(ValueError):
+                predict("unknown", self.rows)
+
+    def test_falls_back_in_process(self):
+        """
+        Test Predictions are computed in process when the server is unreachable
+        """
+        with override_settings(ML_PREDICTION_SOCKET=self.path + ".missing"):
+            self.assertEqual(
+                predict("delay", self.rows), predict_rows("delay", self.rows)
+            )
+        self.assertEqual(self.server.batcher.batch_count, 0)
+
+    def test_closed_connection(self):
+        """
+        Test a server closing the connection without answering
+        """
+        path = self.path + ".closing"
+
+        class ClosingHandler(StreamRequestHandler):
+            """
+            Handler reading the request and closing without an answer
+            """
+
+            def handle(self):
+                self.rfile.readline()
+
+        with UnixStreamServer(path, ClosingHandler) as server:
+            Thread(target=server.handle_request, daemon=True).start()
+            with override_settings(ML_PREDICTION_SOCKET=path):
+                with self.assertRaises(ConnectionError):
+                    request_predictions("delay", self.rows)
+
+    def test_command(self):
+        """
+        Test the Prediction Server Command serves on the socket until interrupted
+        """
+        path = self.path + ".command"
+        Path(path).touch()
+        out = StringIO()
+        with patch.object(
+            PredictionServer, "serve_forever", side_effect=KeyboardInterrupt
+        ):
+            call_command("run_prediction_server", socket=path, window_ms=1, stdout=out)
+        self.assertIn(f"Serving Predictions on {path}", out.getvalue())
+        self.assertFalse(Path(path).exists())
+        with override_settings(ML_PREDICTION_SOCKET=None):
+            with self.assertRaises(CommandError):
+                call_command("run_prediction_server")
+
+    def test_command_default_window(self):
+        """
+        Test the Prediction Server Command batches within ML_BATCH_WINDOW_MS by default
+        """
+        windows = []
+
+        def serve_forever(server):
+            windows.append(server.batcher.window)
+            raise KeyboardInterrupt
+
+        with patch.object(
+            PredictionServer, "serve_forever", autospec=True, side_effect=serve_forever
+        ), override_settings(ML_BATCH_WINDOW_MS=5):
+            call_command(
+                "run_prediction_server",
+                socket=self.path + ".default",
+                stdout=StringIO(),
+            )
+        self.assertEqual(windows, [0.005])
+
+    def test_stop_during_collect(self):
+        """
+        Test a stop arriving within the window ends the batch and is kept for the thread
+        """
+        batcher = MicroBatcher(10, 1000)
+        first = PendingPrediction("delay", self.rows[:1])
+        second = PendingPrediction("delay", self.rows[1:2])
+        batcher.queue.put(second)
+        batcher.queue.put(None)
+        self.assertEqual(batcher.collect(first), [first, second])
+        self.assertIsNone(batcher.queue.get_nowait())
+
+
+class CompiledGradientBoostingTestCase(SimpleTestCase):
+    """
+    Test Cases to test the compiled Gradient Boosting Evaluator
+    """
+
+    def test_parity_with_delay_model(self):
+        """
+        Test the compiled Delay Model predicts the same as sklearn on random inputs
+        """
+        delay_predictor = get_delay_predictor()
+        generator = default_rng(7)
+        for features in (
+            synthetic_delay_features(delay_predictor, 2000, generator),
+            generator.normal(
+                scale=3, size=(2000, delay_predictor.model.n_features_in_)
+            ),
+            synthetic_delay_features(delay_predictor, 1, generator),
+        ):
+            assert_allclose(
+                delay_predictor.compiled_model.predict(features),
+                delay_predictor.model.predict(features),
+                atol=1e-9,
+            )
+
+    def test_parity_with_uneven_trees(self):
+        """
+        Test trees with leaves above the full depth predict the same as sklearn
+        """
+        generator = default_rng(11)
+        features = generator.normal(size=(300, 6))
+        model = GradientBoostingRegressor(
+            n_estimators=15, max_depth=5, min_samples_leaf=40, random_state=0
+        ).fit(features, features[:, 0] * 2 + (features[:, 1] > 0))
+        compiled_model = CompiledGradientBoosting.from_model(model)
+        self.assertEqual(
+            compiled_model.depth,
+            max(estimator.tree_.max_depth for estimator in model.estimators_[:, 0]),
+        )
+        self.assertEqual(compiled_model.tree_count, 15)
+        test_features = generator.normal(size=(500, 6))
+        assert_allclose(
+            compiled_model.predict(test_features, chunk_size=7),
+            model.predict(test_features),
+            atol=1e-9,
+        )
+
+    def test_benchmark_command(self):
+        """
+        Test the Benchmark Command reports every row count
+        """
+        out = StringIO()
+        call_command(
+            "benchmark_compiled", "--rows", "1", "20", "--repeat", "1", stdout=out
+        )
+        self.assertIn("       1 rows", out.getvalue())
+        self.assertIn("      20 rows", out.getvalue())
+
+
+class CompiledSVCTestCase(SimpleTestCase):
+    """
+    Test Cases to test the NumPy SVC and Standard Scaler
+    """
+
+    def test_parity_with_default_model(self):
+        """
+        Test the compiled Default Model predicts the same as sklearn
+        """
+        default_predictor = get_default_predictor()
+        model = default_predictor.model
+        compiled_model = CompiledSVC.from_model(model)
+        generator = default_rng(3)
+        features = default_predictor.preprocessor.transform(
+            generator.normal(
+                loc=default_predictor.preprocessor.mean_,
+                scale=default_predictor.preprocessor.scale_ * 2,
+                size=(1000, model.n_features_in_),
+            )
+        )
+        assert_allclose(
+            compiled_model.decision_function(features),
+            model.decision_function(features),
+            atol=1e-9,
+        )
+        assert_allclose(compiled_model.predict(features), model.predict(features))
+
+    def test_only_binary_rbf(self):
+        """
+        Test other SVCs can not be compiled
+        """
+        model = SVC(kernel="linear").fit([[0], [1]], [0, 1])
+        with self.assertRaises(ValueError):
+            CompiledSVC.from_model(model)
+
+
+class MemoryMappedArtifactsTestCase(SimpleTestCase):
+    """
+    Test Cases to test exporting and loading Memory Mapped Model Artifacts
+    """
+
+    def setUp(self):
+        """
+        Export the Artifacts to a temporary directory
+        """
+        self.temporary_directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.directory = Path(self.temporary_directory.name)
+        out = StringIO()
+        call_command("export_artifacts", "--output", str(self.directory), stdout=out)
+        self.assertIn(str(self.directory), out.getvalue())
+
+    def tearDown(self):
+        """
+        Remove the exported Artifacts
+        """
+        self.temporary_directory.cleanup()
+
+    def test_prefers_memory_mapped_artifacts(self):
+        """
+        Test the Predictors load the memory mapped arrays when they are exported
+        """
+        version = registry.version
+        with override_settings(ML_ARTIFACT_DIR=self.directory):
+            model_registry = ModelRegistry()
+            delay_predictor = model_registry.get(DelayPredictor)
+            default_predictor = model_registry.get(DefaultPredictor)
+            self.assertEqual(model_registry.version, version)
+            self.assertEqual(read_manifest()["version"], version)
+        self.assertIsNone(delay_predictor.model)
+        self.assertIsInstance(delay_predictor.compiled_model.threshold, memmap)
+        self.assertIsInstance(default_predictor.model.support_vectors, memmap)
+        generator = default_rng(5)
+        delay_features = synthetic_delay_features(delay_predictor, 100, generator)
+        assert_allclose(
+            delay_predictor.predict(delay_features),
+            get_delay_predictor().predict(delay_features),
+        )
+        default_features = generator.normal(
+            loc=get_default_predictor().preprocessor.mean_,
+            size=(100, 8),
+        )
+        assert_allclose(
+            default_predictor.predict(default_features),
+            get_default_predictor().predict(default_features),
+        )
+
+    def test_falls_back_to_pickles(self):
+        """
+        Test the Predictors load the pickled Models when nothing is exported
+        """
+        version = registry.version
+        with override_settings(ML_ARTIFACT_DIR=self.directory / "missing"):
+            model_registry = ModelRegistry()
+            delay_predictor = model_registry.get(DelayPredictor)
+            self.assertIsNone(read_manifest())
+            self.assertEqual(model_registry.version, version)
+        self.assertIsInstance(delay_predictor.model, GradientBoostingRegressor)
+
+
+class ModelVersionTestCase(SimpleTestCase):
+    """
+    Test Cases to test publishing Model Versions and reloading them without a restart
+    """
+
+    def setUp(self):
+        """
+        Publish the Models to a temporary directory
+        """
+        self.temporary_directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.root = Path(self.temporary_directory.name)
+        call_command("export_artifacts", "--output", str(self.root), stdout=StringIO())
+        directory = get_current_dir(self.root)
+        manifest = read_manifest(directory)
+        self.models = {
+            name: load_model(manifest, name, directory) for name in manifest["models"]
+        }
+
+    def tearDown(self):
+        """
+        Remove the published Model Versions
+        """
+        self.temporary_directory.cleanup()
+
+    def test_publish(self):
+        """
+        Test publishing makes a new Model Version current and keeps the old one
+        """
+        self.assertEqual(
+            (self.root / CURRENT_NAME).read_text(encoding="utf-8"), registry.version
+        )
+        publish_artifacts(self.models, "retrained", self.root)
+        self.assertEqual(get_current_dir(self.root), self.root / "retrained")
+        self.assertEqual(read_manifest(self.root / "retrained")["version"], "retrained")
+        self.assertIsNotNone(read_manifest(self.root / registry.version))
+
+    def test_republish(self):
+        """
+        Test publishing an exported Model Version does not rewrite its arrays
+        """
+        publish_artifacts(self.models, "retrained", self.root)
+        with patch("ml.artifacts.export_artifacts") as export:
+            publish_artifacts(self.models, registry.version, self.root)
+        export.assert_not_called()
+        self.assertEqual(get_current_dir(self.root), self.root / registry.version)
+
+    def test_unversioned_export(self):
+        """
+        Test a Manifest directly under the artifact directory is the current one
+        """
+        export_artifacts(self.models, self.root / "unversioned", "unversioned")
+        self.assertEqual(
+            get_current_dir(self.root / "unversioned"), self.root / "unversioned"
+        )
+        self.assertIsNone(get_current_dir(self.root / "missing"))
+
+    def test_hot_reload(self):
+        """
+        Test a published Model Version replaces the loaded Predictors
+        """
+        with override_settings(ML_ARTIFACT_DIR=self.root, ML_MODEL_RELOAD_INTERVAL=0):
+            model_registry = ModelRegistry()
+            predictor = model_registry.get(DelayPredictor)
+            publish_artifacts(self.models, "retrained", self.root)
+            self.assertEqual(model_registry.version, "retrained")
+            reloaded = model_registry.get(DelayPredictor)
+        self.assertIsNot(reloaded, predictor)
+        self.assertEqual(predictor.version, registry.version)
+        self.assertEqual(reloaded.version, "retrained")
+
+    def test_version_does_not_load(self):
+        """
+        Test reading a newly published Model Version loads no Predictor
+        """
+        with override_settings(ML_ARTIFACT_DIR=self.root, ML_MODEL_RELOAD_INTERVAL=0):
+            model_registry = ModelRegistry()
+            model_registry.get(DelayPredictor)
+            publish_artifacts(self.models, "retrained", self.root)
+            with patch.object(ModelRegistry, "_load") as load_predictor:
+                self.assertEqual(model_registry.version, "retrained")
+        load_predictor.assert_not_called()
+
+    def test_corrupt_manifest_version(self):
+        """
+        Test a corrupt Manifest gives the fallback version instead of raising
+        """
+        publish_artifacts(self.models, "retrained", self.root)
+        (self.root / "retrained" / MANIFEST_NAME).write_text("{", encoding="utf-8")
+        with override_settings(ML_ARTIFACT_DIR=self.root, ML_MODEL_RELOAD_INTERVAL=0):
+            model_registry = ModelRegistry()
+            self.assertEqual(model_registry.version, FALLBACK_VERSION)
+            with self.assertRaises(ValueError):
+                model_registry.get(DelayPredictor)
+
+    def test_reload_interval(self):
+        """
+        Test the published Model Version is not checked again within the interval
+        """
+        version = registry.version
+        with override_settings(
+            ML_ARTIFACT_DIR=self.root, ML_MODEL_RELOAD_INTERVAL=3600
+        ):
+            model_registry = ModelRegistry()
+            predictor = model_registry.get(DelayPredictor)
+            publish_artifacts(self.models, "retrained", self.root)
+            self.assertIs(model_registry.get(DelayPredictor), predictor)
+            self.assertEqual(model_registry.version, version)
+
+
+class SurrogateModelsTestCase(SimpleTestCase):
+    """
+    Test Cases to test compacting the Models into smaller surrogates
+    """
+
+    def setUp(self):
+        """
+        Publish the Models to a temporary directory
+        """
+        self.temporary_directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.root = Path(self.temporary_directory.name)
+        call_command("export_artifacts", "--output", str(self.root), stdout=StringIO())
+
+    def tearDown(self):
+        """
+        Remove the published Model Versions
+        """
+        self.temporary_directory.cleanup()
+
+    def compact(self, *args: str) -> str:
+        """
+        Run the Command on a few synthetic Customers
+        """
+        out = StringIO()
+        call_command(
+            "compact_models",
+            "--samples",
+            "300",
+            "--holdout",
+            "100",
+            "--trees",
+            "5",
+            "--depth",
+            "2",
+            "--components",
+            "20",
+            "--latency-calls",
+            "3",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_report_and_publish(self):
+        """
+        Test the surrogates are reported on and published next to the full Models
+        """
+        version = registry.version
+        report_path = self.root / "surrogates.json"
+        out = self.compact("--output", str(self.root), "--report", str(report_path))
+        self.assertIn(f"Published Model Version {version}-surrogates", out)
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+        self.assertEqual(report["model_version"], version)
+        self.assertEqual(report["rows"], 100)
+        self.assertLess(
+            report["delay"]["compact"]["size"], report["delay"]["full"]["size"]
+        )
+        self.assertLessEqual(report["delay"]["weekly_agreement"], 1)
+        self.assertGreater(report["default"]["latency_gain"], 0)
+        self.assertEqual(
+            get_current_dir(self.root), self.root / f"{version}-surrogates"
+        )
+        self.assertEqual(
+            set(read_manifest(self.root / f"{version}-surrogates")["models"]),
+            {
+                "delay_model",
+                "default_model",
+                "default_preprocessor",
+                "delay_model_compact",
+                "default_model_compact",
+            },
+        )
+
+    def test_setting_selects_compact_models(self):
+        """
+        Test the compact surrogates are loaded only when the setting selects them
+        """
+        version = registry.version
+        self.compact("--output", str(self.root), "--report", os.devnull)
+        with override_settings(ML_ARTIFACT_DIR=self.root, ML_COMPACT_MODELS=True):
+            model_registry = ModelRegistry()
+            self.assertEqual(model_registry.version, f"{version}-surrogates-compact")
+            self.assertEqual(
+                model_registry.get(DelayPredictor).compiled_model.tree_count, 5
+            )
+            self.assertIsInstance(
+                model_registry.get(DefaultPredictor).model,
+                CompiledKernelApproximation,
+            )
+        with override_settings(ML_ARTIFACT_DIR=self.root, ML_COMPACT_MODELS=False):
+            model_registry = ModelRegistry()
+            self.assertEqual(model_registry.version, f"{version}-surrogates")
+            self.assertEqual(
+                model_registry.get(DelayPredictor).compiled_model.tree_count, 1000
+            )
+            self.assertIsInstance(
+                model_registry.get(DefaultPredictor).model, CompiledSVC
+            )
+
+    def test_linear_report_only(self):
+        """
+        Test a linear surrogate of the pickled Models is only reported on
+        """
+        with TemporaryDirectory() as directory:
+            out = self.compact(
+                "--output", directory, "--components", "0", "--report-only"
+            )
+            self.assertIsNone(get_current_dir(Path(directory)))
+        report = json.loads(out)
+        self.assertEqual(report["model_version"], registry.version)
+        self.assertEqual(report["default"]["compact"]["size"], 8 * 8)
+
+    def test_kernel_approximation_parity(self):
+        """
+        Test the compiled Kernel Approximation matches the Nystroem Ridge Regression
+        """
+        generator = default_rng(3)
+        features = generator.normal(size=(200, 8))
+        feature_map = Nystroem(gamma=0.2, n_components=30, random_state=0).fit(features)
+        model = Ridge().fit(feature_map.transform(features), features[:, 0])
+        compiled = CompiledKernelApproximation.from_model(model, [0, 1], feature_map)
+        assert_allclose(
+            compiled.decision_function(features),
+            model.predict(feature_map.transform(features)),
+        )
+        assert_array_equal(
+            compiled.predict(features),
+            (model.predict(feature_map.transform(features)) > 0).astype(int),
+        )
+
+
+class StartupTestCase(SimpleTestCase):
+    """
+    Test Cases to test the ML stack is imported only when a Prediction is requested
+    """
+
+    def test_setup_does_not_import_ml_stack(self):
+        """
+        Test setting up Django and loading the URLs does not import sklearn or NumPy
+        """
+        packages = benchmark_startup()["packages"]
+        self.assertIn("django", packages)
+        self.assertNotIn("sklearn", packages)
+        self.assertNotIn("numpy", packages)
+
+    def test_benchmark_command(self):
+        """
+        Test the Startup Benchmark reports the packages imported to load the Models
+        """
+        out = StringIO()
+        call_command("benchmark_startup", "--load-models", "--top", "50", stdout=out)
+        self.assertIn("Import time", out.getvalue())
+        self.assertIn("numpy", out.getvalue())
+
+
+class InferenceBenchmarkTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Inference Benchmark
+    """
+
+    def test_report(self):
+        """
+        Test the JSON Report covers every Model and Batch Size
+        """
+        with TemporaryDirectory() as directory:
+            output = Path(directory) / "inference.json"
+            out = StringIO()
+            call_command(
+                "benchmark_inference",
+                output=output,
+                batch_sizes=[1, 5],
+                latency_calls=5,
+                repeat=1,
+                stdout=out,
+            )
+            report = json.loads(output.read_text(encoding="utf-8"))
+        self.assertIn(str(output), out.getvalue())
+        self.assertEqual(report["model_version"], registry.version)
+        self.assertEqual(set(report["models"]), {"delay", "default"})
+        for result in report["models"].values():
+            self.assertGreater(result["load_time"], 0)
+            self.assertLessEqual(result["latency"]["p50"], result["latency"]["p99"])
+            self.assertEqual(
+                [throughput["batch_size"] for throughput in result["throughput"]],
+                [1, 5],
+            )
+
+    def test_printed_report(self):
+        """
+        Test the JSON Report is printed without an output file
+        """
+        out = StringIO()
+        call_command(
+            "benchmark_inference",
+            batch_sizes=[2],
+            latency_calls=2,
+            repeat=1,
+            stdout=out,
+        )
+        self.assertIn("delay", json.loads(out.getvalue())["models"])
+
+
+class RetrainModelsTestCase(BaseTestCase):
+    """
+    Test Cases to test retraining the Models from the database
+    """
+
+    def setUp(self):
+        """
+        Generate paying and defaulting Customers in a temporary artifact directory
+        """
+        super().setUp()
+        self.temporary_directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.root = Path(self.temporary_directory.name)
+        self.customers = self.generate_customers(8, self.generate_areas(3))
+        for i, customer in enumerate(self.customers):
+            customer.identity_no = f"19{70 + i}{i}840224{i}"
+            customer.has_digital_box = i % 2 == 0
+            customer.save()
+            connection = CustomerConnection.objects.create(
+                customer=customer, box_ca_number=self.get_random_string(10)
+            )
+            self.generate_payments(i % 3 + 1, connections=[connection])
+            if i < 3:
+                Bill.objects.create(
+                    connection=connection,
+                    from_date=date.today(),
+                    to_date=date.today(),
+                    amount=1000,
+                )
+                Payment.objects.filter(connection=connection).update(
+                    date=date.today() - timedelta(days=200)
+                )
+
+    def tearDown(self):
+        """
+        Remove the published Model Versions
+        """
+        self.temporary_directory.cleanup()
+
+    def retrain(self, *args: str) -> str:
+        """
+        Run the Command publishing to the temporary artifact directory
+        """
+        out = StringIO()
+        call_command(
+            "retrain_models",
+            "--model-version",
+            "retrained",
+            "--output",
+            str(self.root),
+            "--trees",
+            "5",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_extract_features(self):
+        """
+        Test the features are streamed to compact arrays across chunks
+        """
+        directory = self.root / "training"
+        vocabulary = extract_features(directory, chunk_size=2)
+        arrays, _ = load_features(directory)
+        self.assertEqual(len(arrays["customers.area"]), len(self.customers))
+        self.assertEqual(arrays["customers.area"].dtype, "int16")
+        self.assertEqual(arrays["customers.non_defaulter"].sum(), 5)
+        self.assertEqual(
+            sorted(vocabulary["areas"]),
+            sorted({customer.area.name for customer in self.customers}),
+        )
+        self.assertEqual(arrays["payments.history"].shape, (Payment.objects.count(), 5))
+        first_payments = [0] + [
+            i
+            for i in range(1, len(arrays["payments.customer"]))
+            if arrays["payments.customer"][i] != arrays["payments.customer"][i - 1]
+        ]
+        assert_array_equal(arrays["payments.history"][first_payments], 5)
+        second = first_payments[-1] + 1
+        assert_array_equal(arrays["payments.history"][second][:4], 5)
+        self.assertEqual(
+            arrays["payments.history"][second][4], arrays["payments.delay"][second - 1]
+        )
+
+    def test_skips_payments_of_new_customers(self):
+        """
+        Test Payments of Customers added after the Customers were extracted are skipped
+        """
+        directory = self.root / "training"
+        directory.mkdir()
+        rows = {customer.pk: i for i, customer in enumerate(self.customers[1:])}
+        extract_payments(directory, rows, 2)
+        self.assertEqual(
+            len(load(directory / "payments.customer.npy")),
+            Payment.objects.exclude(connection__customer=self.customers[0]).count(),
+        )
+
+    def test_publishes_fitted_features(self):
+        """
+        Test the Predictors load the Feature parameters fitted with the new Models
+        """
+        self.assertIn("Published Model Version retrained", self.retrain())
+        self.assertEqual(get_current_dir(self.root), self.root / "retrained")
+        features = read_manifest(self.root / "retrained")["features"]
+        self.assertEqual(len(features["delay"]["mean"]), 8)
+        delay_predictor = DelayPredictor().load(self.root / "retrained")
+        default_predictor = DefaultPredictor().load(self.root / "retrained")
+        self.assertEqual(delay_predictor.version, "retrained")
+        self.assertEqual(
+            set(delay_predictor.areas),
+            {customer.area.name for customer in self.customers},
+        )
+        assert_allclose(delay_predictor.mean, features["delay"]["mean"])
+        self.assertAlmostEqual(default_predictor.unknown_prob, 3 / 8)
+        self.assertEqual(default_predictor.cell_number_probs[-1], 3 / 8)
+        self.assertEqual(
+            set(default_predictor.area_prob), set(delay_predictor.area_columns)
+        )
+        columns = CustomerColumns.from_customers(self.customers)
+        delay_features = delay_predictor.encode_features(
+            columns, [[1, 2]] * len(self.customers)
+        )
+        self.assertEqual(
+            delay_features.shape,
+            (8, 8 + len(delay_predictor.areas) + 2 + 3 + len(delay_predictor.agent)),
+        )
+        self.assertEqual(len(delay_predictor.predict(delay_features)), 8)
+        default_features = default_predictor.encode_features(columns)
+        assert_allclose(
+            default_features[0],
+            default_predictor.get_customer_features(self.customers[0]),
+        )
+        self.assertTrue(set(default_predictor.predict(default_features)) <= {0.0, 1.0})
+
+    def test_sampled_default_model(self):
+        """
+        Test the Default Model is fitted on a sample of the Customers
+        """
+        self.retrain("--max-rows", "6", "--chunk-size", "3")
+        self.assertEqual(read_manifest(self.root / "retrained")["version"], "retrained")
+
+    def test_already_published(self):
+        """
+        Test a published Model Version is not retrained again
+        """
+        self.retrain()
+        with self.assertRaisesMessage(CommandError, "already published"):
+            self.retrain()
+
+    def test_single_class(self):
+        """
+        Test the Default Model needs both defaulting and paying Customers
+        """
+        Bill.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, "Both defaulting and paying"):
+            self.retrain()
+
+    def test_no_payments(self):
+        """
+        Test the Delay Model needs Payments
+        """
+        Payment.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, "Payments are needed"):
+            self.retrain()
+
+
+class LatencyBudgetTestCase(BaseTestCase):
+    """
+    Test Cases to test Predictions fall back to the Priors when the Models overrun
+    the latency budget
+    """
+
+    def setUp(self):
+        """
+        Block the Models until the Test Case releases them
+        """
+        super().setUp()
+        cache.clear()
+        metrics.clear()
+        self.customer = self.generate_customers(1)[0]
+        self.released = Event()
+        self.addCleanup(self.released.set)
+
+    def slow_predict_rows(self, _model, rows):
+        """
+        Predict Feature Rows once the Test Case releases the Models
+        """
+        self.released.wait(5)
+        return [0.0] * len(rows), "slow"
+
+    def get_prediction(self, side_effect=None):
+        """
+        Get the Prediction of a fresh copy of the Customer with a short budget
+        """
+        customer = Customer.objects.get(pk=self.customer.pk)
+        with override_settings(ML_LATENCY_BUDGET_MS=10), patch(
+            "ml.server.predict_rows", side_effect=side_effect or self.slow_predict_rows
+        ):
+            return customer, customer.prediction
+
+    def test_timeout_falls_back(self):
+        """
+        Test the Priors are returned and counted when the Models time out
+        """
+        customer, prediction = self.get_prediction()
+        self.assertTrue(prediction.fallback)
+        self.assertEqual(prediction.model_version, FALLBACK_VERSION)
+        self.assertEqual(prediction.expected_delay, PADDING_VALUE)
+        self.assertAlmostEqual(
+            prediction.default_probability,
+            1 - AREA_PROBS.get(customer.area.name, 1 - UNKNOWN_PROB),
+        )
+        self.assertEqual(metrics.get("prediction_timeouts.delay"), 1)
+        self.assertEqual(metrics.get("prediction_timeouts.default"), 1)
+        self.assertFalse(CustomerPrediction.objects.filter(customer=customer).exists())
+        self.assertIs(customer.prediction, prediction)
+
+    def test_fallback_not_cached(self):
+        """
+        Test Default Probabilities of the Priors are not stored
+        """
+        self.get_prediction()
+        self.assertFalse(DefaultProbability.objects.exists())
+
+    def test_error_falls_back(self):
+        """
+        Test the Priors are returned and the failure is logged when the Models fail
+        """
+        with self.assertLogs("ml.client", "ERROR"):
+            _, prediction = self.get_prediction(RuntimeError("Broken Model"))
+        self.assertTrue(prediction.fallback)
+        self.assertEqual(metrics.get("prediction_errors.delay"), 1)
+        self.assertEqual(metrics.get("prediction_timeouts.delay"), 0)
+
+    def test_within_budget(self):
+        """
+        Test Predictions within the budget are stored
+        """
+        customer = Customer.objects.get(pk=self.customer.pk)
+        with override_settings(ML_LATENCY_BUDGET_MS=60000):
+            prediction = customer.prediction
+        self.assertFalse(prediction.fallback)
+        self.assertTrue(CustomerPrediction.objects.filter(customer=customer).exists())
+        self.assertEqual(metrics.get("prediction_timeouts.delay"), 0)
+        self.assertEqual(metrics.get("prediction_errors.delay"), 0)
+
+    def test_shared_budget(self):
+        """
+        Test the Delay and Default Models share one latency budget
+        """
+        budgets = []
+
+        def overrun(model, rows, budget):
+            budgets.append(budget)
+            sleep(budget)
+            return Predictions(get_fallback_values(model, rows), FALLBACK_VERSION)
+
+        customer = Customer.objects.get(pk=self.customer.pk)
+        with override_settings(ML_LATENCY_BUDGET_MS=50), patch(
+            "ml.client.predict_within_budget", side_effect=overrun
+        ):
+            self.assertTrue(customer.prediction.fallback)
+        self.assertEqual(budgets, [0.05, 0])
+
+    def test_corrupt_manifest_falls_back(self):
+        """
+        Test the Predictions page shows the Priors when the published Manifest is corrupt
+        """
+        # pylint: disable-next=consider-using-with
+        temporary_directory = TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        root = Path(temporary_directory.name)
+        call_command("export_artifacts", "--output", str(root), stdout=StringIO())
+        (get_current_dir(root) / MANIFEST_NAME).write_text("{", encoding="utf-8")
+        self.addCleanup(registry.clear)
+        self.login_as_superuser()
+        with override_settings(
+            ML_ARTIFACT_DIR=root, ML_MODEL_RELOAD_INTERVAL=0, ML_LATENCY_BUDGET_MS=5000
+        ), self.assertLogs("ml.client", "ERROR"):
+            registry.clear()
+            response = self.client.get(
+                f"/customers/{self.customer.user.pk}/predictions"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["model_version"], FALLBACK_VERSION)
+
+    def test_default_probabilities_fallback(self):
+        """
+        Test the Default Probabilities are flagged as the Priors
+        """
+        with patch("ml.server.predict_rows", side_effect=self.slow_predict_rows):
+            probabilities = predict_default_probabilities([self.customer], 0.01)
+        self.assertTrue(probabilities.fallback)
+        self.assertIn(self.customer.pk, probabilities.probabilities)
+
+
+class PriorsTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Priors of the Model Versions
+    """
+
+    def setUp(self):
+        """
+        Point the Models at an empty artifact directory
+        """
+        self.temporary_directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.root = Path(self.temporary_directory.name)
+        settings_override = override_settings(ML_ARTIFACT_DIR=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.rows = [{"area_name": "Sai Lane"}, {"area_name": "Unknown Road"}]
+
+    def test_builtin_priors(self):
+        """
+        Test the Priors of the pickled Models are used without a Model Version
+        """
+        self.assertEqual(get_fallback_values("delay", self.rows), [PADDING_VALUE] * 2)
+        assert_allclose(get_fallback_values("default", self.rows), [0.2, UNKNOWN_PROB])
+
+    def test_manifest_priors(self):
+        """
+        Test the Priors of the current Model Version are read from its Manifest
+        """
+        publish_artifacts(
+            {},
+            "priors",
+            self.root,
+            {
+                "delay": {"padding_value": 2.0},
+                "default": {"area_prob": {"Sai Lane": 0.5}, "unknown_prob": 0.1},
+            },
+        )
+        self.assertEqual(get_fallback_values("delay", self.rows), [2.0, 2.0])
+        self.assertEqual(get_fallback_values("default", self.rows), [0.5, 0.1])
+
+    def test_unreadable_manifest(self):
+        """
+        Test the built in Priors are used when the Manifest cannot be read
+        """
+        (self.root / "broken").mkdir()
+        (self.root / "broken" / "manifest.json").write_text("{", encoding="utf-8")
+        (self.root / CURRENT_NAME).write_text("broken", encoding="utf-8")
+        self.assertEqual(get_fallback_values("delay", self.rows), [PADDING_VALUE] * 2)
+
+    def test_unknown_model(self):
+        """
+        Test only the Delay and Default Models have Priors
+        """
+        with self.assertRaisesMessage(ValueError, "Unknown Model"):
+            get_fallback_values("churn", self.rows)
+
+
+class MetricsTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Metrics counters
+    """
+
+    def test_counters(self):
+        """
+        Test Counters are incremented, read and cleared
+        """
+        counters = Metrics()
+        counters.increment("timeouts")
+        counters.increment("timeouts", 2)
+        counters.increment("errors", 0)
+        self.assertEqual(counters.get("timeouts"), 3)
+        self.assertEqual(counters.get("errors"), 0)
+        self.assertEqual(counters.snapshot()["counters"], {"timeouts": 3})
+        counters.clear()
+        self.assertEqual(counters.snapshot(), {"counters": {}, "histograms": {}})
+
+    def test_histograms(self):
+        """
+        Test Histograms count values into their buckets and time blocks
+        """
+        histograms = Metrics()
+        histograms.observe("load", 0.0002)
+        histograms.observe("load", 0.3)
+        histograms.observe("load", 60)
+        with histograms.timer("predict"):
+            pass
+        snapshot = histograms.snapshot()["histograms"]
+        self.assertEqual(snapshot["load"]["count"], 3)
+        self.assertAlmostEqual(snapshot["load"]["sum"], 60.3002)
+        self.assertEqual(snapshot["load"]["buckets"]["0.0005"], 1)
+        self.assertEqual(snapshot["load"]["buckets"]["0.5"], 1)
+        self.assertEqual(snapshot["load"]["buckets"]["+Inf"], 1)
+        self.assertEqual(sum(snapshot["load"]["buckets"].values()), 3)
+        self.assertEqual(snapshot["predict"]["count"], 1)
+
+
+class InstrumentationTestCase(SimpleTestCase):
+    """
+    Test Cases to test the Predictors record their timings and unknown categories
+    """
+
+    def setUp(self):
+        """
+        Generate Customers in known and unknown Areas
+        """
+        metrics.clear()
+        self.customers = synthetic_customers(300, default_rng(0))
+        self.columns = CustomerColumns.from_customers(self.customers)
+
+    def test_delay(self):
+        """
+        Test the Delay Predictor counts Areas and Agents it was not fitted on
+        """
+        delay_predictor = get_delay_predictor()
+        delay_predictor.predict(
+            delay_predictor.encode_features(self.columns, [[]] * len(self.customers))
+        )
+        self.assertEqual(
+            metrics.get("unknown_areas.delay"),
+            sum(name not in delay_predictor.areas for name in self.columns.area_names),
+        )
+        self.assertEqual(
+            metrics.get("unknown_agents.delay"),
+            sum(name not in delay_predictor.agent for name in self.columns.agent_names),
+        )
+        self.assertGreater(metrics.get("unknown_areas.delay"), 0)
+        histograms = metrics.snapshot()["histograms"]
+        self.assertEqual(histograms["feature_build_seconds.delay"]["count"], 1)
+        self.assertEqual(histograms["predict_seconds.delay"]["count"], 1)
+
+    def test_default(self):
+        """
+        Test the Default Predictor counts Cell Number prefixes without a probability
+        """
+        default_predictor = get_default_predictor()
+        default_predictor.predict(default_predictor.encode_features(self.columns))
+        self.assertEqual(
+            metrics.get("unknown_cell_prefixes.default"),
+            sum(
+                not number[2].isdigit()
+                or int(number[2]) not in default_predictor.cell_number_probs
+                for number in self.columns.phone_numbers
+            ),
+        )
+        self.assertEqual(
+            metrics.get("unknown_areas.default"),
+            sum(
+                name not in default_predictor.area_prob
+                for name in self.columns.area_names
+            ),
+        )
+        self.assertEqual(
+            metrics.get("unknown_agents.default"),
+            sum(
+                name not in default_predictor.agent_probs
+                for name in self.columns.agent_names
+            ),
+        )
+        histograms = metrics.snapshot()["histograms"]
+        self.assertEqual(histograms["predict_seconds.default"]["count"], 1)
+
+    def test_load(self):
+        """
+        Test loading a Predictor is timed
+        """
+        DefaultPredictor().load()
+        self.assertEqual(
+            metrics.snapshot()["histograms"]["model_load_seconds.default"]["count"], 1
+        )
+
+
+class ModelMetricsViewTestCase(BaseTestCase):
+    """
+    Test Cases to test the Model Metrics JSON View Controller
+    """
+
+    def test_metrics(self):
+        """
+        Test the Metrics of the process are returned to superusers
+        """
+        metrics.clear()
+        metrics.increment("unknown_areas.delay", 2)
+        self.login_as_superuser()
+        response = self.client.get("/ml/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "process": {"counters": {"unknown_areas.delay": 2}, "histograms": {}},
+                "server": None,
+            },
+        )
+
+    def test_unreachable_server(self):
+        """
+        Test the Metrics of an unreachable Prediction Server are left out
+        """
+        self.login_as_employee(make_admin=True)
+        with override_settings(ML_PREDICTION_SOCKET="/nonexistent/prediction.sock"):
+            response = self.client.get("/ml/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["server"])
+
+    def test_not_accessible(self):
+        """
+        Test the Metrics are not returned to non admin employees
+        """
+        self.helper_non_render_test("/ml/metrics", True, True)
+
+
+class PortfolioRiskTestCase(BaseTestCase):
+    """
+    Test Cases to test the Customers are ranked by their Expected Loss
+    """
+
+    def setUp(self):
+        """
+        Generate Customers of two Agents with Bills, Payments and Predictions,
+        but for the last Customer
+        """
+        super().setUp()
+        self.areas = self.generate_areas(2, self.generate_employees(2))
+        self.customers = self.generate_customers(6, self.areas)
+        connections = self.generate_connection(6, self.customers)
+        self.generate_bills(12, connections)
+        self.generate_payments(6, connections=connections)
+        refresh_predictions(Customer.objects.exclude(pk=self.customers[-1].pk))
+
+    def test_expected_loss(self):
+        """
+        Test the Expected Loss is the outstanding balance times the stored Default
+        Probability, and the Customer without a Prediction is ranked last
+        """
+        risks = list(get_portfolio_risk())
+        self.assertEqual(len(risks), len(self.customers))
+        for risk in risks[:-1]:
+            customer = Customer.objects.get(pk=risk["customer_id"])
+            billed = sum(
+                bill.amount
+                for bill in Bill.objects.filter(connection__customer=customer)
+            )
+            self.assertAlmostEqual(risk["balance"], billed - customer.total_payment)
+            self.assertAlmostEqual(
+                risk["default_probability"],
+                customer.customerprediction.default_probability,
+            )
+            self.assertAlmostEqual(
+                risk["expected_loss"],
+                max(risk["balance"], 0) * risk["default_probability"],
+            )
+        losses = [risk["expected_loss"] for risk in risks[:-1]]
+        self.assertEqual(losses, sorted(losses, reverse=True))
+        self.assertEqual(risks[-1]["customer_id"], self.customers[-1].pk)
+        self.assertIsNone(risks[-1]["default_probability"])
+        self.assertIsNone(risks[-1]["expected_loss"])
+
+    def test_filters(self):
+        """
+        Test the ranking is filtered by Area and Agent
+        """
+        area = self.areas[0]
+        self.assertEqual(
+            {risk["customer_id"] for risk in get_portfolio_risk(area_id=area.pk)},
+            set(area.customers.values_list("pk", flat=True)),
+        )
+        self.assertEqual(
+            {
+                risk["customer_id"]
+                for risk in get_portfolio_risk(agent_id=area.agent.pk)
+            },
+            set(area.agent.customers.values_list("pk", flat=True)),
+        )
+
+    def test_follows_data(self):
+        """
+        Test the ranking is read in one query without scoring, and follows the
+        balances and the stored Predictions
+        """
+        with patch("ml.cache.predict") as default_predict, self.assertNumQueries(1):
+            risks = list(get_portfolio_risk())
+        default_predict.assert_not_called()
+        Payment.objects.all().delete()
+        self.assertGreater(
+            sum(risk["balance"] for risk in get_portfolio_risk()),
+            sum(risk["balance"] for risk in risks),
+        )
+        customer = self.customers[0]
+        CustomerPrediction.objects.filter(customer=customer).update(
+            default_probability=0
+        )
+        probabilities = {
+            risk["customer_id"]: risk["default_probability"]
+            for risk in get_portfolio_risk()
+        }
+        self.assertEqual(probabilities[customer.pk], 0)
+        self.assertEqual(
+            probabilities[self.customers[1].pk],
+            self.customers[1].customerprediction.default_probability,
+        )
+
+
+class BuildWorklistsTestCase(BaseTestCase):
+    """
+    Test Cases to test the Collection Worklists are built from the Predictions
+    """
+
+    def setUp(self):
+        """
+        Generate Customers of two Agents, one of them disconnected
+        """
+        super().setUp()
+        self.customers = self.generate_customers(
+            6, self.generate_areas(2, self.generate_employees(2))
+        )
+        self.disconnected = self.customers[0]
+        self.disconnected.active_connection = False
+        self.disconnected.save()
+
+    def build(self) -> str:
+        """
+        Run the Command and get its output
+        """
+        out = StringIO()
+        call_command("build_worklists", "--batch-size", "2", stdout=out)
+        return out.getvalue()
+
+    def test_visits(self):
+        """
+        Test every connected Customer is visited by its Agent on its Expected Payment Date
+        """
+        self.assertIn("Built 5 Collection Visits", self.build())
+        for customer in self.customers[1:]:
+            visit = CollectionVisit.objects.get(customer=customer)
+            self.assertEqual(visit.agent, customer.area.agent)
+            self.assertEqual(visit.date, customer.expected_payment_date)
+            self.assertEqual(visit.default_probability, customer.default_probability)
+            self.assertIn(str(customer), str(visit))
+        self.assertFalse(
+            CollectionVisit.objects.filter(customer=self.disconnected).exists()
+        )
+
+    def test_rebuilt(self):
+        """
+        Test building again replaces the Collection Visits
+        """
+        self.build()
+        customer = self.customers[1]
+        customer.area = self.customers[2].area
+        customer.save()
+        self.build()
+        self.assertEqual(CollectionVisit.objects.count(), 5)
+        self.assertEqual(
+            CollectionVisit.objects.get(customer=customer).agent, customer.area.agent
+        )
+
+
+class CashForecastTestCase(BaseTestCase):
+    """
+    Test Cases to test the weekly Cash Inflow Forecast of the Areas
+    """
+
+    def setUp(self):
+        """
+        Store Predictions of Customers paying on known dates
+        """
+        super().setUp()
+        cache.clear()
+        self.areas = self.generate_areas(2)
+        self.customers = self.generate_customers(3, self.areas[:1])
+        self.customers[2].active_connection = False
+        self.customers[2].save()
+        connection = CustomerConnection.objects.create(
+            customer=self.customers[0], box_ca_number=self.get_random_string(10)
+        )
+        self.generate_bills(1, [connection])
+        Bill.objects.update(amount=800, to_date=date.today() + timedelta(days=1))
+        self.generate_bills(1, [connection])
+        refresh_predictions(Customer.objects.all())
+        self.start = get_week_start(date.today())
+        self.set_prediction(self.customers[0], 3, 0.25)
+        self.set_prediction(self.customers[1], -10, 0.0)
+        self.set_prediction(self.customers[2], 0, 0.0)
+
+    def set_prediction(self, customer, days: int, default_probability: float):
+        """
+        Set the Expected Payment Date and Default Probability of a Customer
+        """
+        CustomerPrediction.objects.filter(customer=customer).update(
+            expected_payment_date=self.start + timedelta(days=days),
+            default_probability=default_probability,
+        )
+
+    def test_inflows(self):
+        """
+        Test the latest billed amounts are expected every billing period after the
+        Expected Payment Date, weighted by the probability of paying
+        """
+        forecast = compute_cash_forecast(date.today())
+        self.assertEqual(
+            forecast.weeks, [self.start + timedelta(weeks=week) for week in range(8)]
+        )
+        inflows = {area.area_id: area.inflows for area in forecast.areas}
+        self.assertEqual(inflows[self.areas[0].pk], [600, 0, 1000, 0, 600, 0, 0, 1000])
+        self.assertEqual(inflows[self.areas[1].pk], [0] * 8)
+        self.assertEqual(forecast.totals, inflows[self.areas[0].pk])
+        self.assertEqual(
+            {area.area_id: area.total for area in forecast.areas}[self.areas[0].pk],
+            3200,
+        )
+
+    def test_without_predictions(self):
+        """
+        Test every Area is forecast without any inflow when no Customer is connected
+        """
+        Customer.objects.update(active_connection=False)
+        forecast = compute_cash_forecast(weeks=2)
+        self.assertEqual([area.inflows for area in forecast.areas], [[0, 0], [0, 0]])
+
+    def test_stored(self):
+        """
+        Test the built forecast is stored and read without computing it again
+        """
+        forecast = build_cash_forecast()
+        with patch("ml.forecast.refresh_expired_predictions") as refresh, patch(
+            "ml.forecast.compute_cash_forecast"
+        ) as compute, self.assertNumQueries(1):
+            self.assertEqual(get_cash_forecast(), forecast)
+        refresh.assert_not_called()
+        compute.assert_not_called()
+        self.assertEqual(AreaInflow.objects.count(), len(self.areas) * 8)
+        self.assertEqual(get_cash_forecast(weeks=2).weeks, forecast.weeks[:2])
+        inflow = AreaInflow.objects.get(area=self.areas[0], week=self.start)
+        self.assertEqual(
+            str(inflow), f"Inflow of {self.areas[0]} in the week of {self.start}"
+        )
+
+    def test_not_built(self):
+        """
+        Test no Area is forecast before the forecast is built
+        """
+        forecast = get_cash_forecast()
+        self.assertEqual(
+            (forecast.weeks, forecast.areas, forecast.totals), ([], [], [])
+        )
+
+    def test_command(self):
+        """
+        Test the Cash Forecast Command replaces the stored forecast
+        """
+        build_cash_forecast(weeks=2)
+        out = StringIO()
+        call_command("build_cash_forecast", stdout=out)
+        self.assertEqual(AreaInflow.objects.count(), len(self.areas) * 8)
+        self.assertIn("Forecast 3200 LKR over 8 weeks for 2 Areas", out.getvalue())
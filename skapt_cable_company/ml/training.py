@@ -0,0 +1,399 @@
+"""
+Module to Retrain the Prediction Models from the live database
+
+Customers and Payments are streamed from the database in chunks and written to
+disk as compact NumPy arrays, holding category codes instead of names. The
+models are then fitted on those arrays along with the normalization vectors and
+probability tables the Predictors encode their features with
+"""
+
+import json
+from datetime import date, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from django.db.models import OuterRef, Subquery
+from numpy import (
+    asarray,
+    bincount,
+    column_stack,
+    float32,
+    int8,
+    int16,
+    int32,
+    load,
+    maximum,
+    ndarray,
+    save,
+    unique,
+    where,
+)
+from numpy.random import default_rng
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from common.models import Customer, Payment
+
+from .artifacts import get_artifact_dir, publish_artifacts, read_manifest
+from .compiled import CompiledGradientBoosting, CompiledStandardScaler, CompiledSVC
+from .encoders import decode_identity_numbers, get_digit, lookup_digit, one_hot
+from .predictors import DelayPredictor
+
+FEATURE_CHUNK_SIZE = 2000
+DEFAULT_DAYS = 90
+DELAY_TREES = 1000
+DEFAULT_MAX_ROWS = 20000
+CUSTOMER_ARRAYS = {
+    "area": int16,
+    "agent": int16,
+    "phone_digit": int8,
+    "is_male": bool,
+    "has_digital_box": bool,
+    "offer_power_intake": bool,
+    "age": int16,
+    "collection_date": int8,
+    "non_defaulter": bool,
+}
+PAYMENT_ARRAYS = {
+    "customer": int32,
+    "history": float32,
+    "month": int8,
+    "delay": float32,
+}
+VOCABULARY_NAME = "vocabulary.json"
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Split an iterable into lists of at most `size` items
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def get_training_customers():
+    """
+    Get the Customers with their Area, Agent, billed and paid totals and last Payment
+    """
+    customer_payments = Payment.objects.filter(connection__customer=OuterRef("pk"))
+    return (
+        Customer.objects.select_related("area", "area__agent", "area__agent__user")
+        .with_balances()
+        .annotate(
+            last_payment_date=Subquery(
+                customer_payments.order_by("-date").values("date")[:1]
+            ),
+        )
+        .order_by("pk")
+    )
+
+
+def get_code(codes: Dict[str, int], name: str) -> int:
+    """
+    Get the code of a category name, adding the name when it is new
+    """
+    return codes.setdefault(name, len(codes))
+
+
+def is_defaulter(customer, overdue_date: date) -> bool:
+    """
+    Check if a Customer owes a balance without having paid since the overdue date
+    """
+    return customer.billed > customer.paid and (
+        customer.last_payment_date is None or customer.last_payment_date < overdue_date
+    )
+
+
+def save_arrays(
+    directory: Path, prefix: str, columns: Dict[str, list], dtypes: Dict[str, type]
+) -> None:
+    """
+    Write the columns of a table as one .npy array each
+    """
+    for name, dtype in dtypes.items():
+        save(directory / f"{prefix}.{name}.npy", asarray(columns[name], dtype=dtype))
+
+
+def extract_customers(
+    directory: Path, chunk_size: int, default_days: int
+) -> Tuple[Dict[int, int], dict]:
+    """
+    Stream the Customer features to disk
+
+    Returns the row of each Customer primary key and the Area and Agent names by code
+    """
+    overdue_date = date.today() - timedelta(days=default_days)
+    columns: Dict[str, list] = {name: [] for name in CUSTOMER_ARRAYS}
+    areas: Dict[str, int] = {}
+    agents: Dict[str, int] = {}
+    rows: Dict[int, int] = {}
+    for customers in chunked(
+        get_training_customers().iterator(chunk_size=chunk_size), chunk_size
+    ):
+        ages, is_male = decode_identity_numbers(
+            [customer.identity_no for customer in customers]
+        )
+        columns["age"].extend(ages.tolist())
+        columns["is_male"].extend(is_male.tolist())
+        columns["phone_digit"].extend(
+            get_digit([customer.phone_number for customer in customers], 2).tolist()
+        )
+        for customer in customers:
+            rows[customer.pk] = len(rows)
+            columns["area"].append(get_code(areas, customer.area.name))
+            columns["agent"].append(
+                get_code(agents, customer.area.agent.user.first_name)
+            )
+            columns["has_digital_box"].append(customer.has_digital_box)
+            columns["offer_power_intake"].append(customer.offer_power_intake)
+            columns["collection_date"].append(customer.area.collection_date)
+            columns["non_defaulter"].append(not is_defaulter(customer, overdue_date))
+    save_arrays(directory, "customers", columns, CUSTOMER_ARRAYS)
+    return rows, {"areas": list(areas), "agents": list(agents)}
+
+
+def extract_payments(directory: Path, rows: Dict[int, int], chunk_size: int) -> None:
+    """
+    Stream a Delay sample of every Payment to disk
+
+    A sample is the Payment Day offset of a Payment, with the offsets of the
+    Customer's last earlier Payments as its Time Series the way a Customer is
+    predicted.
+    Payments of Customers added after the Customers were extracted are skipped
+    """
+    delay_predictor = DelayPredictor()
+    columns: Dict[str, list] = {name: [] for name in PAYMENT_ARRAYS}
+    payments = Payment.objects.order_by(
+        "connection__customer", "date", "pk"
+    ).values_list(
+        "connection__customer", "date", "connection__customer__area__collection_date"
+    )
+    customer_id = None
+    history: List[int] = []
+    for chunk in chunked(payments.iterator(chunk_size=chunk_size), chunk_size):
+        histories = []
+        for payment_customer_id, payment_date, collection_date in chunk:
+            if payment_customer_id not in rows:
+                continue
+            if payment_customer_id != customer_id:
+                customer_id = payment_customer_id
+                history = []
+            delay = payment_date.day - collection_date
+            columns["customer"].append(rows[customer_id])
+            columns["month"].append(payment_date.month)
+            columns["delay"].append(delay)
+            histories.append(list(history))
+            history = (history + [delay])[-delay_predictor.time_series_offset :]
+        columns["history"].extend(delay_predictor.get_payments_arrays(histories))
+    columns["history"] = asarray(columns["history"]).reshape(
+        (-1, delay_predictor.time_series_offset)
+    )
+    save_arrays(directory, "payments", columns, PAYMENT_ARRAYS)
+
+
+def extract_features(
+    directory: Path, chunk_size=FEATURE_CHUNK_SIZE, default_days=DEFAULT_DAYS
+) -> dict:
+    """
+    Stream the Customer and Payment features of the database to arrays on disk
+
+    Returns the Area and Agent names by code, which is also written next to them
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    rows, vocabulary = extract_customers(directory, chunk_size, default_days)
+    extract_payments(directory, rows, chunk_size)
+    with open(directory / VOCABULARY_NAME, "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f, indent=2)
+    return vocabulary
+
+
+def load_features(directory: Path) -> Tuple[dict, dict]:
+    """
+    Load the extracted feature arrays, memory mapped, and their vocabulary
+    """
+    arrays = {
+        f"{prefix}.{name}": load(directory / f"{prefix}.{name}.npy", mmap_mode="r")
+        for prefix, dtypes in (
+            ("customers", CUSTOMER_ARRAYS),
+            ("payments", PAYMENT_ARRAYS),
+        )
+        for name in dtypes
+    }
+    with open(directory / VOCABULARY_NAME, encoding="utf-8") as f:
+        return arrays, json.load(f)
+
+
+def fit_delay_model(
+    arrays: dict, vocabulary: dict, trees=DELAY_TREES, seed=0
+) -> Tuple[GradientBoostingRegressor, dict]:
+    """
+    Fit the Delay Model and the normalization of its numerical features
+
+    The Feature Matrix is laid out the way DelayPredictor.encode_features lays it out
+    """
+    customers = asarray(arrays["payments.customer"])
+    delays = asarray(arrays["payments.delay"], dtype=float)
+    if delays.size == 0:
+        raise ValueError("Payments are needed to fit the Delay Model")
+    numerical = column_stack(
+        [
+            arrays["payments.history"],
+            arrays["payments.month"],
+            asarray(arrays["customers.age"])[customers],
+            asarray(arrays["customers.collection_date"])[customers],
+        ]
+    ).astype(float)
+    mean = numerical.mean(axis=0)
+    var = numerical.var(axis=0)
+    var[var == 0] = 1
+    cell_columns = DelayPredictor().cell_columns
+    features = column_stack(
+        [
+            (numerical - mean) / var,
+            one_hot(
+                asarray(arrays["customers.area"])[customers], len(vocabulary["areas"])
+            ),
+            asarray(arrays["customers.is_male"])[customers],
+            asarray(arrays["customers.has_digital_box"])[customers],
+            one_hot(
+                lookup_digit(
+                    asarray(arrays["customers.phone_digit"], dtype=int)[customers],
+                    cell_columns,
+                    cell_columns[-1],
+                ),
+                3,
+            ),
+            one_hot(
+                asarray(arrays["customers.agent"])[customers],
+                len(vocabulary["agents"]),
+            ),
+        ]
+    ).astype(float)
+    model = GradientBoostingRegressor(
+        n_estimators=trees, max_depth=3, learning_rate=0.1, random_state=seed
+    ).fit(features, delays)
+    return model, {
+        "padding_value": float(delays.mean()),
+        "mean": mean.tolist(),
+        "var": var.tolist(),
+        "areas": vocabulary["areas"],
+        "agent": vocabulary["agents"],
+    }
+
+
+def get_rates(codes, labels, size: int, unknown: float) -> ndarray:
+    """
+    Get the share of positive labels of each code, `unknown` for codes never seen
+
+    Negative codes, the non digits, are left out
+    """
+    codes = asarray(codes, dtype=int)
+    known = codes >= 0
+    counts = bincount(codes[known], minlength=size)
+    positives = bincount(codes[known], weights=labels[known], minlength=size)
+    return where(counts > 0, positives / maximum(counts, 1), unknown)
+
+
+def fit_default_model(
+    arrays: dict, vocabulary: dict, max_rows=DEFAULT_MAX_ROWS, seed=0
+) -> Tuple[SVC, StandardScaler, dict]:
+    """
+    Fit the Default Model, its Standard Scaler and the Probability tables
+
+    Each table holds the share of non defaulting Customers of a category, the
+    share of defaulters standing in for the categories never seen
+    """
+    labels = asarray(arrays["customers.non_defaulter"], dtype=float)
+    if len(unique(labels)) < 2:
+        raise ValueError(
+            "Both defaulting and paying Customers are needed to fit the Default Model"
+        )
+    unknown = float(1 - labels.mean())
+    sizes = {
+        "area": len(vocabulary["areas"]),
+        "agent": len(vocabulary["agents"]),
+        "phone_digit": 10,
+        "is_male": 2,
+        "has_digital_box": 2,
+        "offer_power_intake": 2,
+    }
+    codes = {name: asarray(arrays[f"customers.{name}"], dtype=int) for name in sizes}
+    rates = {
+        name: get_rates(codes[name], labels, size, unknown)
+        for name, size in sizes.items()
+    }
+    features = column_stack(
+        [
+            rates["area"][codes["area"]],
+            rates["agent"][codes["agent"]],
+            lookup_digit(codes["phone_digit"], rates["phone_digit"], unknown),
+            rates["is_male"][codes["is_male"]],
+            rates["has_digital_box"][codes["has_digital_box"]],
+            rates["offer_power_intake"][codes["offer_power_intake"]],
+            arrays["customers.age"],
+            arrays["customers.collection_date"],
+        ]
+    ).astype(float)
+    sample = slice(None)
+    if len(labels) > max_rows:
+        sample = default_rng(seed).choice(len(labels), max_rows, replace=False)
+    preprocessor = StandardScaler().fit(features)
+    model = SVC(kernel="rbf").fit(
+        preprocessor.transform(features[sample]), labels[sample]
+    )
+    rates = {name: rate.tolist() for name, rate in rates.items()}
+    return (
+        model,
+        preprocessor,
+        {
+            "area_prob": dict(zip(vocabulary["areas"], rates["area"])),
+            "agent_probs": dict(zip(vocabulary["agents"], rates["agent"])),
+            "gender_probs": dict(zip(("Female", "Male"), rates["is_male"])),
+            "cell_number_probs": {**dict(enumerate(rates["phone_digit"])), -1: unknown},
+            "box_probs": dict(zip(("analog", "digital"), rates["has_digital_box"])),
+            "power_intake_probs": dict(
+                zip(("not offered", "offered"), rates["offer_power_intake"])
+            ),
+            "unknown_prob": unknown,
+        },
+    )
+
+
+def retrain_models(  # pylint: disable=too-many-arguments
+    version: str,
+    root: Union[Path, None] = None,
+    *,
+    chunk_size=FEATURE_CHUNK_SIZE,
+    default_days=DEFAULT_DAYS,
+    trees=DELAY_TREES,
+    max_rows=DEFAULT_MAX_ROWS,
+    seed=0,
+) -> dict:
+    """
+    Extract the features of the database, fit new Models and publish them
+
+    The feature arrays are kept in the training directory of the new Model Version
+    """
+    root = root or get_artifact_dir()
+    if read_manifest(root / version) is not None:
+        raise ValueError(f"Model Version {version} is already published")
+    directory = root / version / "training"
+    extract_features(directory, chunk_size, default_days)
+    arrays, vocabulary = load_features(directory)
+    delay_model, delay_features = fit_delay_model(arrays, vocabulary, trees, seed)
+    default_model, preprocessor, default_features = fit_default_model(
+        arrays, vocabulary, max_rows, seed
+    )
+    return publish_artifacts(
+        {
+            "delay_model": CompiledGradientBoosting.from_model(delay_model),
+            "default_model": CompiledSVC.from_model(default_model),
+            "default_preprocessor": CompiledStandardScaler.from_model(preprocessor),
+        },
+        version,
+        root,
+        {"delay": delay_features, "default": default_features},
+    )
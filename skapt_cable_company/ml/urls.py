@@ -0,0 +1,11 @@
+"""
+Module to contain all ML App URLs
+"""
+
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("metrics", views.model_metrics, name="Model Metrics"),
+]
@@ -0,0 +1,23 @@
+"""
+Module to contain all ML App View Controller Codes
+"""
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, JsonResponse
+
+from employees.models import get_admin_employee
+
+from .client import request_metrics
+from .metrics import metrics
+
+
+@login_required
+def model_metrics(request: HttpRequest):
+    """
+    Prediction Model Metrics JSON View Controller
+
+    Returns the Metrics of this process and of the Prediction Server when one runs
+    """
+    if not request.user.is_superuser:  # type: ignore
+        get_admin_employee(request)
+    return JsonResponse({"process": metrics.snapshot(), "server": request_metrics()})
@@ -0,0 +1,56 @@
+"""
+Module to build the daily Collection Worklists of the Agents
+
+Every Customer with an active connection is visited by the Agent of its Area on
+its Expected Payment Date. The Predictions are refreshed in batches first, so a
+worklist is a single indexed lookup by Agent and day instead of a Model call per
+Customer
+"""
+
+from django.db import transaction
+
+from common.models import CollectionVisit, Customer, CustomerPrediction
+
+from .scoring import refresh_expired_predictions
+
+
+def build_worklists(batch_size=500) -> int:
+    """
+    Replace the Collection Visits with ones built from the fresh Predictions
+
+    Returns the number of Collection Visits stored
+    """
+    refresh_expired_predictions(
+        Customer.objects.filter(active_connection=True), batch_size
+    )
+    predictions = CustomerPrediction.objects.filter(
+        customer__active_connection=True
+    ).values_list(
+        "customer",
+        "customer__area__agent",
+        "expected_payment_date",
+        "expected_delay",
+        "default_probability",
+    )
+    with transaction.atomic():
+        CollectionVisit.objects.all().delete()
+        visits = CollectionVisit.objects.bulk_create(
+            (
+                CollectionVisit(
+                    customer_id=customer_id,
+                    agent_id=agent_id,
+                    date=expected_payment_date,
+                    expected_delay=expected_delay,
+                    default_probability=default_probability,
+                )
+                for (
+                    customer_id,
+                    agent_id,
+                    expected_payment_date,
+                    expected_delay,
+                    default_probability,
+                ) in predictions.iterator()
+            ),
+            batch_size=batch_size,
+        )
+    return len(visits)
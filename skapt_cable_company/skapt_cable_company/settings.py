@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     "areas.apps.AreasConfig",
     "customers.apps.CustomersConfig",
     "payments.apps.PaymentsConfig",
+    "ml.apps.MlConfig",
 ]
 
 MIDDLEWARE = [
@@ -148,3 +149,49 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Machine Learning
+# Seconds a stored Customer Prediction stays fresh before it is recomputed
+
+ML_PREDICTION_MAX_AGE = 24 * 60 * 60
+
+# Seconds browsers may reuse a Customer Prediction fetched by the customer page
+
+ML_PREDICTION_HTTP_MAX_AGE = 5 * 60
+
+# Seconds a cached Default Probability is kept, its key changes with the features
+
+ML_DEFAULT_PROBABILITY_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+# Directory of the Model Versions published by `manage.py export_artifacts`
+# The pickled Models under ml/ are used while none has been published
+# Set the ML_ARTIFACT_DIR environment variable to keep them outside the source tree
+
+ML_ARTIFACT_DIR = Path(os.getenv("ML_ARTIFACT_DIR", BASE_DIR / "ml" / "artifacts"))
+
+# Seconds between the checks of running processes for a newly published Model Version
+
+ML_MODEL_RELOAD_INTERVAL = 30
+
+# Use the compact surrogate Models published by `manage.py compact_models` instead of the full ones
+# Set the ML_COMPACT_MODELS environment variable to 1 to enable, the full Models are used otherwise
+
+ML_COMPACT_MODELS = os.getenv("ML_COMPACT_MODELS") == "1"
+
+# Unix Socket of the micro batching Prediction Server run by `manage.py run_prediction_server`
+# Predictions are computed in process when it is unset or the server is not running
+
+ML_PREDICTION_SOCKET = os.getenv("ML_PREDICTION_SOCKET")
+
+# Milliseconds the Prediction Server waits to collect requests into one batch
+
+ML_BATCH_WINDOW_MS = 5
+
+# Seconds a client waits on the Prediction Server before predicting in process
+
+ML_PREDICTION_TIMEOUT = 1.0
+
+# Milliseconds a page render waits on each Prediction Model before showing the Priors instead
+# None waits for the Models however long they take to load and predict
+
+ML_LATENCY_BUDGET_MS = 500
@@ -9,5 +9,6 @@ urlpatterns = [
     path("areas/", include("areas.urls")),
     path("", include("payments.urls")),
     path("customers/", include("customers.urls")),
+    path("ml/", include("ml.urls")),
     path("", include("login.urls")),
 ]